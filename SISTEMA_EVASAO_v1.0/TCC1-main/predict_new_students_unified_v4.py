@@ -11,7 +11,6 @@ import numpy as np
 import joblib
 import os
 import sys
-import shap
 
 # --- Configuração de Caminhos (Assumindo execução da raiz do projeto) ---
 def get_project_paths_from_root():
@@ -76,6 +75,9 @@ EXPECTED_FEATURE_ORDER = [
     'Antecipou Parcela'
 ]
 
+# Backend de explicação: "shap" (shap.TreeExplainer) ou "xgboost" (pred_contribs nativo, sem importar shap)
+SHAP_BACKEND = "shap"
+
 # --- Funções Auxiliares --- 
 def load_model(xgboost_dir, project_root):
     """Carrega o modelo XGBoost de locais conhecidos relativos à raiz."""
@@ -100,15 +102,36 @@ def load_model(xgboost_dir, project_root):
         print(f"Erro ao carregar modelo: {e}")
         return None
 
-def calculate_shap_values(model, X):
+def calculate_native_contributions(model, X):
+    """
+    Calcula os valores SHAP com o próprio booster XGBoost (pred_contribs=True).
+    Retorna os mesmos valores do TreeExplainer, no mesmo formato
+    (amostras, features, classes), e o valor base de cada classe.
+    """
+    import xgboost as xgb
+    
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    contribs = booster.predict(xgb.DMatrix(X), pred_contribs=True)
+    # A última coluna é o valor base (bias)
+    if contribs.ndim == 3:  # (amostras, classes, features + 1)
+        return np.ascontiguousarray(contribs[:, :, :-1].transpose(0, 2, 1)), contribs[0, :, -1]
+    return contribs[:, :-1], contribs[0, -1]
+
+def calculate_shap_values(model, X, backend=None):
     """Calcula os valores SHAP para as previsões."""
+    backend = backend or SHAP_BACKEND
     try:
-        print("Calculando valores SHAP...")
-        # Criar o explicador SHAP para modelos baseados em árvores
-        explainer = shap.TreeExplainer(model)
-        
-        # Calcular valores SHAP
-        shap_values = explainer.shap_values(X)
+        print(f"Calculando valores SHAP (backend: {backend})...")
+        if backend == "xgboost":
+            shap_values, expected_value = calculate_native_contributions(model, X)
+        else:
+            import shap
+            # Criar o explicador SHAP para modelos baseados em árvores
+            explainer = shap.TreeExplainer(model)
+            
+            # Calcular valores SHAP
+            shap_values = explainer.shap_values(X)
+            expected_value = explainer.expected_value
         
         # Verificar o formato dos valores SHAP
         if isinstance(shap_values, list):
@@ -118,7 +141,7 @@ def calculate_shap_values(model, X):
         else:
             print(f"Valores SHAP calculados com sucesso. Formato: array com shape {shap_values.shape}")
         
-        return shap_values, explainer.expected_value
+        return shap_values, expected_value
     except Exception as e:
         print(f"Erro ao calcular valores SHAP: {e}")
         return None, None
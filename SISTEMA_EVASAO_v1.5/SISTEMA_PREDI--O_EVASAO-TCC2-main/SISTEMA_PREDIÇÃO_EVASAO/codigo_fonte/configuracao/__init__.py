@@ -8,7 +8,9 @@ from .configuracoes import (
     ConfiguracaoModelo,
     ConfiguracaoRegrasNegocio,
     ConfiguracaoDados,
-    ConfiguracaoLogs
+    ConfiguracaoLogs,
+    ConfiguracaoServico,
+    ConfiguracaoMonitor
 )
 
 __all__ = [
@@ -17,5 +19,7 @@ __all__ = [
     'ConfiguracaoModelo', 
     'ConfiguracaoRegrasNegocio',
     'ConfiguracaoDados',
-    'ConfiguracaoLogs'
+    'ConfiguracaoLogs',
+    'ConfiguracaoServico',
+    'ConfiguracaoMonitor'
 ]
\ No newline at end of file
@@ -4,7 +4,7 @@ Configurações do sistema de predição de evasão estudantil.
 
 import os
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
 # Diretório raiz do projeto
@@ -20,6 +20,15 @@ class ConfiguracaoModelo:
     subamostra_colunas: float = 0.8
     semente_aleatoria: int = 42
     metrica_avaliacao: str = 'mlogloss'
+    largura_top_k: int = 3  # Classes ML mais prováveis retornadas por aluno
+    quantidade_contribuintes_shap: int = 0  # Contribuintes SHAP +/- por aluno (0 = desativado)
+    modo_explicacao: str = 'completo'  # desativado, completo, apenas_risco ou top_n_urgencia
+    limite_explicacao_urgencia: int = 50  # Alunos explicados no modo top_n_urgencia
+    backend_explicacao: str = 'shap'  # shap (TreeExplainer) ou xgboost (pred_contribs nativo)
+    modo_inferencia: str = 'completo'  # completo ou regras_primeiro (modelo só nos alunos sem regra)
+    top_k_alunos_regra: bool = True  # regras_primeiro: calcula o top-k ML também para alunos decididos por regra
+    deduplicar_linhas: bool = True  # Modelo e SHAP uma vez por vetor de features distinto
+    tamanho_cache_predicoes: int = 50000  # Vetores guardados no cache LRU do processo (0 = desativado)
 
 @dataclass
 class ConfiguracaoRegrasNegocio:
@@ -71,9 +80,33 @@ class ConfiguracaoDados:
     arquivo_modelo: str = "modelo_xgboost_sem_classes_criticas.pkl"
     arquivo_mapeamento_classes: str = "class_mapping_otimizado.pkl"
     
+    # Cache das planilhas convertidas (data/processed/cache_entradas)
+    cache_entradas: bool = True
+    tamanho_maximo_cache_mb: float = 500.0
+    
+    # Linhas por bloco no processamento em streaming (predizer_alunos_em_blocos)
+    tamanho_bloco_streaming: int = 20000
+    
+    # Reaproveita a predição anterior dos alunos sem alteração (data/processed/estado_execucao)
+    execucao_incremental: bool = False
+    
+    # Histórico SQLite de todas as execuções (data/processed/historico_predicoes.sqlite3)
+    historico_predicoes: bool = False
+    arquivo_historico: str = "historico_predicoes.sqlite3"
+    
+    # Índice da grade curricular (data/processed), refeito quando disciplinas.xlsx ou cursos.xlsx mudam
+    arquivo_indice_curricular: str = "indice_curricular.pkl"
+    
     # Features esperadas
     caracteristicas_esperadas: List[str] = None
     
+    # Colunas de identificação e de regras lidas além das features
+    colunas_identificacao: List[str] = None
+    
+    # Features numéricas em que ausente vale 0 (Pend. Financ. vem como texto por causa do 'PC');
+    # nas demais o ausente vai ao modelo como NaN, mesmo que a coluna tenha texto
+    features_ausente_zero: List[str] = None
+    
     def __post_init__(self):
         if self.caracteristicas_esperadas is None:
             self.caracteristicas_esperadas = [
@@ -82,7 +115,16 @@ class ConfiguracaoDados:
                 'Turma Atual', 'Cód.Disc. atual', 'Disciplina atual'
             ]
         
-        # Criar diretórios se não existirem
+        if self.features_ausente_zero is None:
+            self.features_ausente_zero = ['Pend. Financ.']
+        
+        if self.colunas_identificacao is None:
+            self.colunas_identificacao = [
+                'Nome', 'Matrícula', 'Matricula', 'ID', 'Código', 'Situação'
+            ]
+    
+    def criar_diretorios(self) -> None:
+        """Cria os diretórios de dados, modelos e saída, se não existirem."""
         for diretorio in [self.diretorio_dados_brutos, self.diretorio_dados_processados, 
                          self.diretorio_modelos, self.diretorio_saida]:
             diretorio.mkdir(parents=True, exist_ok=True)
@@ -95,6 +137,35 @@ class ConfiguracaoLogs:
     arquivo_handler: bool = True
     console_handler: bool = True
     arquivo_log: str = "sistema_predicao_evasao.log"
+    # Mensagens por aluno/coluna (extra=AMOSTRAR): no máximo N por modelo de mensagem a cada intervalo
+    limite_mensagens_amostradas: int = 20
+    intervalo_amostragem_s: float = 60.0
+    # Mede cada etapa do pipeline (tempo, CPU, linhas, memória); ver utilitarios.instrumentacao
+    instrumentacao: bool = False
+
+@dataclass
+class ConfiguracaoServico:
+    """Configurações do serviço residente de predição."""
+    host: str = "127.0.0.1"
+    porta: int = 8765
+    caminho_socket: Optional[str] = None  # Socket Unix usado no lugar de host/porta
+    tamanho_maximo_lote: int = 512        # Alunos por micro-lote enviado ao modelo
+    espera_maxima_lote_ms: float = 10.0   # Tempo para agrupar requisições concorrentes
+    tamanho_fila: int = 64                # Requisições pendentes antes de responder 503
+    maximo_alunos_requisicao: int = 5000
+    tempo_limite_requisicao_s: float = 60.0
+
+@dataclass
+class ConfiguracaoMonitor:
+    """Configurações do monitor da pasta de entrada."""
+    diretorio_entrada: Path = Path("input")
+    diretorio_saida: Path = Path("output")
+    padroes_arquivos: tuple = ("*.xlsx",)
+    intervalo_varredura_s: float = 2.0     # Varredura periódica (única detecção sem inotify)
+    tempo_estabilidade_s: float = 3.0      # Tamanho e data inalterados por esse tempo antes de processar
+    trabalhadores: int = 2                 # Arquivos processados ao mesmo tempo
+    arquivo_fila: str = ".fila_monitor.sqlite3"  # Fila persistente, dentro do diretório de entrada
+    maximo_tentativas: int = 3             # Processamentos com erro antes de o conteúdo deixar de ser reenfileirado
 
 class Configuracoes:
     """Classe principal de configurações."""
@@ -104,6 +175,8 @@ class Configuracoes:
         self.regras_negocio = ConfiguracaoRegrasNegocio()
         self.dados = ConfiguracaoDados()
         self.logs = ConfiguracaoLogs()
+        self.servico = ConfiguracaoServico()
+        self.monitor = ConfiguracaoMonitor()
         
         # Classes mantidas após otimização
         self.classes_mantidas = [
@@ -142,6 +215,14 @@ class Configuracoes:
         """Retorna caminho do arquivo de cursos."""
         return self.dados.diretorio_dados_brutos / self.dados.arquivo_cursos
     
+    def obter_caminho_historico(self) -> Path:
+        """Retorna caminho do banco de histórico de predições."""
+        return self.dados.diretorio_dados_processados / self.dados.arquivo_historico
+    
+    def obter_caminho_indice_curricular(self) -> Path:
+        """Retorna caminho do índice da grade curricular."""
+        return self.dados.diretorio_dados_processados / self.dados.arquivo_indice_curricular
+    
     def obter_caminho_modelo(self) -> Path:
         """Retorna caminho do arquivo de modelo."""
         return self.dados.diretorio_modelos / self.dados.arquivo_modelo
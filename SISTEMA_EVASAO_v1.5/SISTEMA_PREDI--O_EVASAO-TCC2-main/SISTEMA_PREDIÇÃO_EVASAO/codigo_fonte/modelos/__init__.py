@@ -2,8 +2,19 @@
 Módulo de modelos de Machine Learning.
 """
 
-from .modelo_ml import PreditorEvasaoEstudantil
+from .modelo_ml import PreditorEvasaoEstudantil, ResultadoModelo, FatoresShap
+from .explicadores import ExplicadorContribuicoesXGBoost, criar_explicador, BACKENDS_EXPLICACAO
+from .preprocessamento import PipelinePreprocessamento, converter_coluna_numerica
+from .cache_predicoes import CachePredicoes
 
 __all__ = [
-    'PreditorEvasaoEstudantil'
+    'PreditorEvasaoEstudantil',
+    'ResultadoModelo',
+    'FatoresShap',
+    'ExplicadorContribuicoesXGBoost',
+    'criar_explicador',
+    'BACKENDS_EXPLICACAO',
+    'PipelinePreprocessamento',
+    'converter_coluna_numerica',
+    'CachePredicoes'
 ]
\ No newline at end of file
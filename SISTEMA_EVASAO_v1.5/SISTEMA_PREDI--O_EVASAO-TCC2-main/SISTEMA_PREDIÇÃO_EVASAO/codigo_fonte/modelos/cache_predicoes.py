@@ -0,0 +1,77 @@
+﻿"""
+Cache em memória dos resultados do modelo por vetor de features.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+class CachePredicoes:
+    """
+    Cache LRU de resultados por linha (probabilidades ou valores SHAP).
+    
+    A chave é o conteúdo binário da linha já codificada pelo
+    pré-processamento, então alunos com as mesmas features compartilham a
+    entrada. Vive enquanto o preditor estiver carregado: pontuar de novo a
+    mesma turma no mesmo processo não passa pelo modelo. Seguro para uso
+    concorrente.
+    """
+    
+    def __init__(self, capacidade: int):
+        """
+        Inicializa o cache.
+        
+        Args:
+            capacidade: Quantidade máxima de linhas guardadas (0 = desativado)
+        """
+        self.capacidade = max(int(capacidade), 0)
+        self._itens: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._trava = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._itens)
+    
+    def avaliar(self, chaves: List[bytes], X: pd.DataFrame,
+                calcular: Callable[[pd.DataFrame], np.ndarray]) -> Tuple[np.ndarray, int]:
+        """
+        Retorna o resultado de cada linha, calculando apenas as ausentes do cache.
+        
+        Args:
+            chaves: Chave de cada linha de X
+            X: Linhas a avaliar
+            calcular: Função que recebe um subconjunto de X e devolve um array
+                com uma entrada por linha
+                
+        Returns:
+            Tuple com (resultados empilhados na ordem de X, quantidade de acertos)
+        """
+        if self.capacidade == 0:
+            return calcular(X), 0
+        
+        with self._trava:
+            encontrados = [self._itens.get(chave) for chave in chaves]
+            for chave, valor in zip(chaves, encontrados):
+                if valor is not None:
+                    self._itens.move_to_end(chave)
+        
+        faltantes = [posicao for posicao, valor in enumerate(encontrados) if valor is None]
+        if faltantes:
+            novos = calcular(X.iloc[faltantes])
+            with self._trava:
+                for posicao, valor in zip(faltantes, novos):
+                    # Cópia: a linha não deve manter o array do lote inteiro vivo
+                    encontrados[posicao] = valor = np.array(valor, copy=True)
+                    self._itens[chaves[posicao]] = valor
+                    self._itens.move_to_end(chaves[posicao])
+                while len(self._itens) > self.capacidade:
+                    self._itens.popitem(last=False)
+        
+        return np.stack(encontrados) if encontrados else calcular(X), len(chaves) - len(faltantes)
+    
+    def limpar(self) -> None:
+        """Remove todas as entradas."""
+        with self._trava:
+            self._itens.clear()
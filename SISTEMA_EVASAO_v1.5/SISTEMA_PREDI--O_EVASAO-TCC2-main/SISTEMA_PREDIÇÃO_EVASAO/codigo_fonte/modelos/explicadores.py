@@ -0,0 +1,94 @@
+﻿"""
+Explicadores de predições (valores SHAP) do modelo XGBoost.
+"""
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ..utilitarios import obter_registrador
+
+registrador = obter_registrador(__name__)
+
+# Backends de explicação aceitos por criar_explicador
+BACKENDS_EXPLICACAO = ('shap', 'xgboost')
+
+class ExplicadorContribuicoesXGBoost:
+    """
+    Explicador que usa as contribuições nativas do booster XGBoost.
+    
+    ``Booster.predict(..., pred_contribs=True)`` calcula os mesmos valores
+    TreeSHAP do ``shap.TreeExplainer`` em C++ multithread, sem importar o
+    pacote shap. A interface imita a do TreeExplainer: ``shap_values``
+    retorna (n_amostras, n_features, n_classes) em modelos multiclasse ou
+    (n_amostras, n_features) em modelos binários, e ``expected_value``
+    guarda o valor base (margem) de cada classe.
+    """
+    
+    def __init__(self, modelo: Any):
+        """
+        Inicializa o explicador.
+        
+        Args:
+            modelo: Modelo XGBoost (XGBClassifier ou Booster)
+            
+        Raises:
+            TypeError: Se o modelo não for do XGBoost
+        """
+        if hasattr(modelo, 'get_booster'):
+            self.booster = modelo.get_booster()
+        elif hasattr(modelo, 'predict') and type(modelo).__name__ == 'Booster':
+            self.booster = modelo
+        else:
+            raise TypeError(f"Modelo não suportado pelo explicador nativo: {type(modelo).__name__}")
+        self.expected_value = None
+    
+    def shap_values(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Calcula as contribuições de cada feature para cada amostra.
+        
+        Args:
+            X: DataFrame com dados processados
+            
+        Returns:
+            Array com os valores SHAP no layout do TreeExplainer
+        """
+        import xgboost
+        
+        contribuicoes = self.booster.predict(xgboost.DMatrix(X), pred_contribs=True)
+        
+        # A última coluna é o valor base (bias); o restante são as features
+        if contribuicoes.ndim == 3:  # (n_amostras, n_classes, n_features + 1)
+            self.expected_value = contribuicoes[0, :, -1] if len(contribuicoes) else None
+            return np.ascontiguousarray(contribuicoes[:, :, :-1].transpose(0, 2, 1))
+        
+        self.expected_value = contribuicoes[0, -1] if len(contribuicoes) else None
+        return contribuicoes[:, :-1]
+
+def criar_explicador(modelo: Any, backend: str = 'shap') -> Any:
+    """
+    Cria o explicador de predições do modelo.
+    
+    Args:
+        modelo: Modelo treinado
+        backend: 'shap' (shap.TreeExplainer) ou 'xgboost' (pred_contribs nativo)
+        
+    Returns:
+        Objeto com método shap_values(X)
+        
+    Raises:
+        ValueError: Se o backend for inválido
+    """
+    if backend not in BACKENDS_EXPLICACAO:
+        raise ValueError(f"Backend de explicação inválido: {backend}. Use um de {BACKENDS_EXPLICACAO}")
+    
+    if backend == 'xgboost':
+        try:
+            return ExplicadorContribuicoesXGBoost(modelo)
+        except TypeError as e:
+            registrador.warning(f"{e}. Usando shap.TreeExplainer.")
+    
+    import shap
+    
+    return shap.TreeExplainer(modelo)
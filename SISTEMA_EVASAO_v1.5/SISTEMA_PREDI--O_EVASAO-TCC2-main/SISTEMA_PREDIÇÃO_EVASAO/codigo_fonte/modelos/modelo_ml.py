@@ -2,20 +2,177 @@
 Modelo de Machine Learning para predição de evasão estudantil.
 """
 
-import joblib
-import shap
 import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Tuple, List, Optional, Dict, Any
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import LabelEncoder
 
-from ..utilitarios import obter_registrador
+from ..utilitarios import obter_registrador, agrupar_linhas_identicas, medir_etapa
 from ..configuracao import configuracoes
+from .cache_predicoes import CachePredicoes
+from .explicadores import criar_explicador
+from .preprocessamento import PipelinePreprocessamento
 
 registrador = obter_registrador(__name__)
 
+# Até esse número de colunas extrair_top_k ordena a linha inteira (mais rápido que partition)
+COLUNAS_ORDENACAO_COMPLETA = 32
+
+@dataclass
+class FatoresShap:
+    """Principais fatores SHAP de cada aluno de um lote."""
+    fator_principal: np.ndarray  # Nome da feature de maior impacto ('N/A' se indisponível)
+    valor_importancia: np.ndarray  # Valor SHAP (com sinal) do fator principal
+    indices_positivos: Optional[np.ndarray] = None  # (n_alunos, N) features que mais aumentam; -1 se não houver
+    valores_positivos: Optional[np.ndarray] = None  # (n_alunos, N) valores correspondentes; NaN se não houver
+    indices_negativos: Optional[np.ndarray] = None  # (n_alunos, N) features que mais diminuem; -1 se não houver
+    valores_negativos: Optional[np.ndarray] = None  # (n_alunos, N) valores correspondentes; NaN se não houver
+    linhas_explicadas: Optional[np.ndarray] = None  # Posições com SHAP calculado (None = todas)
+    
+    def selecionar(self, posicoes: np.ndarray) -> 'FatoresShap':
+        """
+        Reordena ou repete os fatores segundo as posições informadas.
+        
+        Args:
+            posicoes: Posição de origem de cada linha do resultado
+            
+        Returns:
+            FatoresShap com uma linha por posição
+        """
+        def indexar(valores: Optional[np.ndarray]) -> Optional[np.ndarray]:
+            return None if valores is None else valores[posicoes]
+        
+        linhas_explicadas = None
+        if self.linhas_explicadas is not None:
+            explicadas = np.zeros(len(self.fator_principal), dtype=bool)
+            explicadas[self.linhas_explicadas] = True
+            linhas_explicadas = np.flatnonzero(explicadas[posicoes])
+        
+        return FatoresShap(
+            fator_principal=self.fator_principal[posicoes],
+            valor_importancia=self.valor_importancia[posicoes],
+            indices_positivos=indexar(self.indices_positivos),
+            valores_positivos=indexar(self.valores_positivos),
+            indices_negativos=indexar(self.indices_negativos),
+            valores_negativos=indexar(self.valores_negativos),
+            linhas_explicadas=linhas_explicadas
+        )
+    
+    @staticmethod
+    def concatenar(partes: List['FatoresShap']) -> 'FatoresShap':
+        """
+        Junta os fatores de vários lotes, na ordem informada.
+        
+        Args:
+            partes: Fatores de cada lote
+            
+        Returns:
+            FatoresShap com as linhas de todos os lotes
+        """
+        tamanhos = [len(parte.fator_principal) for parte in partes]
+        fatores = FatoresShap(
+            fator_principal=np.concatenate([parte.fator_principal for parte in partes]).astype(object),
+            valor_importancia=np.concatenate([parte.valor_importancia for parte in partes])
+        )
+        for atributo, preenchimento in (('indices_positivos', -1), ('valores_positivos', np.nan),
+                                        ('indices_negativos', -1), ('valores_negativos', np.nan)):
+            presentes = [getattr(parte, atributo) for parte in partes if getattr(parte, atributo) is not None]
+            if presentes:
+                setattr(fatores, atributo, np.concatenate([
+                    getattr(parte, atributo) if getattr(parte, atributo) is not None
+                    else np.full((tamanho, presentes[0].shape[1]), preenchimento, dtype=presentes[0].dtype)
+                    for parte, tamanho in zip(partes, tamanhos)
+                ]))
+        
+        if any(parte.linhas_explicadas is not None for parte in partes):
+            inicios = np.cumsum([0] + tamanhos[:-1])
+            fatores.linhas_explicadas = np.concatenate([
+                inicio + (np.arange(tamanho) if parte.linhas_explicadas is None else parte.linhas_explicadas)
+                for parte, inicio, tamanho in zip(partes, inicios, tamanhos)
+            ]).astype(np.intp)
+        return fatores
+    
+    def expandir(self, linhas: np.ndarray, total: int) -> 'FatoresShap':
+        """
+        Distribui fatores calculados para um subconjunto sobre todas as linhas.
+        
+        Args:
+            linhas: Posições, no lote completo, das linhas deste resultado
+            total: Quantidade de linhas do lote completo
+            
+        Returns:
+            FatoresShap do lote completo; as demais linhas recebem 'N/A' e 0
+        """
+        fatores = FatoresShap(
+            fator_principal=np.full(total, 'N/A', dtype=object),
+            valor_importancia=np.zeros(total),
+            linhas_explicadas=linhas
+        )
+        fatores.fator_principal[linhas] = self.fator_principal
+        fatores.valor_importancia[linhas] = self.valor_importancia
+        for atributo, preenchimento in (('indices_positivos', -1), ('valores_positivos', np.nan),
+                                        ('indices_negativos', -1), ('valores_negativos', np.nan)):
+            valores_linhas = getattr(self, atributo)
+            if valores_linhas is not None:
+                valores = np.full((total, valores_linhas.shape[1]), preenchimento, dtype=valores_linhas.dtype)
+                valores[linhas] = valores_linhas
+                setattr(fatores, atributo, valores)
+        return fatores
+
+@dataclass
+class ResultadoModelo:
+    """Saída do modelo ML para um lote de alunos."""
+    predicoes: np.ndarray  # Classe prevista por aluno
+    probabilidades: np.ndarray  # Matriz (n_alunos, n_classes) do predict_proba
+    indices_top: np.ndarray  # Matriz (n_alunos, k) com as k classes mais prováveis
+    probabilidades_top: np.ndarray  # Matriz (n_alunos, k) com as probabilidades do top-k
+    valores_shap: Any  # None quando o SHAP não foi calculado
+    fatores_shap: Optional[FatoresShap] = None
+    linhas_avaliadas: int = 0  # Alunos que passaram pelo modelo
+    linhas_unicas: int = 0  # Vetores de features distintos entre eles
+    acertos_cache: int = 0  # Vetores cujas probabilidades vieram do cache
+    
+    @property
+    def probabilidade_maxima(self) -> np.ndarray:
+        """Probabilidade da classe prevista para cada aluno."""
+        if self.probabilidades_top.shape[1] > 0:
+            return self.probabilidades_top[:, 0]
+        return self.probabilidades.max(axis=1)
+    
+    def expandir(self, linhas: np.ndarray, total: int) -> 'ResultadoModelo':
+        """
+        Distribui o resultado de um subconjunto de alunos sobre o lote completo.
+        
+        Args:
+            linhas: Posições, no lote completo, dos alunos deste resultado
+            total: Quantidade de alunos do lote completo
+            
+        Returns:
+            ResultadoModelo do lote completo; alunos fora de linhas ficam sem
+            predição (None), com probabilidades NaN e top-k -1
+        """
+        predicoes = np.full(total, None, dtype=object)
+        predicoes[linhas] = self.predicoes
+        probabilidades = np.full((total, self.probabilidades.shape[1]), np.nan)
+        probabilidades[linhas] = self.probabilidades
+        indices_top = np.full((total, self.indices_top.shape[1]), -1, dtype=self.indices_top.dtype)
+        indices_top[linhas] = self.indices_top
+        probabilidades_top = np.full((total, self.probabilidades_top.shape[1]), np.nan)
+        probabilidades_top[linhas] = self.probabilidades_top
+        
+        return ResultadoModelo(
+            predicoes=predicoes,
+            probabilidades=probabilidades,
+            indices_top=indices_top,
+            probabilidades_top=probabilidades_top,
+            valores_shap=None,
+            fatores_shap=None if self.fatores_shap is None else self.fatores_shap.expandir(linhas, total),
+            linhas_avaliadas=self.linhas_avaliadas,
+            linhas_unicas=self.linhas_unicas,
+            acertos_cache=self.acertos_cache
+        )
+
 class PreditorEvasaoEstudantil:
     """Preditor de evasão estudantil usando XGBoost."""
     
@@ -26,6 +183,9 @@ class PreditorEvasaoEstudantil:
         self.info_classes = None
         self.codificadores_rotulos = {}
         self.imputadores = {}
+        self.pipeline_preprocessamento = PipelinePreprocessamento()
+        self.nomes_classes = []
+        self._criar_caches()
         self._carregado = False
     
     def carregar_modelo(self, caminho_modelo: Optional[Path] = None, 
@@ -50,6 +210,9 @@ class PreditorEvasaoEstudantil:
             
             registrador.info("Carregando modelo de machine learning...")
             
+            # Importado aqui: configuração e regras não precisam do joblib
+            import joblib
+            
             # Verificar se arquivos existem
             if not caminho_modelo.exists():
                 raise FileNotFoundError(f"Modelo não encontrado: {caminho_modelo}")
@@ -62,6 +225,7 @@ class PreditorEvasaoEstudantil:
             if caminho_mapeamento_classes.exists():
                 self.info_classes = joblib.load(caminho_mapeamento_classes)
                 registrador.info("Mapeamento de classes carregado")
+            self.nomes_classes = self._extrair_nomes_classes(self.info_classes)
             
             # Carregar artifacts de treinamento
             caminho_artifacts = configuracoes.dados.diretorio_modelos / "training_artifacts.pkl"
@@ -70,9 +234,18 @@ class PreditorEvasaoEstudantil:
                 self.codificadores_rotulos = artifacts.get('label_encoders', {})
                 self.imputadores = artifacts.get('imputers', {})
             
+            # Compilar pré-processamento (mapas de categorias e imputação)
+            self.pipeline_preprocessamento = PipelinePreprocessamento.compilar(
+                self.codificadores_rotulos, self.imputadores
+            )
+            
             # Inicializar explicador SHAP
-            registrador.info("Inicializando explainer SHAP...")
-            self.explicador = shap.TreeExplainer(self.modelo)
+            backend_explicacao = configuracoes.modelo.backend_explicacao
+            registrador.info(f"Inicializando explainer SHAP (backend: {backend_explicacao})...")
+            self.explicador = criar_explicador(self.modelo, backend_explicacao)
+            
+            # Resultados em cache pertencem ao modelo anterior
+            self._criar_caches()
             
             self._carregado = True
             registrador.info("Modelo carregado com sucesso")
@@ -107,89 +280,352 @@ class PreditorEvasaoEstudantil:
         if len(features_disponives) == 0:
             raise ValueError("Nenhuma feature esperada encontrada nos dados")
         
-        df_processado = df[features_disponives].copy()
-        
-        # Aplicar label encoders
-        for coluna, encoder in self.codificadores_rotulos.items():
-            if coluna in df_processado.columns:
-                # Primeiro, preencher valores NaN com valor padrão
-                valor_default = encoder.classes_[0] if len(encoder.classes_) > 0 else 'DESCONHECIDO'
-                df_processado[coluna] = df_processado[coluna].fillna(valor_default)
-                
-                # Converter para string e tratar 'nan' string
-                df_processado[coluna] = df_processado[coluna].astype(str)
-                df_processado[coluna] = df_processado[coluna].replace('nan', valor_default)
-                
-                # Verificar valores únicos após tratamento
-                valores_unicos = df_processado[coluna].unique()
-                valores_novos = set(valores_unicos) - set(encoder.classes_)
-                
-                if valores_novos:
-                    registrador.warning(f"Valores novos em {coluna}: {valores_novos}")
-                    # Substituir valores desconhecidos por valor padrão
-                    mask = ~df_processado[coluna].isin(encoder.classes_)
-                    df_processado.loc[mask, coluna] = valor_default
-                
-                df_processado[coluna] = encoder.transform(df_processado[coluna])
-        
-        # Aplicar imputadores
-        for coluna, imputador in self.imputadores.items():
-            if coluna in df_processado.columns:
-                valores_originais = df_processado[coluna].values.reshape(-1, 1)
-                valores_imputados = imputador.transform(valores_originais)
-                df_processado[coluna] = valores_imputados.flatten()
-        
-        # Garantir que todas as colunas estejam em formato numérico
-        # Tratar colunas que ainda são objeto (string)
-        for coluna in df_processado.columns:
-            if df_processado[coluna].dtype == 'object':
-                registrador.warning(f"Coluna {coluna} ainda é tipo object. Convertendo para numérico.")
-                # Tentar converter diretamente para numérico
-                try:
-                    df_processado[coluna] = pd.to_numeric(df_processado[coluna], errors='coerce')
-                    # Se houve valores NaN após conversão, preencher com 0
-                    if df_processado[coluna].isnull().any():
-                        df_processado[coluna] = df_processado[coluna].fillna(0)
-                except:
-                    # Se falhou, usar label encoder simples
-                    from sklearn.preprocessing import LabelEncoder
-                    le = LabelEncoder()
-                    df_processado[coluna] = df_processado[coluna].fillna('DESCONHECIDO')
-                    df_processado[coluna] = le.fit_transform(df_processado[coluna].astype(str))
+        # Codificar, converter e imputar em uma única matriz float32
+        df_processado = self.pipeline_preprocessamento.transformar(df, features_disponives)
         
         registrador.info(f"Dados pré-processados: {df_processado.shape}")
         return df_processado
     
-    def fazer_predicoes(self, df: pd.DataFrame) -> Tuple[List[str], List[List[float]], np.ndarray]:
+    def fazer_predicoes(self, df: pd.DataFrame, largura_top_k: Optional[int] = None,
+                        calcular_shap: bool = True,
+                        linhas: Optional[np.ndarray] = None) -> ResultadoModelo:
         """
         Faz predições para um DataFrame.
         
+        O predict_proba e o SHAP rodam uma vez por vetor de features distinto
+        (configuracoes.modelo.deduplicar_linhas) e os resultados são
+        espalhados para todos os alunos; vetores já avaliados neste processo
+        vêm do cache LRU (configuracoes.modelo.tamanho_cache_predicoes).
+        
         Args:
             df: DataFrame com dados processados
+            largura_top_k: Quantas classes mais prováveis retornar por aluno
+                (padrão: configuracoes.modelo.largura_top_k)
+            calcular_shap: Se False, os valores SHAP não são calculados e
+                podem ser obtidos depois só para parte dos alunos com
+                explicar_predicoes()
+            linhas: Posições dos alunos que passam pelo modelo (padrão: todos);
+                os demais ficam sem predição no resultado (ver ResultadoModelo.expandir)
             
         Returns:
-            Tuple com (predições, probabilidades, valores SHAP)
+            ResultadoModelo com predições, probabilidades, top-k e valores SHAP
         """
         if not self._carregado:
             raise RuntimeError("Modelo não foi carregado. Chame carregar_modelo() primeiro.")
         
+        if linhas is not None:
+            linhas = np.asarray(linhas, dtype=np.intp)
+            resultado_linhas = self.fazer_predicoes(df.iloc[linhas], largura_top_k, calcular_shap)
+            return resultado_linhas.expandir(linhas, len(df))
+        
+        if largura_top_k is None:
+            largura_top_k = configuracoes.modelo.largura_top_k
+        
         registrador.info(f"Fazendo predições para {len(df)} amostras...")
         
-        # Fazer predições
-        predicoes_indices = self.modelo.predict(df)
-        probabilidades = self.modelo.predict_proba(df)
+        # Alunos com o mesmo vetor de features passam uma única vez pelo modelo
+        primeiras, inverso, chaves = self._agrupar_linhas(df)
+        df_unicas = df.iloc[primeiras]
+        if len(primeiras) < len(df):
+            registrador.info(f"{len(primeiras)} vetores de features distintos em {len(df)} amostras")
+        
+        # Fazer predições (a classe prevista é o argmax do predict_proba)
+        with medir_etapa('predict', linhas=len(df)):
+            probabilidades_unicas, acertos_cache = self.cache_probabilidades.avaliar(
+                chaves, df_unicas, lambda X: np.asarray(self.modelo.predict_proba(X))
+            )
+            indices_top, probabilidades_top = self.extrair_top_k(probabilidades_unicas, largura_top_k)
+            classes_unicas = np.argmax(probabilidades_unicas, axis=1)
         
         # Converter índices para nomes de classes
-        nomes_classes = self.modelo.classes_
-        predicoes = [nomes_classes[idx] for idx in predicoes_indices]
+        nomes_classes = np.asarray(self.modelo.classes_)
+        predicoes = nomes_classes[classes_unicas]
         
         # Calcular valores SHAP
-        registrador.info("Calculando valores SHAP...")
-        valores_shap = self.explicador.shap_values(df)
+        valores_shap = None
+        fatores_shap = None
+        if calcular_shap:
+            registrador.info("Calculando valores SHAP...")
+            fatores_shap, valores_shap = self._explicar_linhas_unicas(df_unicas, chaves, classes_unicas)
+            fatores_shap = fatores_shap.selecionar(inverso)
+            valores_shap = None if valores_shap is None else valores_shap[inverso]
         
         registrador.info("Predições concluídas")
         
-        return predicoes, probabilidades.tolist(), valores_shap
+        return ResultadoModelo(
+            predicoes=predicoes[inverso],
+            probabilidades=probabilidades_unicas[inverso],
+            indices_top=indices_top[inverso],
+            probabilidades_top=probabilidades_top[inverso],
+            valores_shap=valores_shap,
+            fatores_shap=fatores_shap,
+            linhas_avaliadas=len(df),
+            linhas_unicas=len(primeiras),
+            acertos_cache=acertos_cache
+        )
+    
+    def _criar_caches(self) -> None:
+        """Cria os caches LRU de probabilidades e de valores SHAP."""
+        capacidade = configuracoes.modelo.tamanho_cache_predicoes
+        self.cache_probabilidades = CachePredicoes(capacidade)
+        self.cache_shap = CachePredicoes(capacidade)
+    
+    def _agrupar_linhas(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, List[bytes]]:
+        """
+        Agrupa os alunos com o mesmo vetor de features codificado.
+        
+        Returns:
+            Tuple com (posição do primeiro aluno de cada vetor distinto,
+            vetor distinto de cada aluno, chave de cache de cada vetor)
+        """
+        matriz = np.ascontiguousarray(df.to_numpy())
+        if configuracoes.modelo.deduplicar_linhas:
+            primeiras, inverso = agrupar_linhas_identicas(matriz)
+        else:
+            primeiras = inverso = np.arange(len(df))
+        
+        chaves = []
+        if self.cache_probabilidades.capacidade or self.cache_shap.capacidade:
+            # As colunas fazem parte da chave: entradas sem alguma feature geram outra matriz
+            prefixo = '\x1f'.join(map(str, df.columns)).encode('utf-8') + b'\x1e'
+            chaves = [prefixo + matriz[posicao].tobytes() for posicao in primeiras]
+        return primeiras, inverso, chaves
+    
+    def _explicar_linhas_unicas(self, df_unicas: pd.DataFrame, chaves: List[bytes],
+                                indices_classe: Optional[np.ndarray]) -> Tuple[FatoresShap, Optional[np.ndarray]]:
+        """Calcula os valores SHAP (com cache) e os fatores de vetores de features distintos."""
+        with medir_etapa('shap', linhas=len(df_unicas)):
+            try:
+                valores_shap, _ = self.cache_shap.avaliar(
+                    chaves, df_unicas, lambda X: self.normalizar_valores_shap(self.explicador.shap_values(X))
+                )
+            except ValueError as e:
+                # Se houver algum erro com SHAP, usar valores padrão
+                registrador.warning(f"Erro ao processar valores SHAP: {e}")
+                return FatoresShap(
+                    fator_principal=np.full(len(df_unicas), 'N/A', dtype=object),
+                    valor_importancia=np.zeros(len(df_unicas))
+                ), None
+            
+            fatores = self.extrair_fatores_shap(valores_shap, df_unicas.columns.tolist(), indices_classe=indices_classe)
+        return fatores, valores_shap
+    
+    @staticmethod
+    def extrair_top_k(probabilidades: np.ndarray, largura: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Extrai as k classes mais prováveis de cada linha de uma só vez.
+        
+        O resultado é o mesmo de argsort(-probabilidades, kind='stable')[:, :k]:
+        empates, inclusive na k-ésima posição, ficam com o menor índice da
+        classe. Com poucas colunas (até COLUNAS_ORDENACAO_COMPLETA) a ordenação
+        completa é a mais rápida; com mais, partition acha a k-ésima maior
+        probabilidade sem ordenar a linha inteira e só as k colunas escolhidas
+        são ordenadas.
+        
+        Args:
+            probabilidades: Matriz (n_amostras, n_classes) do predict_proba
+            largura: Quantidade de classes a retornar
+            
+        Returns:
+            Tuple com (índices, probabilidades), ambos (n_amostras, k)
+        """
+        total_amostras, total_classes = probabilidades.shape
+        largura = max(0, min(largura, total_classes))
+        
+        if largura == 0:
+            return (np.empty((total_amostras, 0), dtype=np.intp),
+                    np.empty((total_amostras, 0), dtype=probabilidades.dtype))
+        
+        if total_classes <= COLUNAS_ORDENACAO_COMPLETA or np.isnan(probabilidades).any():
+            # NaN não tem posição na partição; também fica com a ordenação completa
+            indices_top = np.argsort(-probabilidades, axis=1, kind='stable')[:, :largura]
+            return indices_top, np.take_along_axis(probabilidades, indices_top, axis=1)
+        
+        if largura < total_classes:
+            # Todas as classes acima da k-ésima probabilidade e, das empatadas com
+            # ela, as de menor índice até completar k (argpartition escolheria qualquer uma)
+            limiar = -np.partition(-probabilidades, largura - 1, axis=1)[:, largura - 1:largura]
+            acima = probabilidades > limiar
+            empatadas = probabilidades == limiar
+            vagas = largura - acima.sum(axis=1, keepdims=True)
+            escolhidas = acima | (empatadas & (np.cumsum(empatadas, axis=1) <= vagas))
+            candidatos = np.nonzero(escolhidas)[1].reshape(total_amostras, largura)
+        else:
+            candidatos = np.broadcast_to(np.arange(total_classes), probabilidades.shape)
+        
+        probabilidades_candidatos = np.take_along_axis(probabilidades, candidatos, axis=1)
+        ordem = np.argsort(-probabilidades_candidatos, axis=1, kind='stable')
+        
+        indices_top = np.take_along_axis(candidatos, ordem, axis=1)
+        probabilidades_top = np.take_along_axis(probabilidades_candidatos, ordem, axis=1)
+        return indices_top, probabilidades_top
+    
+    def explicar_predicoes(self, df: pd.DataFrame, linhas: np.ndarray,
+                           indices_classe: Optional[np.ndarray] = None) -> FatoresShap:
+        """
+        Calcula os fatores SHAP apenas para as linhas informadas.
+        
+        O explicador roda somente sobre o subconjunto; as demais linhas
+        recebem fator 'N/A' e valor 0, como quando o SHAP não está disponível.
+        
+        Args:
+            df: DataFrame com dados processados (todos os alunos)
+            linhas: Posições das linhas a explicar
+            indices_classe: Classe de referência de cada aluno (todas as linhas)
+            
+        Returns:
+            FatoresShap alinhado a todas as linhas de df
+        """
+        if not self._carregado:
+            raise RuntimeError("Modelo não foi carregado. Chame carregar_modelo() primeiro.")
+        
+        linhas = np.asarray(linhas, dtype=np.intp)
+        total = len(df)
+        if len(linhas) == 0:
+            return FatoresShap(
+                fator_principal=np.full(total, 'N/A', dtype=object),
+                valor_importancia=np.zeros(total),
+                linhas_explicadas=linhas
+            )
+        
+        registrador.info(f"Calculando valores SHAP para {len(linhas)} de {total} amostras...")
+        df_linhas = df.iloc[linhas]
+        primeiras, inverso, chaves = self._agrupar_linhas(df_linhas)
+        classes_unicas = None if indices_classe is None else np.asarray(indices_classe)[linhas][primeiras]
+        fatores_unicos, _ = self._explicar_linhas_unicas(df_linhas.iloc[primeiras], chaves, classes_unicas)
+        
+        return fatores_unicos.selecionar(inverso).expandir(linhas, total)
+    
+    @staticmethod
+    def normalizar_valores_shap(valores_shap: Any) -> np.ndarray:
+        """
+        Converte os valores SHAP para um tensor (n_amostras, n_features, n_classes).
+        
+        Aceita os formatos retornados pelo shap: lista com uma matriz
+        (n_amostras, n_features) por classe, array 3D já no formato acima ou
+        array 2D de modelos binários.
+        
+        Args:
+            valores_shap: Valores SHAP em qualquer um dos formatos
+            
+        Returns:
+            Tensor 3D de valores SHAP
+        """
+        if isinstance(valores_shap, list):
+            return np.stack([np.asarray(valores_classe) for valores_classe in valores_shap], axis=-1)
+        
+        tensor = np.asarray(valores_shap)
+        if tensor.ndim == 2:
+            return tensor[:, :, np.newaxis]
+        if tensor.ndim != 3:
+            raise ValueError(f"Formato de valores SHAP não suportado: {tensor.shape}")
+        return tensor
+    
+    @classmethod
+    def extrair_fatores_shap(cls, valores_shap: Any, nomes_features: List[str],
+                             indices_classe: Optional[np.ndarray] = None,
+                             quantidade_contribuintes: Optional[int] = None) -> FatoresShap:
+        """
+        Extrai o fator principal e os maiores contribuintes SHAP de todos os alunos.
+        
+        O fator principal é a feature cujo valor SHAP tem a maior magnitude
+        em qualquer classe; o valor retornado mantém o sinal dessa entrada.
+        Tudo é calculado com uma única redução sobre o tensor completo.
+        
+        Args:
+            valores_shap: Valores SHAP no formato retornado pelo explicador
+            nomes_features: Nomes das features, na ordem das colunas
+            indices_classe: Classe de referência de cada aluno para os
+                contribuintes positivos/negativos (padrão: entrada de maior
+                magnitude de cada feature)
+            quantidade_contribuintes: Quantos contribuintes positivos e
+                negativos retornar (padrão: configuracoes.modelo.quantidade_contribuintes_shap)
+                
+        Returns:
+            FatoresShap com arrays alinhados às linhas de entrada
+        """
+        if quantidade_contribuintes is None:
+            quantidade_contribuintes = configuracoes.modelo.quantidade_contribuintes_shap
+        
+        try:
+            tensor = cls.normalizar_valores_shap(valores_shap)
+        except Exception as e:
+            # Se houver algum erro com SHAP, usar valores padrão
+            registrador.warning(f"Erro ao processar valores SHAP: {e}")
+            total = len(indices_classe) if indices_classe is not None else 0
+            return FatoresShap(
+                fator_principal=np.full(total, 'N/A', dtype=object),
+                valor_importancia=np.zeros(total)
+            )
+        
+        total_amostras, total_features, total_classes = tensor.shape
+        linhas = np.arange(total_amostras)
+        
+        # Entrada (feature, classe) de maior magnitude em cada linha
+        if total_features * total_classes > 0:
+            posicoes = np.abs(tensor).reshape(total_amostras, -1).argmax(axis=1)
+        else:
+            posicoes = np.zeros(total_amostras, dtype=np.intp)
+        indices_feature, indices_classe_max = np.divmod(posicoes, max(total_classes, 1))
+        
+        validos = (indices_feature < len(nomes_features)) & (total_features * total_classes > 0)
+        nomes = np.asarray(list(nomes_features) + ['N/A'], dtype=object)
+        fator_principal = nomes[np.where(validos, indices_feature, len(nomes_features))]
+        valor_importancia = np.zeros(total_amostras)
+        if validos.any():
+            valor_importancia[validos] = tensor[linhas[validos], indices_feature[validos], indices_classe_max[validos]]
+        
+        fatores = FatoresShap(fator_principal=fator_principal, valor_importancia=valor_importancia)
+        
+        if quantidade_contribuintes > 0 and total_features > 0:
+            if indices_classe is not None and total_classes > 1:
+                contribuicoes = tensor[linhas, :, np.asarray(indices_classe)]
+            else:
+                # Valor com sinal da classe de maior magnitude de cada feature
+                classe_por_feature = np.abs(tensor).argmax(axis=2)
+                contribuicoes = np.take_along_axis(tensor, classe_por_feature[:, :, np.newaxis], axis=2)[:, :, 0]
+            
+            (fatores.indices_positivos,
+             fatores.valores_positivos) = cls._extrair_contribuintes(contribuicoes, quantidade_contribuintes)
+            (fatores.indices_negativos,
+             fatores.valores_negativos) = cls._extrair_contribuintes(-contribuicoes, quantidade_contribuintes)
+            fatores.valores_negativos = -fatores.valores_negativos
+        
+        return fatores
+    
+    @classmethod
+    def _extrair_contribuintes(cls, contribuicoes: np.ndarray, quantidade: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Seleciona as maiores contribuições estritamente positivas de cada linha."""
+        indices, valores = cls.extrair_top_k(contribuicoes, quantidade)
+        sem_contribuicao = ~(valores > 0)
+        indices = np.where(sem_contribuicao, -1, indices)
+        valores = np.where(sem_contribuicao, np.nan, valores)
+        return indices, valores
+    
+    def obter_nomes_classes(self) -> List[str]:
+        """
+        Retorna os nomes das classes usados para exibir o top-k do modelo.
+        
+        Returns:
+            Lista de nomes, calculada uma única vez em carregar_modelo()
+        """
+        return self.nomes_classes
+    
+    @staticmethod
+    def _extrair_nomes_classes(info_classes: Any) -> List[str]:
+        """Extrai a lista de nomes de classes do mapeamento carregado."""
+        # Usar as classes reais do modelo - verificar diferentes chaves possíveis
+        if info_classes:
+            if 'class_names' in info_classes:
+                return list(info_classes['class_names'])
+            elif 'classes' in info_classes:
+                return list(info_classes['classes'])
+            elif 'situacao_mapping' in info_classes:
+                return list(info_classes['situacao_mapping'].values())
+            else:
+                # Usar as chaves do próprio dicionário
+                return list(info_classes.keys()) if isinstance(info_classes, dict) else ['Classe_0', 'Classe_1', 'Classe_2', 'Classe_3', 'Classe_4', 'Classe_5']
+        return ['Classe_0', 'Classe_1', 'Classe_2', 'Classe_3', 'Classe_4', 'Classe_5']
     
     def obter_feature_importance(self) -> Dict[str, float]:
         """
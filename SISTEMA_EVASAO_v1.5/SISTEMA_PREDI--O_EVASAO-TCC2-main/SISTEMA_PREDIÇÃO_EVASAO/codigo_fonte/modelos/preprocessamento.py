@@ -0,0 +1,158 @@
+﻿"""
+Pipeline de pré-processamento compilado para o modelo de evasão.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ..utilitarios import obter_registrador, aplicar_por_valor_unico, AMOSTRAR
+
+registrador = obter_registrador(__name__)
+
+def converter_coluna_numerica(serie: pd.Series, ausente_como_zero: bool = True) -> pd.Series:
+    """
+    Converte uma feature numérica, possivelmente lida como texto, em float64.
+    
+    Texto não numérico vira 0, inclusive 'INF' e 'NaN' (um código de curso
+    'INF' viraria infinito e derrubaria o SHAP do lote). Cada valor é
+    convertido sozinho, então a mesma linha recebe o mesmo número qualquer
+    que seja o resto da coluna (arquivo inteiro, bloco em streaming ou
+    micro-lote do serviço).
+    
+    Args:
+        serie: Coluna com os valores da planilha
+        ausente_como_zero: Valores ausentes também viram 0; com False
+            continuam NaN (ramo de ausente do XGBoost)
+            
+    Returns:
+        Série float64 alinhada ao índice da original
+    """
+    numeros = pd.to_numeric(serie, errors='coerce').astype(np.float64)
+    numeros = numeros.mask(np.isinf(numeros), 0.0)
+    if ausente_como_zero:
+        return numeros.fillna(0)
+    return numeros.mask(numeros.isna() & serie.notna(), 0.0)
+
+@dataclass
+class PipelinePreprocessamento:
+    """
+    Pré-processamento das features montado uma única vez a partir dos artifacts.
+    
+    Cada coluna categórica é convertida por um dicionário categoria→código
+    equivalente ao LabelEncoder treinado (valores ausentes e desconhecidos
+    recebem o código da primeira classe), a imputação é feita em um único
+    passo sobre a matriz e a saída é uma matriz float32 contígua.
+    """
+    mapas_categorias: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    valores_imputacao: Dict[str, float] = field(default_factory=dict)
+    imputadores_coluna: Dict[str, Any] = field(default_factory=dict)
+    
+    @classmethod
+    def compilar(cls, codificadores_rotulos: Dict[str, Any],
+                 imputadores: Dict[str, Any]) -> 'PipelinePreprocessamento':
+        """
+        Monta o pipeline a partir dos label encoders e imputadores treinados.
+        
+        Args:
+            codificadores_rotulos: LabelEncoders por coluna
+            imputadores: Imputadores por coluna
+            
+        Returns:
+            Pipeline pronto para transformar DataFrames
+        """
+        pipeline = cls()
+        
+        for coluna, encoder in codificadores_rotulos.items():
+            # LabelEncoder.transform retorna a posição do valor em classes_
+            pipeline.mapas_categorias[coluna] = {
+                str(classe): codigo for codigo, classe in enumerate(encoder.classes_)
+            }
+        
+        for coluna, imputador in imputadores.items():
+            estatisticas = getattr(imputador, 'statistics_', None)
+            valor_ausente = getattr(imputador, 'missing_values', np.nan)
+            if (estatisticas is not None and len(estatisticas) == 1
+                    and isinstance(valor_ausente, float) and np.isnan(valor_ausente)):
+                pipeline.valores_imputacao[coluna] = float(estatisticas[0])
+            else:
+                pipeline.imputadores_coluna[coluna] = imputador
+        
+        return pipeline
+    
+    def transformar(self, df: pd.DataFrame, features: List[str]) -> pd.DataFrame:
+        """
+        Converte as features do DataFrame na matriz de entrada do modelo.
+        
+        Args:
+            df: DataFrame com dados brutos
+            features: Colunas a usar, na ordem esperada pelo modelo
+            
+        Returns:
+            DataFrame float32 apoiado em uma única matriz contígua
+        """
+        matriz = np.empty((len(df), len(features)), dtype=np.float32)
+        
+        for posicao, coluna in enumerate(features):
+            serie = df[coluna]
+            if coluna in self.mapas_categorias:
+                matriz[:, posicao] = self._codificar_categorias(serie, coluna)
+            elif pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+                matriz[:, posicao] = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                # Repete a cada lote do serviço e a cada bloco em streaming: amostrado
+                registrador.warning("Coluna %s ainda é tipo object. Convertendo para numérico.", coluna,
+                                    extra=AMOSTRAR)
+                matriz[:, posicao] = self._converter_numerico(serie)
+        
+        # Imputação vetorizada: um valor de preenchimento por coluna
+        posicoes = [posicao for posicao, coluna in enumerate(features) if coluna in self.valores_imputacao]
+        if posicoes:
+            preenchimento = np.array([self.valores_imputacao[features[posicao]] for posicao in posicoes],
+                                     dtype=np.float32)
+            bloco = matriz[:, posicoes]
+            matriz[:, posicoes] = np.where(np.isnan(bloco), preenchimento, bloco)
+        
+        for posicao, coluna in enumerate(features):
+            if coluna in self.imputadores_coluna:
+                valores_imputados = self.imputadores_coluna[coluna].transform(matriz[:, [posicao]])
+                matriz[:, posicao] = np.asarray(valores_imputados, dtype=np.float32).ravel()
+        
+        return pd.DataFrame(matriz, columns=features, index=df.index, copy=False)
+    
+    def _codificar_categorias(self, serie: pd.Series, coluna: str) -> np.ndarray:
+        """Converte uma coluna categórica em códigos, uma vez por valor distinto."""
+        mapa = self.mapas_categorias[coluna]
+        codigo_padrao = 0
+        valores_novos = set()
+        
+        def codificar(valor: Any) -> int:
+            if pd.isna(valor):
+                return codigo_padrao
+            chave = str(valor)
+            if chave == 'nan':
+                return codigo_padrao
+            codigo = mapa.get(chave)
+            if codigo is None:
+                valores_novos.add(chave)
+                return codigo_padrao
+            return codigo
+        
+        codigos = aplicar_por_valor_unico(serie, codificar, tipo=np.int64)
+        
+        if valores_novos:
+            registrador.warning("Valores novos em %s: %s", coluna, valores_novos, extra=AMOSTRAR)
+        return codigos
+    
+    @staticmethod
+    def _converter_numerico(serie: pd.Series) -> np.ndarray:
+        """Converte uma coluna texto em número; valores inválidos viram 0."""
+        try:
+            return converter_coluna_numerica(serie).to_numpy(dtype=np.float64)
+        except (TypeError, ValueError):
+            # Se falhou, usar códigos de categoria em ordem alfabética
+            texto = serie.fillna('DESCONHECIDO').astype(str)
+            _, codigos = np.unique(texto.to_numpy(), return_inverse=True)
+            return codigos.astype(np.float64)
@@ -2,9 +2,25 @@
 Módulo núcleo do sistema.
 """
 
-from .preditor import SistemaPredicaoEvasao, PredicaoAluno
+from .preditor import SistemaPredicaoEvasao, MODOS_EXPLICACAO, MODOS_INFERENCIA
+from .resultados import PredicaoAluno, ResultadoPredicoes, COLUNAS_EXPORTACAO
+from .estado_execucao import EstadoExecucao
+from .historico import HistoricoPredicoes
+from .registro import RegistroSistemas, obter_sistema_predicao
+from .servico import ServicoPredicao, ServicoSobrecarregado, criar_servidor
 
 __all__ = [
     'SistemaPredicaoEvasao',
-    'PredicaoAluno'
+    'MODOS_EXPLICACAO',
+    'MODOS_INFERENCIA',
+    'PredicaoAluno',
+    'ResultadoPredicoes',
+    'COLUNAS_EXPORTACAO',
+    'EstadoExecucao',
+    'HistoricoPredicoes',
+    'RegistroSistemas',
+    'obter_sistema_predicao',
+    'ServicoPredicao',
+    'ServicoSobrecarregado',
+    'criar_servidor'
 ]
\ No newline at end of file
@@ -0,0 +1,336 @@
+﻿"""
+Estado das execuções anteriores, usado na re-predição incremental.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utilitarios import obter_registrador
+from ..configuracao import configuracoes
+from ..modelos import FatoresShap
+from .resultados import ResultadoPredicoes
+
+registrador = obter_registrador(__name__)
+
+# Incrementar quando o formato da tabela de estado mudar
+VERSAO_ESTADO = 1
+
+# Estados mantidos por base (modos de execução e tipos de entrada diferentes)
+MAXIMO_VARIANTES_ESTADO = 8
+
+# Espera pela trava de gravação e idade a partir da qual ela é considerada abandonada
+ESPERA_TRAVA_S = 10.0
+TRAVA_ABANDONADA_S = 300.0
+
+# Colunas de ResultadoPredicoes.dados, na ordem de _montar_resultado
+COLUNAS_DADOS = [
+    'nome', 'matricula', 'situacao_atual', 'curso', 'sexo', 'turma', 'status_predicao',
+    'situacao_predita', 'probabilidade_situacao', 'nivel_urgencia', 'fator_principal',
+    'valor_importancia', 'fonte_predicao', 'regra_aplicada'
+]
+
+# Atributos matriciais de FatoresShap guardados coluna a coluna
+ATRIBUTOS_SHAP = ('indices_positivos', 'valores_positivos', 'indices_negativos', 'valores_negativos')
+
+class EstadoExecucao:
+    """
+    Última predição de cada aluno, indexada pela matrícula.
+    
+    Cada linha guarda o resultado colunar do aluno (dados, top-k ML e
+    fatores SHAP) e o hash das colunas lidas da planilha. Na execução
+    seguinte, alunos com o mesmo hash reaproveitam o resultado e só os
+    novos ou alterados passam por regras, modelo e SHAP.
+    
+    O arquivo é nomeado pela assinatura em duas partes: a base (modelo,
+    configurações e regras) e a variante (modos da execução, colunas e
+    tipos das features). Uma mudança na base invalida todos os estados
+    gravados; variantes diferentes da mesma base convivem, até
+    MAXIMO_VARIANTES_ESTADO. As gravações são serializadas por uma trava
+    no diretório, e cada uma mescla suas linhas ao estado atual do disco,
+    de modo que execuções paralelas não descartam o trabalho umas das outras.
+    """
+    
+    def __init__(self, diretorio: Optional[Path] = None):
+        """
+        Inicializa o estado.
+        
+        Args:
+            diretorio: Diretório dos arquivos de estado (padrão: data/processed/estado_execucao)
+        """
+        if diretorio is None:
+            diretorio = configuracoes.dados.diretorio_dados_processados / "estado_execucao"
+        self.diretorio = Path(diretorio)
+    
+    @staticmethod
+    def calcular_hashes(df: pd.DataFrame) -> np.ndarray:
+        """
+        Calcula o hash de cada linha a partir de todas as colunas lidas.
+        
+        Args:
+            df: DataFrame de alunos
+            
+        Returns:
+            Array uint64 com um hash por linha
+        """
+        return pd.util.hash_pandas_object(df, index=False).to_numpy()
+    
+    @staticmethod
+    def calcular_assinatura(sistema: Any, df: pd.DataFrame, modo_explicacao: str,
+                            modo_inferencia: str) -> str:
+        """
+        Calcula a assinatura do que, além da linha do aluno, determina sua predição.
+        
+        A base inclui os arquivos do modelo e da grade curricular, as
+        configurações de modelo e de regras, as de dados que mudam a entrada
+        do modelo (features esperadas e features com ausente igual a 0) e os
+        arquivos-fonte do motor de regras. A variante inclui os modos da execução, as colunas do
+        DataFrame e os tipos das features do modelo, já normalizados por
+        converter_features_numericas (o pré-processamento depende do tipo).
+        
+        Args:
+            sistema: SistemaPredicaoEvasao inicializado
+            df: DataFrame de alunos
+            modo_explicacao: Modo de explicação SHAP da execução
+            modo_inferencia: Modo de inferência da execução
+            
+        Returns:
+            'base_variante', cada parte em hexadecimal
+        """
+        from .registro import RegistroSistemas
+        
+        caminho_modelo = Path(sistema.caminho_modelo or configuracoes.obter_caminho_modelo())
+        fontes_regras = Path(__file__).resolve().parent.parent / "regras_negocio"
+        estado_fontes = [
+            (arquivo.name, arquivo.stat().st_mtime_ns, arquivo.stat().st_size)
+            for arquivo in sorted(fontes_regras.glob("*.py"))
+        ]
+        
+        base = [
+            VERSAO_ESTADO,
+            RegistroSistemas.calcular_assinatura(caminho_modelo.resolve()),
+            asdict(configuracoes.modelo),
+            asdict(configuracoes.regras_negocio),
+            {
+                'caracteristicas_esperadas': configuracoes.dados.caracteristicas_esperadas,
+                'features_ausente_zero': configuracoes.dados.features_ausente_zero
+            },
+            estado_fontes
+        ]
+        features = set(configuracoes.dados.caracteristicas_esperadas)
+        variante = [
+            modo_explicacao,
+            modo_inferencia,
+            [str(coluna) for coluna in df.columns],
+            [(str(coluna), str(tipo)) for coluna, tipo in df.dtypes.items() if coluna in features]
+        ]
+        return f"{_resumir(base)[:16]}_{_resumir(variante)[:16]}"
+    
+    def carregar(self, assinatura: str) -> Optional[pd.DataFrame]:
+        """
+        Lê a tabela de estado da assinatura, se existir.
+        
+        Args:
+            assinatura: Assinatura calculada por calcular_assinatura
+            
+        Returns:
+            Tabela de estado ou None
+        """
+        caminho_parquet, caminho_pickle = self._caminhos(assinatura)
+        try:
+            if caminho_parquet.exists():
+                return pd.read_parquet(caminho_parquet)
+            if caminho_pickle.exists():
+                with open(caminho_pickle, 'rb') as arquivo:
+                    return pickle.load(arquivo)
+        except Exception as e:
+            registrador.warning(f"Estado de execução inválido ({assinatura[:12]}), ignorando: {e}")
+        return None
+    
+    def salvar(self, assinatura: str, tabela: pd.DataFrame) -> None:
+        """
+        Mescla as linhas ao estado gravado da assinatura e remove estados invalidados.
+        
+        O estado é relido sob a trava, então linhas gravadas por outra
+        execução desde o carregamento são preservadas. Sem a trava, a
+        gravação é pulada: o estado é só um atalho para a próxima execução.
+        
+        Args:
+            assinatura: Assinatura calculada por calcular_assinatura
+            tabela: Linhas novas ou alteradas (de tabela_de_resultado)
+        """
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        with self._travar() as travado:
+            if not travado:
+                registrador.warning("Estado de execução em uso por outro processo; gravação ignorada")
+                return
+            
+            atual = self.carregar(assinatura)
+            if atual is not None and len(atual):
+                tabela = pd.concat([atual, tabela], ignore_index=True)
+            tabela = tabela.drop_duplicates('matricula', keep='last').reset_index(drop=True)
+            
+            caminho_parquet, caminho_pickle = self._caminhos(assinatura)
+            caminho_temporario = self.diretorio / f"{caminho_parquet.stem}.{os.getpid()}.tmp"
+            try:
+                tabela.to_parquet(caminho_temporario)
+                os.replace(caminho_temporario, caminho_parquet)
+                caminho_pickle.unlink(missing_ok=True)
+            except Exception as e:
+                registrador.debug(f"Parquet indisponível para o estado de execução: {e}")
+                with open(caminho_temporario, 'wb') as arquivo:
+                    pickle.dump(tabela, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(caminho_temporario, caminho_pickle)
+            
+            self._remover_invalidados(assinatura)
+    
+    def _remover_invalidados(self, assinatura: str) -> None:
+        """Remove estados de outra base e as variantes mais antigas da base atual."""
+        base = assinatura.split('_')[0]
+        variantes = []
+        for arquivo in self._listar_arquivos():
+            if arquivo.stem.split('_')[1] != base:
+                arquivo.unlink(missing_ok=True)
+                registrador.debug(f"Estado de execução invalidado removido: {arquivo.name}")
+            else:
+                variantes.append(arquivo)
+        
+        variantes.sort(key=lambda arquivo: arquivo.stat().st_mtime, reverse=True)
+        for arquivo in variantes[MAXIMO_VARIANTES_ESTADO:]:
+            arquivo.unlink(missing_ok=True)
+            registrador.debug(f"Estado de execução antigo removido: {arquivo.name}")
+    
+    @contextmanager
+    def _travar(self) -> Iterator[bool]:
+        """Trava de gravação entre processos (arquivo criado com O_EXCL)."""
+        caminho_trava = self.diretorio / "estado.lock"
+        limite = time.monotonic() + ESPERA_TRAVA_S
+        while True:
+            try:
+                os.close(os.open(caminho_trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - caminho_trava.stat().st_mtime > TRAVA_ABANDONADA_S:
+                        caminho_trava.unlink(missing_ok=True)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() >= limite:
+                    yield False
+                    return
+                time.sleep(0.05)
+        
+        try:
+            yield True
+        finally:
+            caminho_trava.unlink(missing_ok=True)
+    
+    def limpar(self) -> int:
+        """
+        Remove todos os arquivos de estado.
+        
+        Returns:
+            Quantidade de arquivos removidos
+        """
+        removidos = 0
+        for arquivo in self._listar_arquivos():
+            arquivo.unlink(missing_ok=True)
+            removidos += 1
+        registrador.info(f"Estado de execução limpo: {removidos} arquivos removidos")
+        return removidos
+    
+    @staticmethod
+    def tabela_de_resultado(resultado: ResultadoPredicoes, hashes: np.ndarray) -> pd.DataFrame:
+        """
+        Achata um resultado colunar em uma tabela com uma linha por aluno.
+        
+        Args:
+            resultado: Resultado das predições
+            hashes: Hash da linha de entrada de cada aluno
+            
+        Returns:
+            Tabela de estado
+        """
+        colunas = {coluna: resultado.dados[coluna].to_numpy() for coluna in resultado.dados.columns}
+        for posicao in range(resultado.indices_top.shape[1]):
+            colunas[f'top_indice_{posicao}'] = resultado.indices_top[:, posicao]
+            colunas[f'top_probabilidade_{posicao}'] = resultado.probabilidades_top[:, posicao]
+        
+        fatores = resultado.fatores_shap
+        explicado = np.ones(len(resultado), dtype=bool)
+        if fatores.linhas_explicadas is not None:
+            explicado[:] = False
+            explicado[fatores.linhas_explicadas] = True
+        colunas['shap_explicado'] = explicado
+        colunas['shap_fator_principal'] = fatores.fator_principal
+        colunas['shap_valor_importancia'] = fatores.valor_importancia
+        for atributo in ATRIBUTOS_SHAP:
+            valores = getattr(fatores, atributo)
+            if valores is not None:
+                for posicao in range(valores.shape[1]):
+                    colunas[f'shap_{atributo}_{posicao}'] = valores[:, posicao]
+        
+        colunas['hash_linha'] = np.asarray(hashes, dtype=np.uint64)
+        return pd.DataFrame(colunas)
+    
+    @staticmethod
+    def resultado_de_tabela(tabela: pd.DataFrame, nomes_classes: List[str]) -> ResultadoPredicoes:
+        """
+        Reconstrói o resultado colunar a partir de linhas da tabela de estado.
+        
+        Args:
+            tabela: Linhas da tabela de estado, na ordem desejada
+            nomes_classes: Nomes das classes do modelo
+            
+        Returns:
+            ResultadoPredicoes com um aluno por linha
+        """
+        def matriz(prefixo: str) -> Optional[np.ndarray]:
+            colunas = [coluna for coluna in tabela.columns if coluna.startswith(prefixo)]
+            if not colunas:
+                return None
+            colunas.sort(key=lambda coluna: int(coluna[len(prefixo):]))
+            return tabela[colunas].to_numpy()
+        
+        explicado = tabela['shap_explicado'].to_numpy(dtype=bool)
+        fatores = FatoresShap(
+            fator_principal=tabela['shap_fator_principal'].to_numpy(dtype=object),
+            valor_importancia=tabela['shap_valor_importancia'].to_numpy(dtype=float),
+            linhas_explicadas=None if explicado.all() else np.flatnonzero(explicado)
+        )
+        for atributo in ATRIBUTOS_SHAP:
+            setattr(fatores, atributo, matriz(f'shap_{atributo}_'))
+        
+        return ResultadoPredicoes(
+            dados=tabela[COLUNAS_DADOS].reset_index(drop=True),
+            indices_top=matriz('top_indice_'),
+            probabilidades_top=matriz('top_probabilidade_'),
+            nomes_classes=nomes_classes,
+            fatores_shap=fatores
+        )
+    
+    def _caminhos(self, assinatura: str):
+        """Caminhos Parquet e pickle do estado de uma assinatura."""
+        nome = f"estado_{assinatura}"
+        return self.diretorio / f"{nome}.parquet", self.diretorio / f"{nome}.pkl"
+    
+    def _listar_arquivos(self) -> list:
+        """Lista os arquivos de estado."""
+        if not self.diretorio.exists():
+            return []
+        return [arquivo for arquivo in self.diretorio.iterdir()
+                if arquivo.name.startswith('estado_') and arquivo.suffix in ('.parquet', '.pkl')]
+
+def _resumir(componentes: list) -> str:
+    """Hash SHA-256 da serialização JSON dos componentes."""
+    return hashlib.sha256(json.dumps(componentes, sort_keys=True, default=str).encode('utf-8')).hexdigest()
@@ -0,0 +1,270 @@
+﻿"""
+Histórico das predições de cada execução, em SQLite.
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utilitarios import obter_registrador
+from ..configuracao import configuracoes
+from .resultados import ResultadoPredicoes
+
+registrador = obter_registrador(__name__)
+
+# Colunas de ResultadoPredicoes.dados guardadas por aluno (texto, exceto a probabilidade)
+COLUNAS_HISTORICO = (
+    'matricula', 'nome', 'curso', 'turma', 'situacao_atual', 'status_predicao',
+    'situacao_predita', 'probabilidade_situacao', 'nivel_urgencia', 'fator_principal',
+    'fonte_predicao', 'regra_aplicada'
+)
+
+class HistoricoPredicoes:
+    """
+    Banco SQLite com as predições de todas as execuções.
+    
+    Cada execução ganha uma linha em `execucoes` (data, arquivo de origem,
+    modelo, modos e estatísticas) e uma linha por aluno em `predicoes`. Os
+    índices por matrícula, curso e turma (junto com a data) e por data da
+    execução permitem obter a trajetória de um aluno ou o retrato de uma
+    turma sem reler CSVs antigos. Cada operação abre sua própria conexão,
+    então o histórico pode ser usado por várias threads e processos.
+    """
+    
+    def __init__(self, caminho_banco: Optional[Path] = None):
+        """
+        Abre (ou cria) o histórico.
+        
+        Args:
+            caminho_banco: Arquivo SQLite (padrão: configuracoes.obter_caminho_historico())
+        """
+        if caminho_banco is None:
+            caminho_banco = configuracoes.obter_caminho_historico()
+        self.caminho_banco = Path(caminho_banco)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        
+        with self._conectar() as conexao:
+            conexao.executescript("""
+                CREATE TABLE IF NOT EXISTS execucoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    data_execucao TEXT NOT NULL,
+                    arquivo_origem TEXT,
+                    modelo TEXT,
+                    modo_explicacao TEXT,
+                    modo_inferencia TEXT,
+                    total_alunos INTEGER NOT NULL DEFAULT 0,
+                    alunos_risco INTEGER NOT NULL DEFAULT 0,
+                    estatisticas TEXT,
+                    concluida INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS predicoes (
+                    execucao_id INTEGER NOT NULL REFERENCES execucoes (id),
+                    data_execucao TEXT NOT NULL,
+                    matricula TEXT NOT NULL,
+                    nome TEXT,
+                    curso TEXT,
+                    turma TEXT,
+                    situacao_atual TEXT,
+                    status_predicao TEXT,
+                    situacao_predita TEXT,
+                    probabilidade_situacao REAL,
+                    nivel_urgencia TEXT,
+                    fator_principal TEXT,
+                    fonte_predicao TEXT,
+                    regra_aplicada TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_execucoes_data ON execucoes (data_execucao);
+                CREATE INDEX IF NOT EXISTS idx_predicoes_matricula ON predicoes (matricula, data_execucao);
+                CREATE INDEX IF NOT EXISTS idx_predicoes_curso ON predicoes (curso, data_execucao);
+                CREATE INDEX IF NOT EXISTS idx_predicoes_turma ON predicoes (turma, data_execucao);
+                CREATE INDEX IF NOT EXISTS idx_predicoes_data ON predicoes (data_execucao);
+                CREATE INDEX IF NOT EXISTS idx_predicoes_execucao ON predicoes (execucao_id);
+            """)
+    
+    def iniciar_execucao(self, arquivo_origem: Optional[str] = None, modelo: Optional[str] = None,
+                         modo_explicacao: Optional[str] = None,
+                         modo_inferencia: Optional[str] = None) -> int:
+        """
+        Registra o início de uma execução.
+        
+        Args:
+            arquivo_origem: Arquivo de alunos processado
+            modelo: Nome do arquivo do modelo
+            modo_explicacao: Modo de explicação SHAP
+            modo_inferencia: Modo de inferência
+            
+        Returns:
+            Identificador da execução
+        """
+        with self._conectar() as conexao:
+            cursor = conexao.execute(
+                "INSERT INTO execucoes (data_execucao, arquivo_origem, modelo, modo_explicacao, modo_inferencia) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), arquivo_origem, modelo,
+                 modo_explicacao, modo_inferencia)
+            )
+        return cursor.lastrowid
+    
+    def acrescentar(self, execucao_id: int, resultado: ResultadoPredicoes) -> None:
+        """
+        Acrescenta os alunos de um resultado (ou de um bloco) à execução.
+        
+        Args:
+            execucao_id: Identificador retornado por iniciar_execucao
+            resultado: Resultado das predições
+        """
+        dados = resultado.dados
+        colunas = []
+        for coluna in COLUNAS_HISTORICO:
+            if coluna == 'probabilidade_situacao':
+                colunas.append(dados[coluna].astype(float).tolist())
+            else:
+                colunas.append(dados[coluna].astype(str).tolist())
+        
+        with self._conectar() as conexao:
+            data_execucao = conexao.execute(
+                "SELECT data_execucao FROM execucoes WHERE id = ?", (execucao_id,)
+            ).fetchone()[0]
+            conexao.executemany(
+                f"INSERT INTO predicoes (execucao_id, data_execucao, {', '.join(COLUNAS_HISTORICO)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(COLUNAS_HISTORICO))})",
+                ((execucao_id, data_execucao, *linha) for linha in zip(*colunas))
+            )
+    
+    def finalizar_execucao(self, execucao_id: int, estatisticas: Dict[str, Any]) -> None:
+        """
+        Grava as estatísticas da execução e a marca como concluída.
+        
+        Args:
+            execucao_id: Identificador retornado por iniciar_execucao
+            estatisticas: Estatísticas de predizer_alunos
+        """
+        with self._conectar() as conexao:
+            conexao.execute(
+                "UPDATE execucoes SET total_alunos = ?, alunos_risco = ?, estatisticas = ?, concluida = 1 "
+                "WHERE id = ?",
+                (int(estatisticas.get('total_students', 0)), int(estatisticas.get('dropout_risk_students', 0)),
+                 json.dumps(estatisticas, default=self._converter_json), execucao_id)
+            )
+    
+    def registrar(self, resultado: ResultadoPredicoes, estatisticas: Dict[str, Any],
+                  **metadados: Optional[str]) -> int:
+        """
+        Registra uma execução completa de uma só vez.
+        
+        Args:
+            resultado: Resultado das predições
+            estatisticas: Estatísticas de predizer_alunos
+            **metadados: Argumentos de iniciar_execucao
+            
+        Returns:
+            Identificador da execução
+        """
+        execucao_id = self.iniciar_execucao(**metadados)
+        self.acrescentar(execucao_id, resultado)
+        self.finalizar_execucao(execucao_id, estatisticas)
+        registrador.info(f"Execução {execucao_id} registrada no histórico: {len(resultado)} alunos")
+        return execucao_id
+    
+    def listar_execucoes(self, limite: Optional[int] = None) -> pd.DataFrame:
+        """
+        Lista as execuções concluídas, da mais recente para a mais antiga.
+        
+        Args:
+            limite: Quantidade máxima de execuções
+            
+        Returns:
+            DataFrame com os metadados de cada execução
+        """
+        consulta = ("SELECT id, data_execucao, arquivo_origem, modelo, modo_explicacao, modo_inferencia, "
+                    "total_alunos, alunos_risco FROM execucoes WHERE concluida = 1 "
+                    "ORDER BY data_execucao DESC, id DESC")
+        parametros = ()
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros = (limite,)
+        return self._consultar(consulta, parametros)
+    
+    def trajetoria_aluno(self, matricula: str) -> pd.DataFrame:
+        """
+        Retorna as predições de um aluno em todas as execuções, em ordem cronológica.
+        
+        Args:
+            matricula: Matrícula como em limpar_identificador_aluno
+            
+        Returns:
+            DataFrame com uma linha por execução em que o aluno apareceu
+        """
+        return self._consultar(
+            "SELECT p.* FROM predicoes p JOIN execucoes e ON e.id = p.execucao_id "
+            "WHERE p.matricula = ? AND e.concluida = 1 ORDER BY p.data_execucao, p.execucao_id",
+            (str(matricula).strip(),)
+        )
+    
+    def retrato_coorte(self, curso: Optional[str] = None, turma: Optional[str] = None,
+                       ate: Optional[str] = None) -> pd.DataFrame:
+        """
+        Retorna os alunos de um curso e/ou turma na última execução que os incluiu.
+        
+        Args:
+            curso: Nome do curso (como na coluna 'Curso')
+            turma: Código da turma (como na coluna 'Turma Atual')
+            ate: Considera só execuções até esta data ISO (ex.: '2025-06-30')
+            
+        Returns:
+            DataFrame com um aluno por linha; vazio se não houver execução
+        """
+        filtros, parametros = ["e.concluida = 1"], []
+        for coluna, valor in (('curso', curso), ('turma', turma)):
+            if valor is not None:
+                filtros.append(f"p.{coluna} = ?")
+                parametros.append(valor)
+        if ate is not None:
+            # Datas sem horário incluem o dia inteiro
+            filtros.append("p.data_execucao <= ?")
+            parametros.append(ate if 'T' in ate else f"{ate}T23:59:59")
+        condicao = " AND ".join(filtros)
+        
+        with self._conectar() as conexao:
+            linha = conexao.execute(
+                f"SELECT p.execucao_id FROM predicoes p JOIN execucoes e ON e.id = p.execucao_id "
+                f"WHERE {condicao} ORDER BY p.data_execucao DESC, p.execucao_id DESC LIMIT 1",
+                parametros
+            ).fetchone()
+            if linha is None:
+                return pd.DataFrame(columns=['execucao_id', 'data_execucao', *COLUNAS_HISTORICO])
+            return pd.read_sql_query(
+                f"SELECT p.* FROM predicoes p JOIN execucoes e ON e.id = p.execucao_id "
+                f"WHERE {condicao} AND p.execucao_id = ?",
+                conexao, params=[*parametros, linha[0]]
+            )
+    
+    def _consultar(self, consulta: str, parametros: tuple = ()) -> pd.DataFrame:
+        """Executa uma consulta e retorna o resultado como DataFrame."""
+        with self._conectar() as conexao:
+            return pd.read_sql_query(consulta, conexao, params=parametros)
+    
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """Abre uma conexão; confirma a transação (ou desfaz, em erro) e fecha ao sair do bloco with."""
+        conexao = sqlite3.connect(self.caminho_banco, timeout=30)
+        try:
+            # WAL permite consultas enquanto outra execução grava
+            conexao.execute("PRAGMA journal_mode=WAL")
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+    
+    @staticmethod
+    def _converter_json(valor: Any) -> Any:
+        """Converte tipos numpy das estatísticas para JSON."""
+        if isinstance(valor, np.generic):
+            return valor.item()
+        return str(valor)
@@ -2,54 +2,54 @@
 Sistema principal de predição de evasão estudantil.
 """
 
-from dataclasses import dataclass
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union, BinaryIO
+import numpy as np
 import pandas as pd
 
-from ..utilitarios import obter_registrador, CarregadorDados
+from ..utilitarios import (obter_registrador, CarregadorDados, aplicar_por_valor_unico, obter_coluna,
+                          carregar_com_cache, Instrumentacao, ativar_instrumentacao, obter_instrumentacao,
+                          medir_etapa, medir_iteracao)
 from ..configuracao import configuracoes
-from ..modelos import PreditorEvasaoEstudantil
-from ..regras_negocio import MotorRegrasNegocio, AnalisadorCurriculo, ResultadoRegra
+from ..modelos import PreditorEvasaoEstudantil, ResultadoModelo, converter_coluna_numerica
+from ..regras_negocio import MotorRegrasNegocio, AnalisadorCurriculo, IndiceCurricular, ResultadoRegrasLote
+from .resultados import PredicaoAluno, ResultadoPredicoes
+from .estado_execucao import EstadoExecucao
+from .historico import HistoricoPredicoes
 
 registrador = obter_registrador(__name__)
 
-@dataclass
-class PredicaoAluno:
-    """Dados de predição para um aluno."""
-    nome: str
-    matricula: str
-    situacao_atual: str
-    curso: str
-    sexo: str
-    turma: str
-    status_predicao: str  # MATRICULADO ou RISCO_EVASAO
-    situacao_predita: str
-    probabilidade_situacao: str
-    probabilidade_evasao_total: str
-    nivel_urgencia: str
-    fator_principal: str
-    valor_importancia: float
-    confianca_predicao: str
-    fonte_predicao: str
-    predicao_ml_original: str
-    prob_ml_original: str
-    top_1_situacao_ml: str
-    top_1_probabilidade_ml: str
-    top_2_situacao_ml: str
-    top_2_probabilidade_ml: str
-    top_3_situacao_ml: str
-    top_3_probabilidade_ml: str
+# Modos de explicação SHAP aceitos por predizer_alunos
+MODOS_EXPLICACAO = ('desativado', 'completo', 'apenas_risco', 'top_n_urgencia')
+
+# Modos de inferência: modelo em todos os alunos ou só nos que as regras não decidem
+MODOS_INFERENCIA = ('completo', 'regras_primeiro')
+
+# Estatísticas de predizer_alunos que são somadas entre blocos no modo em streaming
+CHAVES_ADITIVAS_ESTATISTICAS = (
+    'total_students', 'enrolled_students', 'dropout_risk_students', 'explained_students',
+    'ml_students', 'evaluated_feature_rows', 'unique_feature_rows', 'prediction_cache_hits',
+    'reused_students'
+)
 
 class SistemaPredicaoEvasao:
     """Sistema principal de predição de evasão estudantil."""
     
-    def __init__(self):
-        """Inicializa o sistema."""
+    def __init__(self, caminho_modelo: Optional[Path] = None):
+        """
+        Inicializa o sistema.
+        
+        Args:
+            caminho_modelo: Caminho do modelo (padrão: configuracoes.obter_caminho_modelo())
+        """
+        self.caminho_modelo = caminho_modelo
         self.preditor_ml = PreditorEvasaoEstudantil()
         self.motor_regras_negocio = None
         self.analisador_curriculo = None
         self._inicializado = False
+        # Os contadores do motor de regras são compartilhados entre chamadas concorrentes
+        self._trava_regras = threading.Lock()
     
     def inicializar(self) -> None:
         """
@@ -62,13 +62,13 @@ class SistemaPredicaoEvasao:
             registrador.info("Inicializando sistema de predição de evasão...")
             
             # Carregar modelo ML
-            self.preditor_ml.carregar_modelo()
+            self.preditor_ml.carregar_modelo(self.caminho_modelo)
             
-            # Carregar grade curricular
-            df_disciplinas, df_cursos = CarregadorDados.carregar_dados_curriculares()
+            # Carregar grade curricular (índice gravado, se as planilhas não mudaram)
+            indice_curricular = IndiceCurricular.carregar()
             
             # Inicializar analisador de currículo
-            self.analisador_curriculo = AnalisadorCurriculo(df_disciplinas, df_cursos)
+            self.analisador_curriculo = AnalisadorCurriculo(indice=indice_curricular)
             
             # Inicializar motor de regras de negócio
             self.motor_regras_negocio = MotorRegrasNegocio(self.analisador_curriculo)
@@ -80,146 +80,492 @@ class SistemaPredicaoEvasao:
             registrador.error(f"Erro na inicialização do sistema: {e}")
             raise
     
-    def predizer_alunos(self, arquivo_alunos: Path) -> Tuple[List[PredicaoAluno], Dict[str, Any]]:
+    def predizer_alunos(self, arquivo_alunos: Union[Path, pd.DataFrame, bytes, BinaryIO],
+                        modo_explicacao: Optional[str] = None,
+                        atualizar_cache: bool = False,
+                        modo_inferencia: Optional[str] = None,
+                        incremental: Optional[bool] = None,
+                        historico: Optional[bool] = None,
+                        instrumentar: Optional[bool] = None) -> Tuple[ResultadoPredicoes, Dict[str, Any]]:
         """
         Faz predições para todos os alunos no arquivo.
         
         Args:
-            arquivo_alunos: Caminho para o arquivo com dados dos alunos
+            arquivo_alunos: Caminho para o arquivo com dados dos alunos, DataFrame
+                já carregado, conteúdo da planilha em bytes ou objeto tipo arquivo
+            modo_explicacao: Quais alunos recebem explicação SHAP: 'desativado',
+                'completo', 'apenas_risco' (só RISCO_EVASAO) ou 'top_n_urgencia'
+                (os configuracoes.modelo.limite_explicacao_urgencia alunos em
+                risco mais urgentes). Padrão: configuracoes.modelo.modo_explicacao
+            atualizar_cache: Relê a planilha mesmo que ela esteja no cache de entradas
+            modo_inferencia: 'completo' (modelo em todos os alunos, depois as regras)
+                ou 'regras_primeiro' (regras primeiro; modelo e SHAP só nos alunos
+                que nenhuma regra decide). Padrão: configuracoes.modelo.modo_inferencia
+            incremental: Reaproveita a predição anterior dos alunos cujas colunas
+                não mudaram (ver EstadoExecucao). Ignorado no modo 'top_n_urgencia',
+                em que a explicação de um aluno depende dos demais.
+                Padrão: configuracoes.dados.execucao_incremental
+            historico: Registra a execução em HistoricoPredicoes; o identificador
+                volta em 'history_run_id'. Padrão: configuracoes.dados.historico_predicoes
+            instrumentar: Mede as etapas (ver Instrumentacao) e devolve as medições
+                em 'metrics'. Com um coletor já ativo (ativar_instrumentacao), as
+                etapas entram nele. Padrão: configuracoes.logs.instrumentacao
             
         Returns:
-            Tuple com lista de predições e estatísticas
+            Tuple com resultado colunar das predições e estatísticas
+            
+        Raises:
+            ValueError: Se o modo de explicação ou de inferência for inválido
         """
         if not self._inicializado:
             raise RuntimeError("Sistema não foi inicializado. Chame inicializar() primeiro.")
         
-        registrador.info(f"Iniciando predições para arquivo: {arquivo_alunos}")
+        if modo_explicacao is None:
+            modo_explicacao = configuracoes.modelo.modo_explicacao
+        if modo_explicacao not in MODOS_EXPLICACAO:
+            raise ValueError(f"Modo de explicação inválido: {modo_explicacao}. Use um de {MODOS_EXPLICACAO}")
         
-        # Carregar dados
-        df = CarregadorDados.carregar_excel_com_deteccao_cabecalho(arquivo_alunos)
-        registrador.info(f"Dados carregados: {len(df)} alunos")
+        if modo_inferencia is None:
+            modo_inferencia = configuracoes.modelo.modo_inferencia
+        if modo_inferencia not in MODOS_INFERENCIA:
+            raise ValueError(f"Modo de inferência inválido: {modo_inferencia}. Use um de {MODOS_INFERENCIA}")
         
-        # Preprocessar dados para o modelo ML
-        df_processado = self.preditor_ml.preprocessar_dados(df)
+        if incremental is None:
+            incremental = configuracoes.dados.execucao_incremental
+        if incremental and modo_explicacao == 'top_n_urgencia':
+            registrador.warning("Execução incremental ignorada no modo de explicação 'top_n_urgencia'")
+            incremental = False
         
-        # Fazer predições ML
-        predicoes_ml, probabilidades_ml, valores_shap = self.preditor_ml.fazer_predicoes(df_processado)
+        instrumentacao = self._resolver_instrumentacao(instrumentar)
+        with ativar_instrumentacao(instrumentacao):
+            # Carregar dados
+            df = self._carregar_entrada(arquivo_alunos, atualizar_cache)
+            registrador.info(f"Dados carregados: {len(df)} alunos")
+            
+            if incremental:
+                resultado, estatisticas = self._predizer_incremental(df, modo_explicacao, modo_inferencia)
+            else:
+                resultado, estatisticas = self._predizer_dataframe(df, modo_explicacao, modo_inferencia)
         
-        # Resetar contadores de regras
-        self.motor_regras_negocio.resetar_contadores()
+        registrador.info(f"Predições concluídas: {estatisticas['enrolled_students']} matriculados, "
+                         f"{estatisticas['dropout_risk_students']} em risco")
+        if instrumentacao is not None:
+            estatisticas['metrics'] = instrumentacao.para_dicionario()
         
-        # Processar cada aluno
-        predicoes = []
-        contador_matriculados = 0
-        contador_risco_evasao = 0
+        if historico is None:
+            historico = configuracoes.dados.historico_predicoes
+        if historico:
+            try:
+                estatisticas['history_run_id'] = HistoricoPredicoes().registrar(
+                    resultado, estatisticas, **self._metadados_historico(arquivo_alunos, modo_explicacao,
+                                                                         modo_inferencia)
+                )
+            except Exception as e:
+                registrador.warning(f"Não foi possível registrar a execução no histórico: {e}")
         
-        for i, (_, dados_aluno) in enumerate(df.iterrows()):
-            # Obter predição ML para este aluno
-            predicao_ml = predicoes_ml[i]
-            probabilidade_ml = max(probabilidades_ml[i])
-            
-            # Aplicar regras de negócio
-            resultado_regra = self.motor_regras_negocio.aplicar_regras_negocio(
-                dados_aluno.to_dict(), predicao_ml, probabilidade_ml
+        return resultado, estatisticas
+    
+    @staticmethod
+    def _resolver_instrumentacao(instrumentar: Optional[bool]) -> Optional[Instrumentacao]:
+        """Coletor de uma chamada: o já ativo, um novo ou nenhum (instrumentar=False)."""
+        ativa = obter_instrumentacao()
+        if instrumentar is None:
+            if ativa is not None:
+                return ativa
+            instrumentar = configuracoes.logs.instrumentacao
+        if not instrumentar:
+            return None
+        return ativa or Instrumentacao()
+    
+    def _predizer_dataframe(self, df: pd.DataFrame, modo_explicacao: str,
+                            modo_inferencia: str) -> Tuple[ResultadoPredicoes, Dict[str, Any]]:
+        """Aplica pré-processamento, modelo, regras e SHAP a todos os alunos do DataFrame."""
+        # Preprocessar dados para o modelo ML (regras e currículo leem os valores originais)
+        with medir_etapa('preprocessing', linhas=len(df)):
+            df_processado = self.preditor_ml.preprocessar_dados(self.converter_features_numericas(df))
+        
+        if modo_inferencia == 'regras_primeiro':
+            resultados_regras, resultado_ml, resumo_regras, linhas_ml = self._inferir_regras_primeiro(
+                df, df_processado
             )
-            
-            # Criar objeto de predição
-            predicao_aluno = self._criar_predicao_aluno(
-                dados_aluno, resultado_regra, i, probabilidades_ml[i], 
-                valores_shap, df_processado.columns.tolist(), i
+        else:
+            # Fazer predições ML (nos modos parciais o SHAP é calculado depois das regras)
+            resultado_ml = self.preditor_ml.fazer_predicoes(
+                df_processado, calcular_shap=(modo_explicacao == 'completo')
             )
             
-            predicoes.append(predicao_aluno)
-            
-            # Contar resultados
-            if predicao_aluno.status_predicao == 'MATRICULADO':
-                contador_matriculados += 1
-            else:
-                contador_risco_evasao += 1
+            with self._trava_regras, medir_etapa('rules', linhas=len(df)):
+                # Resetar contadores de regras
+                self.motor_regras_negocio.resetar_contadores()
+                
+                # Aplicar regras de negócio a todos os alunos de uma vez
+                resultados_regras = self.motor_regras_negocio.aplicar_regras_negocio_lote(
+                    df, resultado_ml.predicoes, resultado_ml.probabilidade_maxima
+                )
+                resumo_regras = self.motor_regras_negocio.obter_resumo_regras()
+            linhas_ml = None
+        
+        # Montar resultado colunar (o SHAP dos modos parciais é medido à parte)
+        with medir_etapa('result_building', linhas=len(df)):
+            resultado = self._montar_resultado(
+                df, resultados_regras, resultado_ml, df_processado, modo_explicacao, linhas_ml
+            )
         
         # Compilar estatísticas
-        estatisticas = {
-            'total_students': len(predicoes),
+        estatisticas = self._resumir_resultado(resultado)
+        estatisticas.update({
+            'ml_students': len(resultado) if linhas_ml is None else len(linhas_ml),
+            'evaluated_feature_rows': resultado_ml.linhas_avaliadas,
+            'unique_feature_rows': resultado_ml.linhas_unicas,
+            'dedup_ratio': (resultado_ml.linhas_avaliadas / resultado_ml.linhas_unicas
+                            if resultado_ml.linhas_unicas else 1.0),
+            'prediction_cache_hits': resultado_ml.acertos_cache,
+            'reused_students': 0,
+            'rules_summary': resumo_regras
+        })
+        
+        return resultado, estatisticas
+    
+    def _predizer_incremental(self, df: pd.DataFrame, modo_explicacao: str,
+                              modo_inferencia: str) -> Tuple[ResultadoPredicoes, Dict[str, Any]]:
+        """
+        Prediz só os alunos novos ou alterados desde a última execução com a mesma assinatura.
+        
+        Os demais reaproveitam o resultado guardado em EstadoExecucao; as
+        estatísticas de modelo (ml_students, evaluated_feature_rows...)
+        refletem só os alunos preditos agora.
+        """
+        estado = EstadoExecucao()
+        assinatura = estado.calcular_assinatura(self, self.converter_features_numericas(df),
+                                                modo_explicacao, modo_inferencia)
+        hashes = estado.calcular_hashes(df)
+        matriculas = CarregadorDados.limpar_identificadores_alunos(df)
+        anterior = estado.carregar(assinatura)
+        
+        reaproveitar = np.zeros(len(df), dtype=bool)
+        posicoes = np.full(len(df), -1, dtype=np.intp)
+        if anterior is not None and len(anterior):
+            posicoes = pd.Index(anterior['matricula']).get_indexer(matriculas)
+            encontrados = np.flatnonzero(posicoes >= 0)
+            reaproveitar[encontrados] = (
+                anterior['hash_linha'].to_numpy()[posicoes[encontrados]] == hashes[encontrados]
+            )
+        
+        novas = np.flatnonzero(~reaproveitar)
+        reaproveitadas = np.flatnonzero(reaproveitar)
+        registrador.info(f"Execução incremental: {len(reaproveitadas)} alunos reaproveitados, "
+                         f"{len(novas)} novos ou alterados")
+        
+        partes = []
+        estatisticas = {'ml_students': 0, 'evaluated_feature_rows': 0, 'unique_feature_rows': 0,
+                        'dedup_ratio': 1.0, 'prediction_cache_hits': 0}
+        if len(novas):
+            resultado_novo, estatisticas_novas = self._predizer_dataframe(
+                df.iloc[novas].reset_index(drop=True), modo_explicacao, modo_inferencia
+            )
+            estatisticas = {chave: estatisticas_novas[chave] for chave in estatisticas}
+            partes.append(resultado_novo)
+            estado.salvar(assinatura, estado.tabela_de_resultado(resultado_novo, hashes[novas]))
+        if len(reaproveitadas):
+            partes.append(estado.resultado_de_tabela(
+                anterior.iloc[posicoes[reaproveitadas]], self.preditor_ml.obter_nomes_classes()
+            ))
+        
+        # Volta à ordem do arquivo de entrada
+        ordem = np.argsort(np.concatenate([novas, reaproveitadas]), kind='stable')
+        resultado = ResultadoPredicoes.concatenar(partes).selecionar(ordem)
+        if 'Nome' not in df.columns:
+            resultado.dados['nome'] = np.array([f'Aluno_{indice + 1}' for indice in range(len(df))], dtype=object)
+        
+        estatisticas.update(self._resumir_resultado(resultado))
+        estatisticas.update({
+            'reused_students': len(reaproveitadas),
+            'rules_summary': self.motor_regras_negocio.contar_regras(resultado.dados['regra_aplicada'].to_numpy())
+        })
+        return resultado, estatisticas
+    
+    @staticmethod
+    def _resumir_resultado(resultado: ResultadoPredicoes) -> Dict[str, Any]:
+        """Contagens e percentuais de status e de explicações do resultado."""
+        contador_matriculados = resultado.contar('status_predicao', 'MATRICULADO')
+        contador_risco_evasao = len(resultado) - contador_matriculados
+        return {
+            'total_students': len(resultado),
             'enrolled_students': contador_matriculados,
             'dropout_risk_students': contador_risco_evasao,
-            'enrolled_percentage': (contador_matriculados / len(predicoes)) * 100,
-            'dropout_risk_percentage': (contador_risco_evasao / len(predicoes)) * 100,
-            'rules_summary': self.motor_regras_negocio.obter_resumo_regras()
+            'enrolled_percentage': (contador_matriculados / len(resultado)) * 100,
+            'dropout_risk_percentage': (contador_risco_evasao / len(resultado)) * 100,
+            'explained_students': (len(resultado) if resultado.fatores_shap.linhas_explicadas is None
+                                   else len(resultado.fatores_shap.linhas_explicadas))
+        }
+    
+    def predizer_alunos_em_blocos(self, arquivo_alunos: Path, arquivo_saida: Path,
+                                  tamanho_bloco: Optional[int] = None,
+                                  modo_explicacao: Optional[str] = None,
+                                  modo_inferencia: Optional[str] = None,
+                                  colunas: Optional[List[str]] = None,
+                                  colunas_extras: Optional[Dict[str, Any]] = None,
+                                  encoding: str = 'utf-8',
+                                  incremental: Optional[bool] = None,
+                                  historico: Optional[bool] = None,
+                                  instrumentar: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Faz predições em streaming, bloco a bloco, com memória limitada ao tamanho do bloco.
+        
+        Cada bloco de linhas do arquivo (Excel ou CSV) passa por
+        pré-processamento, regras, modelo e SHAP e é acrescentado ao CSV de
+        saída antes da leitura do próximo; as estatísticas são acumuladas.
+        No modo 'top_n_urgencia' o limite de explicações vale por bloco.
+        
+        As features numéricas do modelo são convertidas valor a valor em
+        todos os blocos, para que o resultado de um aluno não dependa das outras linhas
+        do bloco (uma coluna com texto em um bloco e só números em outro teria
+        tipos diferentes em cada um).
+        
+        Args:
+            arquivo_alunos: Caminho para o arquivo com dados dos alunos
+            arquivo_saida: Caminho do CSV de saída (sobrescrito)
+            tamanho_bloco: Linhas por bloco (padrão: configuracoes.dados.tamanho_bloco_streaming)
+            modo_explicacao: Como em predizer_alunos
+            modo_inferencia: Como em predizer_alunos
+            colunas: Subconjunto de COLUNAS_EXPORTACAO a gravar (padrão: todas)
+            colunas_extras: Colunas constantes adicionadas ao final (ex.: data)
+            encoding: Codificação do arquivo de saída
+            incremental: Como em predizer_alunos
+            historico: Como em predizer_alunos; os blocos formam uma única execução
+            instrumentar: Como em predizer_alunos; as medições dos blocos são somadas
+                e a leitura de cada bloco entra na etapa 'load'
+            
+        Returns:
+            Estatísticas do arquivo inteiro, nas mesmas chaves de predizer_alunos
+            e com a quantidade de blocos em 'chunks'
+            
+        Raises:
+            ValueError: Se o arquivo não tiver alunos ou um modo for inválido
+        """
+        if not self._inicializado:
+            raise RuntimeError("Sistema não foi inicializado. Chame inicializar() primeiro.")
+        
+        if tamanho_bloco is None:
+            tamanho_bloco = configuracoes.dados.tamanho_bloco_streaming
+        
+        colunas_entrada = configuracoes.dados.caracteristicas_esperadas + configuracoes.dados.colunas_identificacao
+        blocos = CarregadorDados.ler_em_blocos(arquivo_alunos, tamanho_bloco, colunas=colunas_entrada)
+        
+        if historico is None:
+            historico = configuracoes.dados.historico_predicoes
+        historico_predicoes = execucao_id = None
+        if historico:
+            historico_predicoes = HistoricoPredicoes()
+            execucao_id = historico_predicoes.iniciar_execucao(
+                **self._metadados_historico(arquivo_alunos, modo_explicacao, modo_inferencia)
+            )
+        
+        acumulado = None
+        instrumentacao = self._resolver_instrumentacao(instrumentar)
+        with ativar_instrumentacao(instrumentacao), \
+                open(arquivo_saida, 'w', encoding=encoding, newline='') as saida:
+            for numero_bloco, df_bloco in enumerate(medir_iteracao('load', blocos), start=1):
+                resultado, estatisticas = self.predizer_alunos(
+                    df_bloco, modo_explicacao=modo_explicacao, modo_inferencia=modo_inferencia,
+                    incremental=incremental, historico=False
+                )
+                resultado.salvar_csv(saida, colunas=colunas, colunas_extras=colunas_extras,
+                                     cabecalho=(numero_bloco == 1))
+                if historico_predicoes is not None:
+                    historico_predicoes.acrescentar(execucao_id, resultado)
+                acumulado = self._acumular_estatisticas(acumulado, estatisticas)
+                registrador.info(f"Bloco {numero_bloco} gravado: {acumulado['total_students']} alunos até agora")
+        
+        if acumulado is None:
+            raise ValueError(f"Nenhum aluno encontrado em {arquivo_alunos}")
+        if instrumentacao is not None:
+            acumulado['metrics'] = instrumentacao.para_dicionario()
+        
+        if historico_predicoes is not None:
+            historico_predicoes.finalizar_execucao(execucao_id, acumulado)
+            acumulado['history_run_id'] = execucao_id
+        
+        registrador.info(f"Predições em blocos concluídas: {acumulado['enrolled_students']} matriculados, "
+                         f"{acumulado['dropout_risk_students']} em risco, {acumulado['chunks']} blocos")
+        return acumulado
+    
+    def _metadados_historico(self, arquivo_alunos: Any, modo_explicacao: Optional[str],
+                             modo_inferencia: Optional[str]) -> Dict[str, Optional[str]]:
+        """Metadados da execução gravados em HistoricoPredicoes."""
+        return {
+            'arquivo_origem': str(arquivo_alunos) if isinstance(arquivo_alunos, (str, Path)) else None,
+            'modelo': Path(self.caminho_modelo or configuracoes.obter_caminho_modelo()).name,
+            'modo_explicacao': modo_explicacao or configuracoes.modelo.modo_explicacao,
+            'modo_inferencia': modo_inferencia or configuracoes.modelo.modo_inferencia
         }
+    
+    @staticmethod
+    def _acumular_estatisticas(acumulado: Optional[Dict[str, Any]],
+                               estatisticas: Dict[str, Any]) -> Dict[str, Any]:
+        """Soma as estatísticas de um bloco às anteriores e recalcula os percentuais."""
+        if acumulado is None:
+            acumulado = dict(estatisticas, rules_summary={}, chunks=0)
+            for chave in CHAVES_ADITIVAS_ESTATISTICAS:
+                acumulado[chave] = 0
         
-        registrador.info(f"Predições concluídas: {contador_matriculados} matriculados, {contador_risco_evasao} em risco")
+        for chave in CHAVES_ADITIVAS_ESTATISTICAS:
+            acumulado[chave] += estatisticas[chave]
+        for regra, quantidade in estatisticas['rules_summary'].items():
+            acumulado['rules_summary'][regra] = acumulado['rules_summary'].get(regra, 0) + quantidade
+        acumulado['chunks'] += 1
         
-        return predicoes, estatisticas
+        total = acumulado['total_students']
+        acumulado['enrolled_percentage'] = (acumulado['enrolled_students'] / total) * 100
+        acumulado['dropout_risk_percentage'] = (acumulado['dropout_risk_students'] / total) * 100
+        acumulado['dedup_ratio'] = (acumulado['evaluated_feature_rows'] / acumulado['unique_feature_rows']
+                                    if acumulado['unique_feature_rows'] else 1.0)
+        return acumulado
     
-    def _criar_predicao_aluno(self, dados_aluno: pd.Series, resultado_regra: ResultadoRegra,
-                             indice_predicao_ml: int, probabilidades_ml: List[float],
-                             valores_shap: Any, nomes_features: List[str], 
-                             indice_aluno: int) -> PredicaoAluno:
-        """Cria objeto de predição para um aluno."""
-        
-        # Informações básicas do aluno
-        nome = str(dados_aluno.get('Nome', f'Aluno_{indice_aluno+1}'))
-        matricula = CarregadorDados.limpar_identificador_aluno(dados_aluno.to_dict())
-        situacao_atual = str(dados_aluno.get('Situação', 'Não informada'))
-        curso = str(dados_aluno.get('Curso', 'Não informado'))
-        sexo = str(dados_aluno.get('Sexo', 'Não informado'))
-        turma = str(dados_aluno.get('Turma Atual', 'Não informada'))
+    def converter_features_numericas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converte valor a valor as features numéricas para float64.
         
-        # Determinar status da predição
-        if resultado_regra.situacao == 'Matriculado':
-            status_predicao = 'MATRICULADO'
+        Aplicada à cópia que vai para o modelo em toda entrada de
+        predizer_alunos (arquivo inteiro, cada bloco em streaming e cada
+        micro-lote do serviço). Sem ela o tipo da coluna, e com ele a
+        conversão feita no pré-processamento, dependeria das outras linhas do
+        arquivo, bloco ou lote: a mesma coluna pode vir como texto num bloco
+        com 'PC' e como número em outro. As regras e o analisador de
+        currículo continuam lendo o DataFrame original, em que 'IV' ou 'ENF'
+        não viraram 0.
+        
+        Texto não numérico vira 0; valores ausentes continuam ausentes (ramo
+        de ausente do XGBoost, como em uma coluna lida como número), exceto
+        nas colunas de configuracoes.dados.features_ausente_zero, onde valem 0.
+        Antes, o ausente virava 0 só quando outra célula da coluna tinha texto,
+        e a predição do aluno dependia do resto do arquivo ou do bloco. Nas
+        planilhas do AcadWeb, em que só Pend. Financ. traz texto ('PC'), o
+        resultado é o mesmo; numa coluna com módulos em texto ('IV',
+        'Módulo 2'), as células vazias deixam de valer 0 para o modelo.
+        
+        Args:
+            df: DataFrame de alunos (não é alterado)
+            
+        Returns:
+            Cópia do DataFrame com as features numéricas convertidas
+        """
+        df = df.copy(deep=False)
+        categoricas = self.preditor_ml.pipeline_preprocessamento.mapas_categorias
+        ausente_zero = configuracoes.dados.features_ausente_zero
+        for coluna in configuracoes.dados.caracteristicas_esperadas:
+            if coluna not in df.columns or coluna in categoricas:
+                continue
+            try:
+                df[coluna] = converter_coluna_numerica(df[coluna], ausente_como_zero=coluna in ausente_zero)
+            except (TypeError, ValueError):
+                # O pré-processamento aplica o mesmo fallback à coluna que ficou como texto
+                pass
+        return df
+    
+    def _inferir_regras_primeiro(self, df: pd.DataFrame, df_processado: pd.DataFrame
+                                 ) -> Tuple[ResultadoRegrasLote, ResultadoModelo, Dict[str, int], np.ndarray]:
+        """
+        Aplica as regras antes do modelo e passa pelo modelo só os alunos não decididos.
+        
+        Com configuracoes.modelo.top_k_alunos_regra o predict_proba ainda roda
+        em todos os alunos para preencher as colunas top-k ML; o SHAP fica
+        restrito aos alunos decididos pelo modelo.
+        """
+        with self._trava_regras, medir_etapa('rules', linhas=len(df)):
+            self.motor_regras_negocio.resetar_contadores()
+            resultados_regras = self.motor_regras_negocio.aplicar_regras_negocio_lote(df)
+            resumo_regras = self.motor_regras_negocio.obter_resumo_regras()
+        
+        linhas_ml = resultados_regras.obter_linhas_ml()
+        registrador.info(f"Regras decidiram {len(df) - len(linhas_ml)} de {len(df)} alunos; "
+                         f"{len(linhas_ml)} seguem para o modelo")
+        
+        resultado_ml = self.preditor_ml.fazer_predicoes(
+            df_processado, calcular_shap=False,
+            linhas=None if configuracoes.modelo.top_k_alunos_regra else linhas_ml
+        )
+        resultados_regras.preencher_ml(
+            linhas_ml, resultado_ml.predicoes[linhas_ml], resultado_ml.probabilidade_maxima[linhas_ml]
+        )
+        return resultados_regras, resultado_ml, resumo_regras, linhas_ml
+    
+    def _carregar_entrada(self, entrada: Union[Path, pd.DataFrame, bytes, BinaryIO],
+                          atualizar_cache: bool = False) -> pd.DataFrame:
+        """Obtém o DataFrame de alunos a partir de arquivo, DataFrame ou buffer."""
+        if isinstance(entrada, pd.DataFrame):
+            registrador.info(f"Iniciando predições para DataFrame em memória: {entrada.shape}")
+            # Mesma tipagem de uma planilha lida do disco (números em colunas object)
+            return entrada.infer_objects()
+        
+        with medir_etapa('load') as etapa:
+            if isinstance(entrada, (str, Path)):
+                entrada = Path(entrada)
+                registrador.info(f"Iniciando predições para arquivo: {entrada}")
+            else:
+                entrada = CarregadorDados.ler_conteudo(entrada)
+                registrador.info(f"Iniciando predições para planilha em memória: {len(entrada)} bytes")
+            
+            colunas = configuracoes.dados.caracteristicas_esperadas + configuracoes.dados.colunas_identificacao
+            df = carregar_com_cache(
+                entrada,
+                lambda: CarregadorDados.carregar_excel_com_deteccao_cabecalho(entrada, colunas=colunas),
+                parametros={'colunas': colunas},
+                forcar_atualizacao=atualizar_cache
+            )
+            etapa.linhas = len(df)
+        return df
+    
+    def _montar_resultado(self, df: pd.DataFrame, resultados_regras: ResultadoRegrasLote,
+                          resultado_ml: ResultadoModelo, df_processado: pd.DataFrame,
+                          modo_explicacao: str = 'completo',
+                          linhas_ml: Optional[np.ndarray] = None) -> ResultadoPredicoes:
+        """
+        Monta o resultado colunar para todos os alunos do DataFrame.
+        
+        Com linhas_ml (modo regras_primeiro), só esses alunos podem receber explicação SHAP.
+        """
+        total = len(df)
+        
+        def coluna_texto(coluna: str, valor_padrao: str) -> np.ndarray:
+            return aplicar_por_valor_unico(obter_coluna(df, coluna, valor_padrao), str)
+        
+        # Informações básicas dos alunos
+        if 'Nome' in df.columns:
+            nomes = coluna_texto('Nome', '')
         else:
-            status_predicao = 'RISCO_EVASAO'
+            nomes = np.array([f'Aluno_{indice + 1}' for indice in range(total)], dtype=object)
+        
+        # Determinar status da predição
+        situacao_predita = resultados_regras.situacao
+        status_predicao = np.where(
+            situacao_predita == 'Matriculado', 'MATRICULADO', 'RISCO_EVASAO'
+        ).astype(object)
         
         # Calcular nível de urgência baseado no status e probabilidade
-        if status_predicao == 'MATRICULADO':
-            # Alunos matriculados estão OK, sem urgência
-            nivel_urgencia = 'NENHUMA'
-        else:
-            # Para alunos em risco, usar probabilidade para definir urgência
-            probabilidade_num = resultado_regra.probabilidade
-            if probabilidade_num >= 0.9:
-                nivel_urgencia = 'URGENTE'
-            elif probabilidade_num >= 0.8:
-                nivel_urgencia = 'ALTA'
-            elif probabilidade_num >= 0.7:
-                nivel_urgencia = 'MEDIA'
-            else:
-                nivel_urgencia = 'BAIXA'
+        probabilidade = resultados_regras.probabilidade
+        nivel_urgencia = np.select(
+            [status_predicao == 'MATRICULADO', probabilidade >= 0.9,
+             probabilidade >= 0.8, probabilidade >= 0.7],
+            ['NENHUMA', 'URGENTE', 'ALTA', 'MEDIA'],
+            default='BAIXA'
+        ).astype(object)
         
         # Obter fator principal (feature mais importante do SHAP)
-        fator_principal = "N/A"
-        valor_importancia = 0.0
-        try:
-            if len(valores_shap) > indice_aluno and len(nomes_features) > 0:
-                valores_aluno = valores_shap[indice_aluno] if hasattr(valores_shap[indice_aluno], '__len__') else []
-                if len(valores_aluno) > 0:
-                    # Converter para numpy array se necessário
-                    import numpy as np
-                    valores_array = np.array(valores_aluno)
-                    
-                    # Para modelos multiclasse, valores SHAP têm forma (n_features, n_classes)
-                    # Calcular a importância absoluta máxima por feature (entre todas as classes)
-                    if valores_array.ndim == 2:  # Shape (n_features, n_classes)
-                        # Para cada feature, pegar o valor SHAP com maior magnitude absoluta
-                        importancias_features = np.max(np.abs(valores_array), axis=1)
-                        indice_max = np.argmax(importancias_features)
-                        
-                        if indice_max < len(nomes_features):
-                            fator_principal = nomes_features[indice_max]
-                            # Valor específico que teve maior impacto para esta feature
-                            classe_max = np.argmax(np.abs(valores_array[indice_max]))
-                            valor_importancia = float(valores_array[indice_max, classe_max])
-                    elif valores_array.ndim == 1:  # Shape (n_features,) - modelo binário
-                        indice_max = np.argmax(np.abs(valores_array))
-                        if indice_max < len(nomes_features):
-                            fator_principal = nomes_features[indice_max]
-                            valor_importancia = float(valores_array[indice_max])
-        except Exception as e:
-            # Se houver algum erro com SHAP, usar valores padrão
-            registrador.debug(f"Erro ao processar valores SHAP para aluno {indice_aluno}: {e}")
-            fator_principal = "N/A"
-            valor_importancia = 0.0
+        fatores_shap = resultado_ml.fatores_shap
+        if fatores_shap is None and resultado_ml.valores_shap is not None:
+            fatores_shap = self.preditor_ml.extrair_fatores_shap(
+                resultado_ml.valores_shap, df_processado.columns.tolist()
+            )
+        elif fatores_shap is None:
+            # Explicar apenas os alunos exigidos pelo modo de explicação
+            linhas = self._selecionar_linhas_explicacao(modo_explicacao, status_predicao, probabilidade,
+                                                        linhas_ml)
+            fatores_shap = self.preditor_ml.explicar_predicoes(
+                df_processado, linhas, np.argmax(resultado_ml.probabilidades, axis=1)
+            )
+        fator_principal = fatores_shap.fator_principal
+        valor_importancia = np.abs(fatores_shap.valor_importancia)
         
         # Mapear features técnicas para nomes amigáveis
         mapeamento_features = {
@@ -227,75 +573,58 @@ class SistemaPredicaoEvasao:
             'Faltas Consecutivas': 'Faltas Consec.',
             'Pend. Acad.': 'Pend. Acad.',
         }
-        fator_principal_amigavel = mapeamento_features.get(fator_principal, fator_principal)
-        
-        # Preparar informações sobre predições ML (top 3)
-        # Usar as classes reais do modelo - verificar diferentes chaves possíveis
-        if self.preditor_ml.info_classes:
-            if 'class_names' in self.preditor_ml.info_classes:
-                nomes_classes = list(self.preditor_ml.info_classes['class_names'])
-            elif 'classes' in self.preditor_ml.info_classes:
-                nomes_classes = list(self.preditor_ml.info_classes['classes'])
-            elif 'situacao_mapping' in self.preditor_ml.info_classes:
-                nomes_classes = list(self.preditor_ml.info_classes['situacao_mapping'].values())
-            else:
-                # Usar as chaves do próprio dicionário
-                nomes_classes = list(self.preditor_ml.info_classes.keys()) if isinstance(self.preditor_ml.info_classes, dict) else ['Classe_0', 'Classe_1', 'Classe_2', 'Classe_3', 'Classe_4', 'Classe_5']
-        else:
-            nomes_classes = ['Classe_0', 'Classe_1', 'Classe_2', 'Classe_3', 'Classe_4', 'Classe_5']
-            
-        probabilidades_ordenadas = sorted(enumerate(probabilidades_ml), key=lambda x: x[1], reverse=True)
-        
-        # Verificar se há probabilidades válidas
-        if not probabilidades_ordenadas or len(nomes_classes) == 0:
-            top_1_situacao = 'N/A'
-            top_1_prob = '0%'
-            top_2_situacao = 'N/A' 
-            top_2_prob = '0%'
-            top_3_situacao = 'N/A'
-            top_3_prob = '0%'
-        else:
-            # Garantir que os índices estão dentro dos limites
-            idx_0 = probabilidades_ordenadas[0][0] if len(probabilidades_ordenadas) > 0 else 0
-            top_1_situacao = nomes_classes[idx_0] if idx_0 < len(nomes_classes) else 'N/A'
-            top_1_prob = f"{probabilidades_ordenadas[0][1]*100:.1f}%" if probabilidades_ordenadas else '0%'
-            
-            idx_1 = probabilidades_ordenadas[1][0] if len(probabilidades_ordenadas) > 1 else 0
-            top_2_situacao = nomes_classes[idx_1] if len(probabilidades_ordenadas) > 1 and idx_1 < len(nomes_classes) else 'N/A'
-            top_2_prob = f"{probabilidades_ordenadas[1][1]*100:.1f}%" if len(probabilidades_ordenadas) > 1 else '0%'
-            
-            idx_2 = probabilidades_ordenadas[2][0] if len(probabilidades_ordenadas) > 2 else 0
-            top_3_situacao = nomes_classes[idx_2] if len(probabilidades_ordenadas) > 2 and idx_2 < len(nomes_classes) else 'N/A'
-            top_3_prob = f"{probabilidades_ordenadas[2][1]*100:.1f}%" if len(probabilidades_ordenadas) > 2 else '0%'
+        fator_principal = pd.Series(fator_principal).replace(mapeamento_features).to_numpy(dtype=object)
         
         # Fonte da predição
-        if resultado_regra.regra_aplicada == 'ML':
-            fonte_predicao = 'Predição ML'
-        else:
-            fonte_predicao = f"Regra {resultado_regra.regra_aplicada}: {resultado_regra.razao}"
-        
-        return PredicaoAluno(
-            nome=nome,
-            matricula=matricula,
-            situacao_atual=situacao_atual,
-            curso=curso,
-            sexo=sexo,
-            turma=turma,
-            status_predicao=status_predicao,
-            situacao_predita=resultado_regra.situacao,
-            probabilidade_situacao=f"{resultado_regra.probabilidade*100:.1f}%",
-            probabilidade_evasao_total=f"{resultado_regra.probabilidade*100:.1f}%",
-            nivel_urgencia=nivel_urgencia,
-            fator_principal=fator_principal_amigavel,
-            valor_importancia=abs(valor_importancia),
-            confianca_predicao='Alta',
-            fonte_predicao=fonte_predicao,
-            predicao_ml_original=top_1_situacao,
-            prob_ml_original=top_1_prob,
-            top_1_situacao_ml=top_1_situacao,
-            top_1_probabilidade_ml=top_1_prob,
-            top_2_situacao_ml=top_2_situacao,
-            top_2_probabilidade_ml=top_2_prob,
-            top_3_situacao_ml=top_3_situacao,
-            top_3_probabilidade_ml=top_3_prob
-        )
\ No newline at end of file
+        regra_aplicada = resultados_regras.regra_aplicada
+        fonte_predicao = np.where(
+            regra_aplicada == 'ML',
+            'Predição ML',
+            'Regra ' + regra_aplicada.astype(str).astype(object) + ': ' + resultados_regras.razao
+        ).astype(object)
+        
+        dados = pd.DataFrame({
+            'nome': nomes,
+            'matricula': CarregadorDados.limpar_identificadores_alunos(df),
+            'situacao_atual': coluna_texto('Situação', 'Não informada'),
+            'curso': coluna_texto('Curso', 'Não informado'),
+            'sexo': coluna_texto('Sexo', 'Não informado'),
+            'turma': coluna_texto('Turma Atual', 'Não informada'),
+            'status_predicao': status_predicao,
+            'situacao_predita': situacao_predita,
+            'probabilidade_situacao': probabilidade,
+            'nivel_urgencia': nivel_urgencia,
+            'fator_principal': fator_principal,
+            'valor_importancia': valor_importancia,
+            'fonte_predicao': fonte_predicao,
+            'regra_aplicada': regra_aplicada
+        })
+        
+        return ResultadoPredicoes(
+            dados=dados,
+            indices_top=resultado_ml.indices_top,
+            probabilidades_top=resultado_ml.probabilidades_top,
+            nomes_classes=self.preditor_ml.obter_nomes_classes(),
+            fatores_shap=fatores_shap
+        )
+    
+    @staticmethod
+    def _selecionar_linhas_explicacao(modo_explicacao: str, status_predicao: np.ndarray,
+                                      probabilidade: np.ndarray,
+                                      linhas_elegiveis: Optional[np.ndarray] = None) -> np.ndarray:
+        """Retorna as posições dos alunos que devem receber explicação SHAP."""
+        if modo_explicacao == 'desativado':
+            return np.empty(0, dtype=np.intp)
+        if linhas_elegiveis is None:
+            linhas_elegiveis = np.arange(len(status_predicao))
+        if modo_explicacao == 'completo':
+            return linhas_elegiveis
+        
+        linhas_risco = linhas_elegiveis[status_predicao[linhas_elegiveis] == 'RISCO_EVASAO']
+        if modo_explicacao == 'apenas_risco':
+            return linhas_risco
+        
+        # top_n_urgencia: a urgência cresce com a probabilidade entre os alunos em risco
+        limite = max(configuracoes.modelo.limite_explicacao_urgencia, 0)
+        ordem = np.argsort(-probabilidade[linhas_risco], kind='stable')[:limite]
+        return np.sort(linhas_risco[ordem])
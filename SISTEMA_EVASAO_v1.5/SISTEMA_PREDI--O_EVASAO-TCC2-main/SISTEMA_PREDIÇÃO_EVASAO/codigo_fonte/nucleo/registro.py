@@ -0,0 +1,108 @@
+﻿"""
+Registro de sistemas de predição já inicializados, compartilhado pelo processo.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from ..utilitarios import obter_registrador
+from ..configuracao import configuracoes
+from .preditor import SistemaPredicaoEvasao
+
+registrador = obter_registrador(__name__)
+
+class RegistroSistemas:
+    """
+    Mantém um SistemaPredicaoEvasao aquecido por modelo.
+    
+    A chave é o caminho do modelo; a assinatura (mtime e tamanho do modelo,
+    do mapeamento de classes, dos artifacts de treinamento e das planilhas
+    curriculares) decide quando recarregar. Seguro para uso concorrente:
+    cada modelo é inicializado uma única vez mesmo com várias sessões
+    pedindo ao mesmo tempo.
+    """
+    
+    def __init__(self):
+        """Inicializa o registro vazio."""
+        self._sistemas: Dict[Path, Tuple[Tuple, SistemaPredicaoEvasao]] = {}
+        self._travas: Dict[Path, threading.Lock] = {}
+        self._trava = threading.Lock()
+    
+    @staticmethod
+    def calcular_assinatura(caminho_modelo: Path) -> Tuple:
+        """
+        Calcula a assinatura dos arquivos que o sistema carrega na inicialização.
+        
+        Args:
+            caminho_modelo: Caminho do modelo
+            
+        Returns:
+            Tupla com (mtime, tamanho) de cada arquivo; None se não existir
+        """
+        arquivos = [
+            caminho_modelo,
+            configuracoes.obter_caminho_mapeamento_classes(),
+            configuracoes.dados.diretorio_modelos / "training_artifacts.pkl",
+            configuracoes.obter_caminho_disciplinas(),
+            configuracoes.obter_caminho_cursos()
+        ]
+        assinatura = []
+        for arquivo in arquivos:
+            try:
+                estado = arquivo.stat()
+                assinatura.append((estado.st_mtime_ns, estado.st_size))
+            except OSError:
+                assinatura.append(None)
+        return tuple(assinatura)
+    
+    def obter(self, caminho_modelo: Optional[Path] = None) -> SistemaPredicaoEvasao:
+        """
+        Retorna o sistema inicializado para o modelo, carregando se necessário.
+        
+        Args:
+            caminho_modelo: Caminho do modelo (padrão: configuracoes.obter_caminho_modelo())
+            
+        Returns:
+            Sistema pronto para predizer_alunos
+        """
+        if caminho_modelo is None:
+            caminho_modelo = configuracoes.obter_caminho_modelo()
+        caminho_modelo = Path(caminho_modelo).resolve()
+        
+        with self._trava:
+            trava_modelo = self._travas.setdefault(caminho_modelo, threading.Lock())
+        
+        with trava_modelo:
+            assinatura = self.calcular_assinatura(caminho_modelo)
+            registro = self._sistemas.get(caminho_modelo)
+            if registro is not None and registro[0] == assinatura:
+                return registro[1]
+            
+            if registro is not None:
+                registrador.info(f"Artefatos alterados em disco, recarregando sistema: {caminho_modelo.name}")
+            
+            sistema = SistemaPredicaoEvasao(caminho_modelo)
+            sistema.inicializar()
+            self._sistemas[caminho_modelo] = (assinatura, sistema)
+            return sistema
+    
+    def limpar(self) -> None:
+        """Descarta todos os sistemas carregados."""
+        with self._trava:
+            self._sistemas.clear()
+
+# Registro único do processo
+_registro = RegistroSistemas()
+
+def obter_sistema_predicao(caminho_modelo: Optional[Path] = None) -> SistemaPredicaoEvasao:
+    """
+    Retorna o sistema de predição aquecido do processo.
+    
+    Args:
+        caminho_modelo: Caminho do modelo (padrão: configuracoes.obter_caminho_modelo())
+        
+    Returns:
+        Sistema inicializado, recarregado apenas quando os artefatos mudam
+    """
+    return _registro.obter(caminho_modelo)
@@ -0,0 +1,267 @@
+﻿"""
+Estruturas de resultado das predições de evasão.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
+
+import numpy as np
+import pandas as pd
+
+from ..modelos import FatoresShap
+from ..utilitarios import medir_etapa
+
+@dataclass
+class PredicaoAluno:
+    """Dados de predição para um aluno."""
+    nome: str
+    matricula: str
+    situacao_atual: str
+    curso: str
+    sexo: str
+    turma: str
+    status_predicao: str  # MATRICULADO ou RISCO_EVASAO
+    situacao_predita: str
+    probabilidade_situacao: str
+    probabilidade_evasao_total: str
+    nivel_urgencia: str
+    fator_principal: str
+    valor_importancia: float
+    confianca_predicao: str
+    fonte_predicao: str
+    predicao_ml_original: str
+    prob_ml_original: str
+    top_1_situacao_ml: str
+    top_1_probabilidade_ml: str
+    top_2_situacao_ml: str
+    top_2_probabilidade_ml: str
+    top_3_situacao_ml: str
+    top_3_probabilidade_ml: str
+
+# Cabeçalhos do CSV completo de análise, na ordem de exportação
+COLUNAS_EXPORTACAO = [
+    'Nome', 'Matricula', 'Situacao_Atual_Sistema', 'Curso', 'Sexo', 'Turma',
+    'Status_Predicao', 'Situacao_Predita', 'Probabilidade_Situacao',
+    'Probabilidade_Evasao_Total', 'Nivel_Urgencia', 'Fator_Principal',
+    'Valor_Importancia', 'Confianca_Predicao', 'Fonte_Predicao',
+    'Predicao_ML_Original', 'Prob_ML_Original',
+    'Top_1_Situacao_ML', 'Top_1_Probabilidade_ML',
+    'Top_2_Situacao_ML', 'Top_2_Probabilidade_ML',
+    'Top_3_Situacao_ML', 'Top_3_Probabilidade_ML'
+]
+
+def formatar_percentual(probabilidades: np.ndarray) -> np.ndarray:
+    """
+    Formata probabilidades (0-1) como texto percentual, ex.: 0.875 -> '87.5%'.
+    
+    Args:
+        probabilidades: Array de probabilidades; NaN vira '0%'
+        
+    Returns:
+        Array de strings formatadas
+    """
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    formatadas = np.char.add(np.char.mod('%.1f', probabilidades * 100), '%').astype(object)
+    formatadas[np.isnan(probabilidades)] = '0%'
+    return formatadas
+
+@dataclass
+class ResultadoPredicoes:
+    """
+    Resultado colunar das predições de um arquivo de alunos.
+    
+    Mantém as probabilidades como float e as classes ML como índices; a
+    formatação em texto (percentuais, nomes das classes) só acontece na
+    exportação.
+    
+    Attributes:
+        dados: DataFrame com uma linha por aluno e colunas brutas
+            (nome, matricula, situacao_atual, curso, sexo, turma,
+            status_predicao, situacao_predita, probabilidade_situacao,
+            nivel_urgencia, fator_principal, valor_importancia,
+            fonte_predicao, regra_aplicada)
+        indices_top: Matriz (n_alunos, k) com os índices das k classes ML mais
+            prováveis em ordem decrescente; -1 quando não há classe
+        probabilidades_top: Matriz (n_alunos, k) com as probabilidades
+            correspondentes; NaN quando não há classe
+        nomes_classes: Nomes das classes indexadas por indices_top
+        fatores_shap: Fatores SHAP de cada aluno (fator principal e, se
+            configurado, os maiores contribuintes positivos/negativos)
+    """
+    dados: pd.DataFrame
+    indices_top: np.ndarray
+    probabilidades_top: np.ndarray
+    nomes_classes: List[str] = field(default_factory=list)
+    fatores_shap: Optional[FatoresShap] = None
+    
+    def __len__(self) -> int:
+        return len(self.dados)
+    
+    def __iter__(self) -> Iterator[PredicaoAluno]:
+        """Itera sobre os alunos como PredicaoAluno (compatibilidade)."""
+        for registro in self.para_dataframe_exportacao().to_dict('records'):
+            yield PredicaoAluno(*registro.values())
+    
+    def __getitem__(self, indice: int) -> PredicaoAluno:
+        """Retorna um aluno como PredicaoAluno (compatibilidade), formatando só a sua linha."""
+        posicao = [indice]
+        linha = ResultadoPredicoes(
+            dados=self.dados.iloc[posicao],
+            indices_top=self.indices_top[posicao],
+            probabilidades_top=self.probabilidades_top[posicao],
+            nomes_classes=self.nomes_classes
+        )
+        registro = linha.para_dataframe_exportacao().to_dict('records')[0]
+        return PredicaoAluno(*registro.values())
+    
+    def contar(self, coluna: str, valor: Any) -> int:
+        """
+        Conta quantos alunos têm determinado valor em uma coluna bruta.
+        
+        Args:
+            coluna: Nome da coluna em dados (ex.: 'status_predicao')
+            valor: Valor procurado
+            
+        Returns:
+            Quantidade de alunos
+        """
+        return int((self.dados[coluna] == valor).sum())
+    
+    def selecionar(self, posicoes: np.ndarray) -> 'ResultadoPredicoes':
+        """
+        Retorna os alunos nas posições informadas, nessa ordem.
+        
+        Args:
+            posicoes: Posição de origem de cada aluno do resultado
+            
+        Returns:
+            Novo ResultadoPredicoes
+        """
+        return ResultadoPredicoes(
+            dados=self.dados.iloc[posicoes].reset_index(drop=True),
+            indices_top=self.indices_top[posicoes],
+            probabilidades_top=self.probabilidades_top[posicoes],
+            nomes_classes=self.nomes_classes,
+            fatores_shap=None if self.fatores_shap is None else self.fatores_shap.selecionar(posicoes)
+        )
+    
+    @staticmethod
+    def concatenar(partes: List['ResultadoPredicoes']) -> 'ResultadoPredicoes':
+        """
+        Junta resultados de lotes diferentes do mesmo modelo, na ordem informada.
+        
+        Args:
+            partes: Resultados a juntar (ao menos um)
+            
+        Returns:
+            Novo ResultadoPredicoes com os alunos de todas as partes
+        """
+        if len(partes) == 1:
+            return partes[0]
+        return ResultadoPredicoes(
+            dados=pd.concat([parte.dados for parte in partes], ignore_index=True),
+            indices_top=np.concatenate([parte.indices_top for parte in partes]),
+            probabilidades_top=np.concatenate([parte.probabilidades_top for parte in partes]),
+            nomes_classes=partes[0].nomes_classes,
+            fatores_shap=FatoresShap.concatenar([parte.fatores_shap for parte in partes])
+        )
+    
+    def obter_situacoes_top(self, posicao: int) -> np.ndarray:
+        """
+        Retorna o nome da classe ML na posição informada do top-k.
+        
+        Args:
+            posicao: Posição no ranking (0 = mais provável)
+            
+        Returns:
+            Array com o nome da classe ou 'N/A'
+        """
+        total = len(self.dados)
+        if posicao >= self.indices_top.shape[1] or not self.nomes_classes:
+            return np.full(total, 'N/A', dtype=object)
+        
+        nomes = np.asarray(list(self.nomes_classes) + ['N/A'], dtype=object)
+        indices = self.indices_top[:, posicao]
+        indices = np.where((indices >= 0) & (indices < len(self.nomes_classes)), indices, len(self.nomes_classes))
+        return nomes[indices]
+    
+    def obter_probabilidades_top(self, posicao: int) -> np.ndarray:
+        """
+        Retorna a probabilidade ML na posição informada do top-k.
+        
+        Args:
+            posicao: Posição no ranking (0 = mais provável)
+            
+        Returns:
+            Array de float; NaN quando não há classe
+        """
+        total = len(self.dados)
+        if posicao >= self.probabilidades_top.shape[1] or not self.nomes_classes:
+            return np.full(total, np.nan)
+        return self.probabilidades_top[:, posicao]
+    
+    def para_dataframe_exportacao(self, colunas: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Monta o DataFrame formatado no layout do CSV de análise.
+        
+        Args:
+            colunas: Subconjunto de COLUNAS_EXPORTACAO a incluir (padrão: todas)
+            
+        Returns:
+            DataFrame com percentuais já formatados como texto
+        """
+        colunas = colunas or COLUNAS_EXPORTACAO
+        dados = self.dados
+        probabilidade_situacao = formatar_percentual(dados['probabilidade_situacao'].to_numpy())
+        
+        construtores = {
+            'Nome': lambda: dados['nome'].to_numpy(),
+            'Matricula': lambda: dados['matricula'].to_numpy(),
+            'Situacao_Atual_Sistema': lambda: dados['situacao_atual'].to_numpy(),
+            'Curso': lambda: dados['curso'].to_numpy(),
+            'Sexo': lambda: dados['sexo'].to_numpy(),
+            'Turma': lambda: dados['turma'].to_numpy(),
+            'Status_Predicao': lambda: dados['status_predicao'].to_numpy(),
+            'Situacao_Predita': lambda: dados['situacao_predita'].to_numpy(),
+            'Probabilidade_Situacao': lambda: probabilidade_situacao,
+            'Probabilidade_Evasao_Total': lambda: probabilidade_situacao,
+            'Nivel_Urgencia': lambda: dados['nivel_urgencia'].to_numpy(),
+            'Fator_Principal': lambda: dados['fator_principal'].to_numpy(),
+            'Valor_Importancia': lambda: dados['valor_importancia'].to_numpy(),
+            'Confianca_Predicao': lambda: np.full(len(dados), 'Alta', dtype=object),
+            'Fonte_Predicao': lambda: dados['fonte_predicao'].to_numpy(),
+            'Predicao_ML_Original': lambda: self.obter_situacoes_top(0),
+            'Prob_ML_Original': lambda: formatar_percentual(self.obter_probabilidades_top(0)),
+        }
+        for posicao in range(3):
+            construtores[f'Top_{posicao + 1}_Situacao_ML'] = (
+                lambda posicao=posicao: self.obter_situacoes_top(posicao)
+            )
+            construtores[f'Top_{posicao + 1}_Probabilidade_ML'] = (
+                lambda posicao=posicao: formatar_percentual(self.obter_probabilidades_top(posicao))
+            )
+        
+        return pd.DataFrame({coluna: construtores[coluna]() for coluna in colunas})
+    
+    def salvar_csv(self, arquivo_saida: Union[Path, TextIO], colunas: Optional[List[str]] = None,
+                   colunas_extras: Optional[Dict[str, Any]] = None,
+                   encoding: str = 'utf-8', cabecalho: bool = True) -> None:
+        """
+        Salva as predições em CSV de uma só vez.
+        
+        Args:
+            arquivo_saida: Caminho do arquivo de saída ou arquivo texto já aberto
+                (aberto com newline=''), no qual as linhas são acrescentadas
+            colunas: Subconjunto de COLUNAS_EXPORTACAO a incluir (padrão: todas)
+            colunas_extras: Colunas constantes adicionadas ao final (ex.: data)
+            encoding: Codificação do arquivo (ignorada para arquivo já aberto)
+            cabecalho: Escreve a linha de cabeçalho (False ao acrescentar blocos)
+        """
+        with medir_etapa('export', linhas=len(self)):
+            exportacao = self.para_dataframe_exportacao(colunas)
+            for nome_coluna, valor in (colunas_extras or {}).items():
+                exportacao[nome_coluna] = valor
+            # Mesmo terminador de linha do csv.writer usado nas exportações anteriores
+            exportacao.to_csv(arquivo_saida, index=False, encoding=encoding, lineterminator='\r\n',
+                              header=cabecalho)
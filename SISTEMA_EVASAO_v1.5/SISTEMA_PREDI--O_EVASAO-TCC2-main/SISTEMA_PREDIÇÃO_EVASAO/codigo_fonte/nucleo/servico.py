@@ -0,0 +1,430 @@
+﻿"""
+Serviço residente de predição com agrupamento de requisições em micro-lotes.
+"""
+
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from ..utilitarios import obter_registrador, Instrumentacao, ativar_instrumentacao
+from ..configuracao import configuracoes, ConfiguracaoServico
+from .preditor import MODOS_EXPLICACAO
+from .registro import obter_sistema_predicao
+
+registrador = obter_registrador(__name__)
+
+class ServicoSobrecarregado(RuntimeError):
+    """A fila de requisições do serviço está cheia."""
+
+@dataclass
+class PedidoPredicao:
+    """Requisição aguardando um micro-lote."""
+    alunos: pd.DataFrame
+    modo_explicacao: str
+    futuro: Future = field(default_factory=Future)
+    recebido_em: float = field(default_factory=time.perf_counter)
+
+class ServicoPredicao:
+    """
+    Mantém o sistema de predição aquecido e agrupa requisições concorrentes.
+    
+    As requisições entram em uma fila limitada; uma única thread de trabalho
+    junta as que chegam dentro de espera_maxima_lote_ms (até
+    tamanho_maximo_lote alunos e com o mesmo modo de explicação) e faz uma
+    só chamada a predizer_alunos para o lote. Com a fila cheia, novas
+    requisições são recusadas com ServicoSobrecarregado em vez de acumular
+    memória.
+    
+    No modo top_n_urgencia o limite de alunos explicados vale para o
+    micro-lote inteiro, não para cada requisição.
+    """
+    
+    def __init__(self, configuracao: Optional[ConfiguracaoServico] = None,
+                 caminho_modelo: Optional[str] = None):
+        """
+        Inicializa o serviço.
+        
+        Args:
+            configuracao: Configurações do serviço (padrão: configuracoes.servico)
+            caminho_modelo: Caminho do modelo (padrão: configuracoes.obter_caminho_modelo())
+        """
+        self.configuracao = configuracao or configuracoes.servico
+        self.caminho_modelo = caminho_modelo
+        self._fila: 'queue.Queue[Optional[PedidoPredicao]]' = queue.Queue(self.configuracao.tamanho_fila)
+        self._adiado: Optional[PedidoPredicao] = None
+        self._thread: Optional[threading.Thread] = None
+        self._trava_estatisticas = threading.Lock()
+        self.estatisticas = {
+            'requests': 0,
+            'rejected_requests': 0,
+            'failed_requests': 0,
+            'batches': 0,
+            'students': 0,
+            'largest_batch': 0,
+            'prediction_seconds': 0.0
+        }
+        # Etapas de todos os micro-lotes, expostas em GET /metricas
+        self.instrumentacao = Instrumentacao() if configuracoes.logs.instrumentacao else None
+    
+    def iniciar(self) -> None:
+        """Carrega o sistema de predição e inicia a thread de micro-lotes."""
+        if self._thread is not None:
+            return
+        
+        # Carregar modelo, explicador e currículo antes de aceitar requisições
+        obter_sistema_predicao(self.caminho_modelo)
+        
+        self._thread = threading.Thread(target=self._executar_lotes, name='micro-lotes', daemon=True)
+        self._thread.start()
+        registrador.info("Serviço de predição iniciado")
+    
+    def parar(self) -> None:
+        """Finaliza a thread de micro-lotes após processar o que já está na fila."""
+        if self._thread is None:
+            return
+        self._fila.put(None)
+        self._thread.join()
+        self._thread = None
+        registrador.info("Serviço de predição finalizado")
+    
+    def submeter(self, alunos: Union[pd.DataFrame, Dict[str, Any], List[Dict[str, Any]]],
+                 modo_explicacao: Optional[str] = None) -> Future:
+        """
+        Enfileira alunos para predição.
+        
+        Args:
+            alunos: Um aluno (dicionário coluna→valor), lista de alunos ou DataFrame,
+                com as mesmas colunas da planilha do AcadWeb
+            modo_explicacao: Modo de explicação SHAP (padrão: configuracoes.modelo.modo_explicacao)
+            
+        Returns:
+            Future com a lista de registros no layout de COLUNAS_EXPORTACAO
+            
+        Raises:
+            ValueError: Se a entrada ou o modo de explicação forem inválidos
+            ServicoSobrecarregado: Se a fila estiver cheia
+        """
+        if self._thread is None:
+            raise RuntimeError("Serviço não foi iniciado. Chame iniciar() primeiro.")
+        
+        df = self.converter_alunos(alunos)
+        if len(df) > self.configuracao.maximo_alunos_requisicao:
+            raise ValueError(f"Requisição com {len(df)} alunos excede o máximo de "
+                             f"{self.configuracao.maximo_alunos_requisicao}")
+        
+        if modo_explicacao is None:
+            modo_explicacao = configuracoes.modelo.modo_explicacao
+        if modo_explicacao not in MODOS_EXPLICACAO:
+            raise ValueError(f"Modo de explicação inválido: {modo_explicacao}. Use um de {MODOS_EXPLICACAO}")
+        
+        pedido = PedidoPredicao(df, modo_explicacao)
+        try:
+            self._fila.put_nowait(pedido)
+        except queue.Full:
+            with self._trava_estatisticas:
+                self.estatisticas['rejected_requests'] += 1
+            raise ServicoSobrecarregado(f"Fila de predição cheia ({self.configuracao.tamanho_fila} requisições)")
+        
+        with self._trava_estatisticas:
+            self.estatisticas['requests'] += 1
+        return pedido.futuro
+    
+    def predizer(self, alunos: Union[pd.DataFrame, Dict[str, Any], List[Dict[str, Any]]],
+                 modo_explicacao: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Prediz os alunos aguardando o micro-lote correspondente.
+        
+        Args:
+            alunos: Um aluno, lista de alunos ou DataFrame
+            modo_explicacao: Modo de explicação SHAP
+            
+        Returns:
+            Lista de registros no layout de COLUNAS_EXPORTACAO
+        """
+        futuro = self.submeter(alunos, modo_explicacao)
+        return futuro.result(timeout=self.configuracao.tempo_limite_requisicao_s)
+    
+    def obter_estado(self) -> Dict[str, Any]:
+        """
+        Retorna o estado e os contadores do serviço.
+        
+        Returns:
+            Dicionário com contadores e ocupação da fila
+        """
+        with self._trava_estatisticas:
+            estado = dict(self.estatisticas)
+        estado['queued_requests'] = self._fila.qsize()
+        estado['queue_capacity'] = self.configuracao.tamanho_fila
+        estado['running'] = self._thread is not None and self._thread.is_alive()
+        return estado
+    
+    def obter_metricas_prometheus(self) -> str:
+        """
+        Retorna os contadores do serviço e, com configuracoes.logs.instrumentacao,
+        as medições das etapas no formato texto do Prometheus.
+        
+        Returns:
+            Texto de exposição do Prometheus
+        """
+        linhas = []
+        for chave, valor in self.obter_estado().items():
+            nome_metrica = f"evasao_service_{chave}"
+            linhas.append(f"# TYPE {nome_metrica} {'counter' if chave in self.estatisticas else 'gauge'}")
+            linhas.append(f"{nome_metrica} {int(valor) if isinstance(valor, bool) else valor}")
+        texto = '\n'.join(linhas) + '\n'
+        if self.instrumentacao is not None:
+            texto += self.instrumentacao.para_prometheus()
+        return texto
+    
+    @staticmethod
+    def converter_alunos(alunos: Union[pd.DataFrame, Dict[str, Any], List[Dict[str, Any]]]) -> pd.DataFrame:
+        """
+        Converte a entrada de uma requisição em DataFrame.
+        
+        Args:
+            alunos: Um aluno, lista de alunos ou DataFrame
+            
+        Returns:
+            DataFrame com uma linha por aluno
+            
+        Raises:
+            ValueError: Se a entrada estiver vazia ou em formato inválido
+        """
+        if isinstance(alunos, pd.DataFrame):
+            df = alunos.reset_index(drop=True)
+        elif isinstance(alunos, dict):
+            df = pd.DataFrame([alunos])
+        elif isinstance(alunos, list) and all(isinstance(aluno, dict) for aluno in alunos):
+            df = pd.DataFrame(alunos)
+        else:
+            raise ValueError("Alunos devem ser um objeto ou uma lista de objetos coluna→valor")
+        
+        if df.empty:
+            raise ValueError("Nenhum aluno informado")
+        
+        # Mesma representação de ausentes da planilha lida do disco: NaN em vez
+        # de None, e colunas só com nulos (comum em um único aluno) como float
+        for coluna in df.columns[df.dtypes == object]:
+            if df[coluna].isna().all():
+                df[coluna] = df[coluna].astype(float)
+            else:
+                df[coluna] = df[coluna].where(df[coluna].notna(), np.nan)
+        return df
+    
+    def _executar_lotes(self) -> None:
+        """Laço da thread de trabalho: forma micro-lotes e os processa."""
+        while True:
+            lote = self._formar_lote()
+            if lote is None:
+                return
+            self._processar_lote(lote)
+    
+    def _formar_lote(self) -> Optional[List[PedidoPredicao]]:
+        """Aguarda a primeira requisição e agrupa as que chegarem na janela do lote."""
+        primeiro = self._adiado
+        self._adiado = None
+        if primeiro is None:
+            primeiro = self._fila.get()
+            if primeiro is None:
+                return None
+        
+        lote = [primeiro]
+        total_alunos = len(primeiro.alunos)
+        limite = time.perf_counter() + self.configuracao.espera_maxima_lote_ms / 1000
+        
+        while total_alunos < self.configuracao.tamanho_maximo_lote:
+            restante = limite - time.perf_counter()
+            try:
+                pedido = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            
+            if pedido is None:
+                # Processar o lote atual e encerrar na próxima volta
+                self._fila.put(None)
+                break
+            if (pedido.modo_explicacao != primeiro.modo_explicacao
+                    or total_alunos + len(pedido.alunos) > self.configuracao.tamanho_maximo_lote):
+                self._adiado = pedido
+                break
+            
+            lote.append(pedido)
+            total_alunos += len(pedido.alunos)
+        
+        return lote
+    
+    def _processar_lote(self, lote: List[PedidoPredicao]) -> None:
+        """
+        Faz uma única predição para o lote e devolve a fatia de cada requisição.
+        
+        Se a predição do lote falhar, cada requisição é refeita sozinha, de
+        modo que o erro chega apenas às requisições que o provocam.
+        """
+        inicio = time.perf_counter()
+        try:
+            # O registro devolve o sistema aquecido e o recarrega se os artefatos mudarem
+            sistema = obter_sistema_predicao(self.caminho_modelo)
+            # predizer_alunos converte as features valor a valor, então o resultado
+            # de cada aluno não depende das requisições que dividem o lote
+            df = pd.concat([pedido.alunos for pedido in lote], ignore_index=True, sort=False)
+            with ativar_instrumentacao(self.instrumentacao):
+                resultado, _ = sistema.predizer_alunos(df, modo_explicacao=lote[0].modo_explicacao)
+            
+            exportacao = resultado.para_dataframe_exportacao()
+            exportacao = exportacao.astype(object).where(exportacao.notna(), None)
+            registros = exportacao.to_dict('records')
+        except Exception as e:
+            if len(lote) > 1:
+                # Refazer cada requisição sozinha para que só a inválida receba o erro
+                registrador.warning(f"Erro no micro-lote de {len(lote)} requisições ({e}); "
+                                    f"processando-as individualmente")
+                for pedido in lote:
+                    self._processar_lote([pedido])
+                return
+            registrador.error(f"Erro na requisição de {len(lote[0].alunos)} alunos: {e}", exc_info=True)
+            with self._trava_estatisticas:
+                self.estatisticas['failed_requests'] += 1
+            lote[0].futuro.set_exception(e)
+            return
+        
+        posicao = 0
+        for pedido in lote:
+            quantidade = len(pedido.alunos)
+            pedido.futuro.set_result(registros[posicao:posicao + quantidade])
+            posicao += quantidade
+        
+        duracao = time.perf_counter() - inicio
+        with self._trava_estatisticas:
+            self.estatisticas['batches'] += 1
+            self.estatisticas['students'] += len(df)
+            self.estatisticas['largest_batch'] = max(self.estatisticas['largest_batch'], len(df))
+            self.estatisticas['prediction_seconds'] += duracao
+        registrador.debug("Micro-lote: %d requisições, %d alunos em %.3fs", len(lote), len(df), duracao)
+
+class ManipuladorPredicao(BaseHTTPRequestHandler):
+    """
+    Rotas HTTP do serviço.
+    
+    GET /saude devolve o estado do serviço e GET /metricas os mesmos
+    contadores (mais as etapas medidas, se a instrumentação estiver ligada)
+    no formato do Prometheus. POST /predizer recebe um aluno
+    (objeto JSON), uma lista de alunos ou {"alunos": [...], "modo_explicacao": ...}
+    e devolve {"predicoes": [...]} na mesma ordem.
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self) -> None:
+        """Atende GET /saude e GET /metricas."""
+        rota = self.path.rstrip('/')
+        if rota == '/metricas':
+            corpo = self.server.servico.obter_metricas_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+            return
+        if rota != '/saude':
+            self._responder(404, {'erro': 'Rota não encontrada'})
+            return
+        self._responder(200, {'status': 'ok', **self.server.servico.obter_estado()})
+    
+    def do_POST(self) -> None:
+        """Atende POST /predizer."""
+        if self.path.rstrip('/') != '/predizer':
+            self._responder(404, {'erro': 'Rota não encontrada'})
+            return
+        
+        servico = self.server.servico
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+            corpo = json.loads(self.rfile.read(tamanho) or b'null')
+            modo_explicacao = None
+            if isinstance(corpo, dict) and 'alunos' in corpo:
+                modo_explicacao = corpo.get('modo_explicacao')
+                corpo = corpo['alunos']
+            
+            futuro = servico.submeter(corpo, modo_explicacao)
+            predicoes = futuro.result(timeout=servico.configuracao.tempo_limite_requisicao_s)
+        except ServicoSobrecarregado as e:
+            self._responder(503, {'erro': str(e)}, {'Retry-After': '1'})
+            return
+        except (ValueError, json.JSONDecodeError) as e:
+            self._responder(400, {'erro': str(e)})
+            return
+        except TempoEsgotado:
+            self._responder(504, {'erro': 'Tempo limite da predição excedido'})
+            return
+        except Exception as e:
+            self._responder(500, {'erro': str(e)})
+            return
+        
+        self._responder(200, {'predicoes': predicoes})
+    
+    def _responder(self, codigo: int, conteudo: Dict[str, Any],
+                   cabecalhos: Optional[Dict[str, str]] = None) -> None:
+        """Envia uma resposta JSON."""
+        corpo = json.dumps(conteudo, ensure_ascii=False, default=_converter_json).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+    
+    def address_string(self) -> str:
+        """Em sockets Unix o cliente não tem endereço IP."""
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return 'unix'
+    
+    def log_message(self, formato: str, *args: Any) -> None:
+        """Envia o log de acesso ao registrador em vez do stderr."""
+        if registrador.isEnabledFor(logging.DEBUG):
+            registrador.debug("%s - %s", self.address_string(), formato % args)
+
+class ServidorHTTPUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP multithread sobre socket Unix."""
+    daemon_threads = True
+
+def _converter_json(valor: Any) -> Any:
+    """Converte escalares numpy restantes para tipos JSON."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+def criar_servidor(servico: ServicoPredicao) -> socketserver.BaseServer:
+    """
+    Cria o servidor HTTP do serviço em localhost ou no socket Unix configurado.
+    
+    Args:
+        servico: Serviço de predição já iniciado
+        
+    Returns:
+        Servidor pronto para serve_forever()
+    """
+    configuracao = servico.configuracao
+    if configuracao.caminho_socket:
+        if os.path.exists(configuracao.caminho_socket):
+            os.unlink(configuracao.caminho_socket)
+        servidor = ServidorHTTPUnix(configuracao.caminho_socket, ManipuladorPredicao)
+        registrador.info(f"Serviço escutando no socket {configuracao.caminho_socket}")
+    else:
+        servidor = ThreadingHTTPServer((configuracao.host, configuracao.porta), ManipuladorPredicao)
+        registrador.info(f"Serviço escutando em http://{configuracao.host}:{configuracao.porta}")
+    
+    servidor.servico = servico
+    return servidor
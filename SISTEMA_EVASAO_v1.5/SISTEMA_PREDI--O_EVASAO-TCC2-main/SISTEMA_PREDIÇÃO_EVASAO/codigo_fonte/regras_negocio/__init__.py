@@ -2,11 +2,14 @@
 Módulo de regras de negócio.
 """
 
-from .motor_regras import MotorRegrasNegocio, ResultadoRegra
+from .motor_regras import MotorRegrasNegocio, ResultadoRegra, ResultadoRegrasLote
 from .analisador_curriculo import AnalisadorCurriculo
+from .indice_curricular import IndiceCurricular
 
 __all__ = [
     'MotorRegrasNegocio',
     'ResultadoRegra',
-    'AnalisadorCurriculo'
+    'ResultadoRegrasLote',
+    'AnalisadorCurriculo',
+    'IndiceCurricular'
 ]
\ No newline at end of file
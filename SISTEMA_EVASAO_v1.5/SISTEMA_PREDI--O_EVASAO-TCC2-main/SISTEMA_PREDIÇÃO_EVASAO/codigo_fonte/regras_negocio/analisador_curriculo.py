@@ -2,49 +2,49 @@
 Analisador de grade curricular para regras de negócio.
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, Optional, List
 
-from ..utilitarios import obter_registrador
+from ..utilitarios import obter_registrador, aplicar_por_valor_unico, obter_coluna, AMOSTRAR
+from .indice_curricular import IndiceCurricular
 
 registrador = obter_registrador(__name__)
 
+# Módulos de um curso quando a grade curricular não informa (mesma suposição de _eh_modulo_final)
+MODULOS_PADRAO = 4
+
 class AnalisadorCurriculo:
-    """Analisador de grade curricular e progressão de curso."""
+    """
+    Analisador de grade curricular e progressão de curso.
+    
+    As verificações consultam o IndiceCurricular (ordem das disciplinas e
+    último módulo de cada curso/currículo). Alunos cujo curso, currículo
+    ou disciplina não estão no índice, ou sem grade curricular carregada,
+    seguem as heurísticas por código e número do módulo.
+    """
     
     def __init__(self, df_disciplinas: Optional[pd.DataFrame] = None,
-                 df_cursos: Optional[pd.DataFrame] = None):
+                 df_cursos: Optional[pd.DataFrame] = None,
+                 indice: Optional[IndiceCurricular] = None):
         """
         Inicializa o analisador.
         
         Args:
             df_disciplinas: DataFrame com dados das disciplinas
             df_cursos: DataFrame com dados dos cursos
+            indice: Índice já montado (ex.: IndiceCurricular.carregar()); se
+                omitido, é montado a partir dos DataFrames
         """
         self.df_disciplinas = df_disciplinas
         self.df_cursos = df_cursos
-        self.estatisticas_cursos = {}
-        
-        if df_cursos is not None:
-            self._processar_dados_cursos()
+        if indice is None:
+            indice = IndiceCurricular.construir(df_disciplinas, df_cursos)
+        self.indice = indice
+        self.estatisticas_cursos = indice.estatisticas_cursos
         
         registrador.info("Analisador de currículo inicializado")
     
-    def _processar_dados_cursos(self) -> None:
-        """Processa dados dos cursos para análise."""
-        try:
-            if 'Código' in self.df_cursos.columns:
-                self.estatisticas_cursos = self.df_cursos.set_index('Código').to_dict('index')
-            else:
-                registrador.warning("Coluna 'Código' não encontrada em cursos")
-                # Tentar outras colunas possíveis
-                for coluna in ['Cod', 'ID', 'Cód', 'Code']:
-                    if coluna in self.df_cursos.columns:
-                        self.estatisticas_cursos = self.df_cursos.set_index(coluna).to_dict('index')
-                        break
-        except Exception as e:
-            registrador.error(f"Erro ao processar dados dos cursos: {e}")
-    
     def eh_primeira_disciplina(self, dados_aluno: Dict[str, Any]) -> bool:
         """
         Verifica se o aluno está na primeira disciplina do curso.
@@ -59,25 +59,24 @@ class AnalisadorCurriculo:
             modulo_atual = dados_aluno.get('Módulo atual', '')
             codigo_disciplina = dados_aluno.get('Cód.Disc. atual', '')
             
-            # Considerar primeira disciplina se:
+            # Disciplina encontrada na grade do currículo: vale a ordem da grade
+            posicao = self.indice.consultar(dados_aluno)['posicao']
+            if not np.isnan(posicao):
+                return posicao == 0
+            
+            # Sem grade, considerar primeira disciplina se:
             # - Está no módulo 1
             # - Ou tem código que indica início (disciplinas que terminam em 001, 01, etc.)
-            if str(modulo_atual) in ['1', '1.0', 'I', 'Módulo 1']:
+            if self._eh_modulo_inicial(modulo_atual):
                 return True
             
-            if codigo_disciplina:
-                codigo_str = str(codigo_disciplina)
-                # Padrões que indicam primeira disciplina
-                if (codigo_str.endswith('001') or 
-                    codigo_str.endswith('01') or
-                    '001' in codigo_str or
-                    'INTRO' in codigo_str.upper()):
-                    return True
+            if self._eh_codigo_disciplina_inicial(codigo_disciplina):
+                return True
             
             return False
             
         except Exception as e:
-            registrador.debug(f"Erro ao verificar primeira disciplina: {e}")
+            registrador.debug("Erro ao verificar primeira disciplina: %s", e, extra=AMOSTRAR)
             return False
     
     def curso_completado(self, dados_aluno: Dict[str, Any]) -> bool:
@@ -96,25 +95,155 @@ class AnalisadorCurriculo:
             modulo_atual = dados_aluno.get('Módulo atual', '')
             
             # Situações que indicam conclusão
-            situacoes_conclusao = ['FORMADO', 'CONCLUÍDO', 'FINALIZADO', 'TF']
-            if any(sit in situacao for sit in situacoes_conclusao):
+            if self._eh_situacao_conclusao(situacao):
                 return True
             
+            # Verificar através do currículo se disponível
+            consulta = self.indice.consultar(dados_aluno)
+            if not np.isnan(consulta['ultimo_modulo']) and not np.isnan(consulta['modulo']):
+                return consulta['modulo'] >= consulta['ultimo_modulo']
+            
             # Verificar se está no último módulo (assumindo máximo de 4 módulos)
-            if str(modulo_atual) in ['4', '4.0', 'IV', 'Módulo 4', 'ÚLTIMO']:
+            if self._eh_modulo_final(modulo_atual):
                 return True
             
-            # Verificar através do currículo se disponível
-            codigo_curso = dados_aluno.get('Cód.Curso', '')
-            if codigo_curso and self.df_cursos is not None:
-                # Lógica adicional baseada nos dados do curso
-                pass
-            
             return False
             
         except Exception as e:
-            registrador.debug(f"Erro ao verificar conclusão do curso: {e}")
+            registrador.debug("Erro ao verificar conclusão do curso: %s", e, extra=AMOSTRAR)
+            return False
+    
+    def eh_primeira_disciplina_lote(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Versão vetorizada de eh_primeira_disciplina para um DataFrame inteiro.
+        
+        Args:
+            df: DataFrame com os dados dos alunos
+            
+        Returns:
+            Array booleano, uma posição por linha de df
+        """
+        modulo_inicial = aplicar_por_valor_unico(
+            obter_coluna(df, 'Módulo atual', ''),
+            self._avaliar_com_seguranca(self._eh_modulo_inicial), bool
+        )
+        codigo_inicial = aplicar_por_valor_unico(
+            obter_coluna(df, 'Cód.Disc. atual', ''),
+            self._avaliar_com_seguranca(self._eh_codigo_disciplina_inicial), bool
+        )
+        heuristica = modulo_inicial | codigo_inicial
+        if self.indice.vazio:
+            return heuristica
+        
+        posicao = self.indice.consultar_lote(df)['posicao']
+        return np.where(np.isnan(posicao), heuristica, posicao == 0)
+    
+    def curso_completado_lote(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Versão vetorizada de curso_completado para um DataFrame inteiro.
+        
+        Args:
+            df: DataFrame com os dados dos alunos
+            
+        Returns:
+            Array booleano, uma posição por linha de df
+        """
+        situacoes = obter_coluna(df, 'Situação', '')
+        # Situação não textual faz o caminho escalar cair no except (False)
+        situacao_valida = aplicar_por_valor_unico(
+            situacoes, lambda valor: isinstance(valor, str), bool
+        )
+        situacao_conclusao = aplicar_por_valor_unico(
+            situacoes,
+            lambda valor: isinstance(valor, str) and self._eh_situacao_conclusao(valor.upper()),
+            bool
+        )
+        modulo_final = aplicar_por_valor_unico(
+            obter_coluna(df, 'Módulo atual', ''),
+            self._avaliar_com_seguranca(self._eh_modulo_final), bool
+        )
+        if not self.indice.vazio:
+            consulta = self.indice.consultar_lote(df)
+            pela_grade = ~np.isnan(consulta['ultimo_modulo']) & ~np.isnan(consulta['modulo'])
+            modulo_final = np.where(pela_grade, consulta['modulo'] >= consulta['ultimo_modulo'], modulo_final)
+        return situacao_valida & (situacao_conclusao | modulo_final)
+    
+    def progresso_curso(self, dados_aluno: Dict[str, Any]) -> float:
+        """
+        Estima o percentual do curso já percorrido pelo aluno.
+        
+        Args:
+            dados_aluno: Dados do aluno
+            
+        Returns:
+            Percentual entre 0 e 100, ou NaN se o módulo não for identificado
+        """
+        consulta = self.indice.consultar(dados_aluno)
+        return float(self._calcular_progresso(
+            *(np.array([consulta[campo]]) for campo in ('posicao', 'total_disciplinas', 'modulo', 'ultimo_modulo'))
+        )[0])
+    
+    def progresso_curso_lote(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Versão vetorizada de progresso_curso para um DataFrame inteiro.
+        
+        Args:
+            df: DataFrame com os dados dos alunos
+            
+        Returns:
+            Array de percentuais, uma posição por linha de df
+        """
+        consulta = self.indice.consultar_lote(df)
+        return self._calcular_progresso(consulta['posicao'], consulta['total_disciplinas'],
+                                        consulta['modulo'], consulta['ultimo_modulo'])
+    
+    @staticmethod
+    def _calcular_progresso(posicao: np.ndarray, total_disciplinas: np.ndarray,
+                            modulo: np.ndarray, ultimo_modulo: np.ndarray) -> np.ndarray:
+        """Progresso pela posição da disciplina na grade; sem ela, pelo módulo sobre o último módulo."""
+        ultimo_modulo = np.where(np.isnan(ultimo_modulo), MODULOS_PADRAO, ultimo_modulo)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            progresso = np.where(np.isnan(posicao), modulo / ultimo_modulo, (posicao + 1) / total_disciplinas)
+        return np.clip(progresso * 100, 0, 100)
+    
+    @staticmethod
+    def _eh_modulo_inicial(modulo_atual: Any) -> bool:
+        """Verifica se o módulo informado é o primeiro do curso."""
+        return str(modulo_atual) in ['1', '1.0', 'I', 'Módulo 1']
+    
+    @staticmethod
+    def _eh_codigo_disciplina_inicial(codigo_disciplina: Any) -> bool:
+        """Verifica se o código da disciplina indica início de curso."""
+        if not codigo_disciplina:
             return False
+        
+        codigo_str = str(codigo_disciplina)
+        # Padrões que indicam primeira disciplina
+        return (codigo_str.endswith('001') or 
+                codigo_str.endswith('01') or
+                '001' in codigo_str or
+                'INTRO' in codigo_str.upper())
+    
+    @staticmethod
+    def _eh_situacao_conclusao(situacao: str) -> bool:
+        """Verifica se a situação (já em maiúsculas) indica conclusão."""
+        situacoes_conclusao = ['FORMADO', 'CONCLUÍDO', 'FINALIZADO', 'TF']
+        return any(sit in situacao for sit in situacoes_conclusao)
+    
+    @staticmethod
+    def _eh_modulo_final(modulo_atual: Any) -> bool:
+        """Verifica se o módulo informado é o último do curso."""
+        return str(modulo_atual) in ['4', '4.0', 'IV', 'Módulo 4', 'ÚLTIMO']
+    
+    @staticmethod
+    def _avaliar_com_seguranca(funcao):
+        """Envolve a função para retornar False em caso de erro, como no caminho escalar."""
+        def avaliar(valor: Any) -> bool:
+            try:
+                return bool(funcao(valor))
+            except Exception:
+                return False
+        return avaliar
     
     def obter_estatisticas_curso(self) -> Dict[str, Any]:
         """
@@ -124,8 +253,9 @@ class AnalisadorCurriculo:
             Dicionário com estatísticas
         """
         estatisticas = {
-            'total_cursos': len(self.estatisticas_cursos) if self.df_cursos is not None else 0,
-            'total_disciplinas': len(self.df_disciplinas) if self.df_disciplinas is not None else 0,
+            'total_cursos': len(self.estatisticas_cursos),
+            'total_disciplinas': self.indice.total_disciplinas,
+            'total_curriculos': len(self.indice.curriculos),
             'cursos_disponiveis': list(self.estatisticas_cursos.keys()) if self.estatisticas_cursos else []
         }
         
@@ -144,6 +274,7 @@ class AnalisadorCurriculo:
         analise = {
             'primeira_disciplina': self.eh_primeira_disciplina(dados_aluno),
             'curso_completado': self.curso_completado(dados_aluno),
+            'progresso_percentual': self.progresso_curso(dados_aluno),
             'modulo_atual': dados_aluno.get('Módulo atual', 'Não informado'),
             'disciplina_atual': dados_aluno.get('Disciplina atual', 'Não informada'),
             'codigo_curso': dados_aluno.get('Cód.Curso', 'Não informado')
@@ -0,0 +1,394 @@
+﻿"""
+Índice da grade curricular, montado a partir de disciplinas.xlsx e cursos.xlsx.
+"""
+
+import json
+import os
+import pickle
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..utilitarios import obter_registrador, aplicar_por_valor_unico, obter_coluna, CarregadorDados
+from ..configuracao import configuracoes
+
+registrador = obter_registrador(__name__)
+
+# Incrementar quando o formato do índice serializado mudar
+VERSAO_INDICE = 1
+
+# Nomes aceitos para cada informação nas planilhas de grade curricular
+CANDIDATOS_CURSO = ['Cód.Curso', 'Cód. Curso', 'Código Curso', 'Cod.Curso', 'Curso']
+CANDIDATOS_CURRICULO = ['Currículo', 'Cód.Currículo', 'Grade', 'Matriz']
+CANDIDATOS_DISCIPLINA = ['Cód.Disc.', 'Cód.Disciplina', 'Código Disciplina', 'Código', 'Cód', 'Cod']
+CANDIDATOS_MODULO = ['Módulo', 'Período', 'Etapa']
+CANDIDATOS_ORDEM = ['Ordem', 'Sequência', 'Seq']
+CANDIDATOS_CODIGO_CURSO = ['Código', 'Cod', 'ID', 'Cód', 'Code']
+CANDIDATOS_TOTAL_MODULOS = ['Qtd. Módulos', 'Qtd.Módulos', 'Total Módulos', 'Nº Módulos', 'Módulos']
+
+# Colunas da planilha de alunos que correspondem a curso, currículo e disciplina
+COLUNA_ALUNO_CURSO = 'Cód.Curso'
+COLUNA_ALUNO_CURRICULO = 'Currículo'
+COLUNA_ALUNO_DISCIPLINA = 'Cód.Disc. atual'
+COLUNA_ALUNO_MODULO = 'Módulo atual'
+
+ROMANOS = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8, 'IX': 9, 'X': 10}
+
+def normalizar_codigo(valor: Any) -> str:
+    """Normaliza um código de curso, currículo ou disciplina para comparação (2.0 -> '2', ' enf ' -> 'ENF')."""
+    if not isinstance(valor, str) and pd.isna(valor):
+        return ''
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor).strip().upper()
+
+def numero_modulo(valor: Any) -> float:
+    """
+    Converte a identificação de um módulo em número.
+    
+    Aceita números, texto com número ('Módulo 2', '2.0') e algarismos
+    romanos ('IV', 'Módulo II').
+    
+    Args:
+        valor: Módulo como aparece na planilha
+        
+    Returns:
+        Número do módulo ou NaN quando não identificado
+    """
+    if isinstance(valor, (bool, np.bool_)):
+        return np.nan
+    if isinstance(valor, (int, float, np.integer, np.floating)):
+        return float(valor)
+    if valor is None:
+        return np.nan
+    
+    texto = str(valor).strip().upper()
+    numero = re.search(r'\d+', texto)
+    if numero:
+        return float(numero.group())
+    for palavra in re.findall(r'\w+', texto):
+        if palavra in ROMANOS:
+            return float(ROMANOS[palavra])
+    return np.nan
+
+def _simplificar_nome(nome: Any) -> str:
+    """Nome de coluna sem acentos, espaços e pontuação, para comparar cabeçalhos."""
+    texto = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]', '', texto.lower())
+
+def localizar_coluna(df: pd.DataFrame, candidatos: Sequence[str]) -> Optional[Any]:
+    """
+    Procura no DataFrame a primeira coluna com um dos nomes candidatos.
+    
+    Args:
+        df: DataFrame da planilha
+        candidatos: Nomes aceitos, em ordem de preferência
+        
+    Returns:
+        Nome da coluna encontrada ou None
+    """
+    colunas = {}
+    for coluna in df.columns:
+        colunas.setdefault(_simplificar_nome(coluna), coluna)
+    for candidato in candidatos:
+        coluna = colunas.get(_simplificar_nome(candidato))
+        if coluna is not None:
+            return coluna
+    return None
+
+class IndiceCurricular:
+    """
+    Índice da grade curricular por curso e currículo.
+    
+    Para cada par curso/currículo de disciplinas.xlsx guarda a lista
+    ordenada de disciplinas (por módulo, ordem e posição na planilha), a
+    primeira disciplina, o último módulo e o total de módulos; para cada
+    curso, o último módulo e o total de módulos, completados por
+    cursos.xlsx quando a planilha informa a quantidade de módulos.
+    
+    As consultas usam dicionários (hash) e, nas versões em lote,
+    são feitas uma vez por valor distinto das colunas. O índice é gravado
+    em data/processed e reaproveitado enquanto as planilhas não mudarem,
+    então as inicializações seguintes não leem o Excel.
+    
+    Attributes:
+        colunas_chave: Colunas da planilha de alunos que formam a chave do currículo
+        curriculos: Chave do currículo -> disciplinas, primeira disciplina,
+            último módulo e total de módulos
+        posicoes: "chave|disciplina" -> posição da disciplina no currículo
+        cursos: Código do curso -> último módulo e total de módulos
+        estatisticas_cursos: Linha de cursos.xlsx por código do curso
+        total_disciplinas: Linhas de disciplinas.xlsx
+    """
+    
+    def __init__(self):
+        """Inicializa um índice vazio (sem grade, as consultas não encontram nada)."""
+        self.colunas_chave: Tuple[str, ...] = ()
+        self.curriculos: Dict[str, Dict[str, Any]] = {}
+        self.posicoes: Dict[str, int] = {}
+        self.cursos: Dict[str, Dict[str, float]] = {}
+        self.estatisticas_cursos: Dict[Any, Dict[str, Any]] = {}
+        self.total_disciplinas = 0
+    
+    @property
+    def vazio(self) -> bool:
+        """True quando não há currículo nem curso indexado."""
+        return not self.curriculos and not self.cursos
+    
+    @classmethod
+    def construir(cls, df_disciplinas: Optional[pd.DataFrame],
+                  df_cursos: Optional[pd.DataFrame]) -> 'IndiceCurricular':
+        """
+        Monta o índice a partir das planilhas já carregadas.
+        
+        Args:
+            df_disciplinas: DataFrame de disciplinas.xlsx
+            df_cursos: DataFrame de cursos.xlsx
+            
+        Returns:
+            Índice montado (vazio se as planilhas faltarem ou não tiverem as colunas esperadas)
+        """
+        indice = cls()
+        try:
+            if df_disciplinas is not None:
+                indice._indexar_disciplinas(df_disciplinas)
+            if df_cursos is not None:
+                indice._indexar_cursos(df_cursos)
+        except Exception as e:
+            registrador.error(f"Erro ao montar índice curricular: {e}")
+            return cls()
+        
+        registrador.info(f"Índice curricular: {len(indice.curriculos)} currículos, "
+                         f"{len(indice.cursos)} cursos")
+        return indice
+    
+    def _indexar_disciplinas(self, df: pd.DataFrame) -> None:
+        """Agrupa as disciplinas por curso/currículo e ordena cada grade."""
+        self.total_disciplinas = len(df)
+        coluna_disciplina = localizar_coluna(df, CANDIDATOS_DISCIPLINA)
+        if coluna_disciplina is None:
+            registrador.warning("Coluna de código da disciplina não encontrada em disciplinas")
+            return
+        
+        coluna_curso = localizar_coluna(df, CANDIDATOS_CURSO)
+        coluna_curriculo = localizar_coluna(df, CANDIDATOS_CURRICULO)
+        coluna_modulo = localizar_coluna(df, CANDIDATOS_MODULO)
+        coluna_ordem = localizar_coluna(df, CANDIDATOS_ORDEM)
+        
+        # A chave usa só as colunas que a planilha de disciplinas tem
+        partes_chave = []
+        colunas_chave = []
+        for coluna, coluna_aluno in ((coluna_curso, COLUNA_ALUNO_CURSO), (coluna_curriculo, COLUNA_ALUNO_CURRICULO)):
+            if coluna is not None:
+                partes_chave.append(aplicar_por_valor_unico(df[coluna], normalizar_codigo))
+                colunas_chave.append(coluna_aluno)
+        self.colunas_chave = tuple(colunas_chave)
+        
+        tabela = pd.DataFrame({
+            'chave': self._juntar_chave(partes_chave, len(df)),
+            'curso': (aplicar_por_valor_unico(df[coluna_curso], normalizar_codigo)
+                      if coluna_curso is not None else ''),
+            'disciplina': aplicar_por_valor_unico(df[coluna_disciplina], normalizar_codigo),
+            'modulo': (aplicar_por_valor_unico(df[coluna_modulo], numero_modulo, float)
+                       if coluna_modulo is not None else np.nan),
+            'ordem': (pd.to_numeric(df[coluna_ordem], errors='coerce').to_numpy()
+                      if coluna_ordem is not None else np.nan),
+            'posicao_planilha': np.arange(len(df))
+        })
+        tabela = tabela[tabela['disciplina'] != '']
+        tabela = tabela.sort_values(['chave', 'modulo', 'ordem', 'posicao_planilha'],
+                                    na_position='last', kind='stable')
+        
+        for chave, grupo in tabela.groupby('chave', sort=False):
+            disciplinas = list(dict.fromkeys(grupo['disciplina']))
+            modulos = grupo['modulo'].dropna()
+            self.curriculos[chave] = {
+                'disciplinas': disciplinas,
+                'primeira_disciplina': disciplinas[0],
+                'ultimo_modulo': float(modulos.max()) if len(modulos) else np.nan,
+                'total_modulos': int(modulos.nunique())
+            }
+            for posicao, disciplina in enumerate(disciplinas):
+                self.posicoes[f"{chave}|{disciplina}"] = posicao
+        
+        if coluna_curso is not None:
+            for curso, modulos in tabela.groupby('curso', sort=False)['modulo']:
+                modulos = modulos.dropna()
+                if curso and len(modulos):
+                    self.cursos[curso] = {'ultimo_modulo': float(modulos.max()),
+                                          'total_modulos': int(modulos.nunique())}
+    
+    def _indexar_cursos(self, df: pd.DataFrame) -> None:
+        """Guarda as linhas de cursos.xlsx e, se houver, a quantidade de módulos de cada curso."""
+        coluna_codigo = localizar_coluna(df, CANDIDATOS_CODIGO_CURSO)
+        if coluna_codigo is None:
+            registrador.warning("Coluna 'Código' não encontrada em cursos")
+            return
+        self.estatisticas_cursos = df.drop_duplicates(coluna_codigo).set_index(coluna_codigo).to_dict('index')
+        
+        coluna_modulos = localizar_coluna(df, CANDIDATOS_TOTAL_MODULOS)
+        if coluna_modulos is None:
+            return
+        for codigo, total in zip(df[coluna_codigo], pd.to_numeric(df[coluna_modulos], errors='coerce')):
+            curso = normalizar_codigo(codigo)
+            if curso and not np.isnan(total) and total > 0:
+                # A quantidade declarada em cursos.xlsx prevalece sobre a deduzida das disciplinas
+                self.cursos[curso] = {'ultimo_modulo': float(total), 'total_modulos': int(total)}
+    
+    @staticmethod
+    def _juntar_chave(partes: List[np.ndarray], tamanho: int) -> np.ndarray:
+        """Junta as partes normalizadas da chave linha a linha ("curso|currículo")."""
+        if not partes:
+            return np.full(tamanho, '', dtype=object)
+        chaves = partes[0]
+        for parte in partes[1:]:
+            chaves = chaves + '|' + parte
+        return chaves
+    
+    def consultar(self, dados_aluno: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Consulta a posição do aluno na grade curricular.
+        
+        Args:
+            dados_aluno: Dados do aluno
+            
+        Returns:
+            Dicionário com 'modulo', 'ultimo_modulo', 'posicao' e
+            'total_disciplinas' (NaN quando o índice não tem a informação)
+        """
+        chave = '|'.join(normalizar_codigo(dados_aluno.get(coluna, '')) for coluna in self.colunas_chave)
+        curriculo = self.curriculos.get(chave)
+        curso = self.cursos.get(normalizar_codigo(dados_aluno.get(COLUNA_ALUNO_CURSO, '')))
+        disciplina = normalizar_codigo(dados_aluno.get(COLUNA_ALUNO_DISCIPLINA, ''))
+        
+        ultimo_modulo = curriculo['ultimo_modulo'] if curriculo else np.nan
+        if np.isnan(ultimo_modulo) and curso:
+            ultimo_modulo = curso['ultimo_modulo']
+        return {
+            'modulo': numero_modulo(dados_aluno.get(COLUNA_ALUNO_MODULO, '')),
+            'ultimo_modulo': ultimo_modulo,
+            'posicao': float(self.posicoes.get(f"{chave}|{disciplina}", np.nan)) if curriculo else np.nan,
+            'total_disciplinas': float(len(curriculo['disciplinas'])) if curriculo else np.nan
+        }
+    
+    def consultar_lote(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Versão vetorizada de consultar para um DataFrame inteiro.
+        
+        Args:
+            df: DataFrame com os dados dos alunos
+            
+        Returns:
+            Dicionário com os mesmos campos de consultar, um array por campo
+        """
+        partes = [aplicar_por_valor_unico(obter_coluna(df, coluna, ''), normalizar_codigo)
+                  for coluna in self.colunas_chave]
+        chaves = self._juntar_chave(partes, len(df))
+        disciplinas = aplicar_por_valor_unico(obter_coluna(df, COLUNA_ALUNO_DISCIPLINA, ''), normalizar_codigo)
+        cursos = aplicar_por_valor_unico(obter_coluna(df, COLUNA_ALUNO_CURSO, ''), normalizar_codigo)
+        
+        def campo_curriculo(nome: str):
+            return lambda chave: self.curriculos[chave][nome] if chave in self.curriculos else np.nan
+        
+        serie_chaves = pd.Series(chaves, dtype=object)
+        ultimo_modulo = aplicar_por_valor_unico(serie_chaves, campo_curriculo('ultimo_modulo'), float)
+        ultimo_modulo_curso = aplicar_por_valor_unico(
+            pd.Series(cursos, dtype=object),
+            lambda curso: self.cursos[curso]['ultimo_modulo'] if curso in self.cursos else np.nan,
+            float
+        )
+        total_disciplinas = aplicar_por_valor_unico(
+            serie_chaves,
+            lambda chave: len(self.curriculos[chave]['disciplinas']) if chave in self.curriculos else np.nan,
+            float
+        )
+        posicao = aplicar_por_valor_unico(
+            pd.Series(chaves + '|' + disciplinas, dtype=object),
+            lambda chave: self.posicoes.get(chave, np.nan),
+            float
+        )
+        return {
+            'modulo': aplicar_por_valor_unico(obter_coluna(df, COLUNA_ALUNO_MODULO, ''), numero_modulo, float),
+            'ultimo_modulo': np.where(np.isnan(ultimo_modulo), ultimo_modulo_curso, ultimo_modulo),
+            'posicao': posicao,
+            'total_disciplinas': total_disciplinas
+        }
+    
+    @staticmethod
+    def calcular_assinatura(caminhos: Sequence[Path]) -> str:
+        """
+        Assinatura das planilhas de origem: nome, data de modificação e tamanho.
+        
+        Args:
+            caminhos: Planilhas de disciplinas e cursos
+            
+        Returns:
+            Assinatura em JSON (planilhas ausentes entram como null)
+        """
+        estado = [
+            (caminho.name, caminho.stat().st_mtime_ns, caminho.stat().st_size) if caminho.exists() else None
+            for caminho in map(Path, caminhos)
+        ]
+        return json.dumps([VERSAO_INDICE, estado])
+    
+    @classmethod
+    def carregar(cls, caminho_indice: Optional[Path] = None,
+                 forcar_atualizacao: bool = False) -> 'IndiceCurricular':
+        """
+        Retorna o índice gravado em disco ou o monta a partir das planilhas.
+        
+        O índice gravado é usado enquanto disciplinas.xlsx e cursos.xlsx
+        tiverem a mesma data de modificação e tamanho; caso contrário as
+        planilhas são lidas (CarregadorDados.carregar_dados_curriculares)
+        e o índice é refeito e gravado.
+        
+        Args:
+            caminho_indice: Arquivo do índice (padrão: configuracoes.obter_caminho_indice_curricular())
+            forcar_atualizacao: Ignora o índice gravado e relê as planilhas
+            
+        Returns:
+            Índice curricular (vazio se não houver grade curricular)
+        """
+        caminho_indice = Path(caminho_indice or configuracoes.obter_caminho_indice_curricular())
+        assinatura = cls.calcular_assinatura([configuracoes.obter_caminho_disciplinas(),
+                                              configuracoes.obter_caminho_cursos()])
+        
+        if not forcar_atualizacao and caminho_indice.exists():
+            try:
+                with open(caminho_indice, 'rb') as arquivo:
+                    gravado = pickle.load(arquivo)
+                if gravado.get('assinatura') == assinatura and isinstance(gravado.get('indice'), cls):
+                    registrador.info(f"Índice curricular carregado de {caminho_indice.name}")
+                    return gravado['indice']
+            except Exception as e:
+                registrador.warning(f"Índice curricular inválido, refazendo: {e}")
+        
+        df_disciplinas, df_cursos = CarregadorDados.carregar_dados_curriculares()
+        indice = cls.construir(df_disciplinas, df_cursos)
+        if df_disciplinas is not None or df_cursos is not None:
+            indice.salvar(caminho_indice, assinatura)
+        return indice
+    
+    def salvar(self, caminho_indice: Path, assinatura: str) -> None:
+        """
+        Grava o índice com a assinatura das planilhas de origem.
+        
+        Args:
+            caminho_indice: Arquivo do índice
+            assinatura: Assinatura calculada por calcular_assinatura
+        """
+        caminho_indice = Path(caminho_indice)
+        # Nome único por processo: trabalhadores paralelos podem gravar o mesmo índice
+        caminho_temporario = caminho_indice.with_name(f"{caminho_indice.stem}.{os.getpid()}.tmp")
+        try:
+            caminho_indice.parent.mkdir(parents=True, exist_ok=True)
+            with open(caminho_temporario, 'wb') as arquivo:
+                pickle.dump({'assinatura': assinatura, 'indice': self}, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(caminho_temporario, caminho_indice)
+        except Exception as e:
+            registrador.warning(f"Não foi possível gravar o índice curricular: {e}")
+            caminho_temporario.unlink(missing_ok=True)
@@ -2,11 +2,12 @@
 Motor de regras de negócio para classificação de estudantes.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Sequence, Optional
 from dataclasses import dataclass
 
-from ..utilitarios import obter_registrador
+from ..utilitarios import obter_registrador, aplicar_por_valor_unico, obter_coluna, AMOSTRAR
 from ..configuracao import configuracoes
 from .analisador_curriculo import AnalisadorCurriculo
 
@@ -20,6 +21,44 @@ class ResultadoRegra:
     razao: str
     regra_aplicada: str
 
+@dataclass
+class ResultadoRegrasLote:
+    """Resultado da aplicação das regras de negócio sobre vários alunos."""
+    situacao: np.ndarray
+    probabilidade: np.ndarray
+    razao: np.ndarray
+    regra_aplicada: np.ndarray
+    contadores: Dict[str, int]  # Contadores apenas deste lote
+    
+    def __len__(self) -> int:
+        return len(self.situacao)
+    
+    def obter_resultado(self, indice: int) -> ResultadoRegra:
+        """Retorna o resultado de um aluno no formato escalar."""
+        return ResultadoRegra(
+            situacao=self.situacao[indice],
+            probabilidade=float(self.probabilidade[indice]),
+            razao=self.razao[indice],
+            regra_aplicada=self.regra_aplicada[indice]
+        )
+    
+    def obter_linhas_ml(self) -> np.ndarray:
+        """Retorna as posições dos alunos que nenhuma regra decidiu."""
+        return np.flatnonzero(self.regra_aplicada == 'ML')
+    
+    def preencher_ml(self, linhas: np.ndarray, predicoes_ml: Sequence[Any],
+                     probabilidades_ml: Sequence[float]) -> None:
+        """
+        Completa com a predição ML os alunos que nenhuma regra decidiu.
+        
+        Args:
+            linhas: Posições dos alunos (ver obter_linhas_ml)
+            predicoes_ml: Predição do modelo para cada posição
+            probabilidades_ml: Probabilidade da predição para cada posição
+        """
+        self.situacao[linhas] = np.asarray(list(predicoes_ml), dtype=object)
+        self.probabilidade[linhas] = np.asarray(probabilidades_ml, dtype=float)
+
 class MotorRegrasNegocio:
     """Motor de regras de negócio do Grau Técnico."""
     
@@ -70,8 +109,9 @@ class MotorRegrasNegocio:
         pendencia_academica_bruta = dados_aluno.get('Pend. Acad.', '')
         pendencia_academica = '' if pd.isna(pendencia_academica_bruta) else str(pendencia_academica_bruta).strip()
         
-        registrador.debug(f"Analisando aluno: faltas={faltas_consecutivas}, "
-                         f"pend_fin={pendencia_financeira}, pend_acad='{pendencia_academica}'")
+        # Formatação adiada e amostrada: esta linha roda uma vez por aluno
+        registrador.debug("Analisando aluno: faltas=%s, pend_fin=%s, pend_acad='%s'",
+                          faltas_consecutivas, pendencia_financeira, pendencia_academica, extra=AMOSTRAR)
         
         # Aplicar regras em ordem de prioridade
         
@@ -164,6 +204,140 @@ class MotorRegrasNegocio:
             regra_aplicada='ML'
         )
     
+    def aplicar_regras_negocio_lote(self, df: pd.DataFrame,
+                                    predicoes_ml: Optional[Sequence[Any]] = None,
+                                    probabilidades_ml: Optional[Sequence[float]] = None) -> ResultadoRegrasLote:
+        """
+        Aplica as regras de negócio a todos os alunos de um DataFrame.
+        
+        Avalia a mesma cascata de aplicar_regras_negocio (NC, LFI, LFR, LAC,
+        NF, MT e, por fim, ML) como máscaras booleanas sobre o DataFrame,
+        escolhendo a primeira regra satisfeita com np.select. O resultado é
+        idêntico ao da aplicação escalar linha a linha, inclusive nos
+        contadores de regras.
+        
+        As regras não dependem da saída do modelo. Sem predições ML, os
+        alunos que nenhuma regra decide ficam com situação None e
+        probabilidade NaN, para serem completados com preencher_ml depois
+        de passar só eles pelo modelo.
+        
+        Args:
+            df: DataFrame com os dados dos alunos
+            predicoes_ml: Predição do modelo ML para cada linha de df (opcional)
+            probabilidades_ml: Probabilidade da predição ML para cada linha de df (opcional)
+            
+        Returns:
+            Resultado das regras em forma de arrays
+        """
+        regras = configuracoes.regras_negocio
+        total = len(df)
+        
+        faltas_consecutivas = self._extrair_coluna_numerica(
+            obter_coluna(df, 'Faltas Consecutivas', 0), self._extrair_valor_numerico
+        )
+        pendencia_financeira = self._extrair_coluna_numerica(
+            obter_coluna(df, 'Pend. Financ.', 0), self._extrair_valor_financeiro
+        )
+        tem_pendencia_academica = aplicar_por_valor_unico(
+            obter_coluna(df, 'Pend. Acad.', ''),
+            lambda valor: self._tem_pendencia_academica(
+                '' if pd.isna(valor) else str(valor).strip()
+            ),
+            bool
+        )
+        
+        if self.analisador_curriculo:
+            primeira_disciplina = self.analisador_curriculo.eh_primeira_disciplina_lote(df)
+            curso_completado = self.analisador_curriculo.curso_completado_lote(df)
+        else:
+            primeira_disciplina = np.zeros(total, dtype=bool)
+            curso_completado = np.zeros(total, dtype=bool)
+        
+        # Condições na mesma ordem de prioridade do caminho escalar
+        faltas_nc = faltas_consecutivas >= regras.nc_minimo_faltas
+        faltas_lfr = faltas_consecutivas >= regras.lfr_minimo_faltas
+        regras_ordenadas = [
+            ('NC', faltas_nc & primeira_disciplina,
+             'Nunca Compareceu', regras.probabilidade_nc,
+             f'≥{regras.nc_minimo_faltas} faltas na primeira disciplina'),
+            ('LFR', faltas_nc & ~primeira_disciplina & faltas_lfr,
+             'Limpeza de Frequencia', regras.probabilidade_lfr,
+             f'≥{regras.lfr_minimo_faltas} faltas (não primeira disciplina)'),
+            ('LFI', pendencia_financeira >= regras.lfi_minimo_parcelas,
+             'Limpeza Financeira', regras.probabilidade_lfi,
+             f'≥{regras.lfi_minimo_parcelas} parcelas em aberto'),
+            ('LFR', (pendencia_financeira > 0) & faltas_lfr,
+             'Limpeza de Frequencia', regras.probabilidade_lfr,
+             f'Pend. financeira + ≥{regras.lfr_minimo_faltas} faltas'),
+            ('LAC', tem_pendencia_academica,
+             'Limpeza Academica', regras.probabilidade_lac,
+             'Pendência acadêmica'),
+            ('NF', curso_completado & (pendencia_financeira > 0) & (pendencia_financeira <= 2),
+             'Não Formados', regras.probabilidade_nf,
+             'Curso completo + ≤2 parcelas'),
+            ('MT', (pendencia_financeira == 0) & (faltas_consecutivas <= regras.mt_maximo_faltas),
+             'Matriculado', regras.probabilidade_mt,
+             'Sem pendências significativas'),
+        ]
+        
+        condicoes = [condicao for _, condicao, _, _, _ in regras_ordenadas]
+        
+        def constante(valor: Any) -> np.ndarray:
+            return np.full(total, valor, dtype=object)
+        
+        if predicoes_ml is None:
+            predicoes_ml = constante(None)
+        if probabilidades_ml is None:
+            probabilidades_ml = np.full(total, np.nan)
+        
+        situacao = np.select(
+            condicoes,
+            [constante(situacao_regra) for _, _, situacao_regra, _, _ in regras_ordenadas],
+            default=np.asarray(list(predicoes_ml), dtype=object)
+        )
+        probabilidade = np.select(
+            condicoes,
+            [np.full(total, prob_regra, dtype=float) for _, _, _, prob_regra, _ in regras_ordenadas],
+            default=np.asarray(probabilidades_ml, dtype=float)
+        )
+        razao = np.select(
+            condicoes,
+            [constante(razao_regra) for _, _, _, _, razao_regra in regras_ordenadas],
+            default=constante('Predição ML')
+        )
+        regra_aplicada = np.select(
+            condicoes,
+            [constante(nome_regra) for nome_regra, _, _, _, _ in regras_ordenadas],
+            default=constante('ML')
+        )
+        
+        # Contadores deste lote, acumulados também nos contadores do motor
+        contadores_lote = self.contar_regras(regra_aplicada)
+        for chave, quantidade in contadores_lote.items():
+            self.contador_regras[chave] += quantidade
+        
+        registrador.debug("Regras aplicadas em lote para %d alunos", total)
+        
+        return ResultadoRegrasLote(
+            situacao=situacao,
+            probabilidade=probabilidade,
+            razao=razao,
+            regra_aplicada=regra_aplicada,
+            contadores=contadores_lote
+        )
+    
+    @staticmethod
+    def _extrair_coluna_numerica(serie: pd.Series, conversor) -> np.ndarray:
+        """
+        Converte uma coluna inteira com o mesmo conversor usado por linha.
+        
+        Colunas já numéricas são convertidas diretamente; as demais passam
+        pelo conversor escalar uma vez por valor distinto.
+        """
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            return serie.astype(float).fillna(0.0).to_numpy()
+        return aplicar_por_valor_unico(serie, conversor, float)
+    
     def _extrair_valor_numerico(self, valor: Any) -> float:
         """
         Extrai valor numérico de forma segura.
@@ -225,6 +399,24 @@ class MotorRegrasNegocio:
         # consideramos como pendência
         return pendencia_academica_str != ''
     
+    def contar_regras(self, regra_aplicada: np.ndarray) -> Dict[str, int]:
+        """
+        Conta os alunos decididos por cada regra, no formato de obter_resumo_regras.
+        
+        Args:
+            regra_aplicada: Regra aplicada a cada aluno ('ML' quando nenhuma)
+            
+        Returns:
+            Dicionário com os contadores
+        """
+        regra_aplicada = np.asarray(regra_aplicada)
+        contadores = {chave: 0 for chave in self.contador_regras}
+        for nome_regra in ['NC', 'LFR', 'LFI', 'LAC', 'NF', 'MT']:
+            quantidade = int(np.count_nonzero(regra_aplicada == nome_regra))
+            contadores[f'{nome_regra}_por_regra'] += quantidade
+            contadores['total_ajustes'] += quantidade
+        return contadores
+    
     def obter_resumo_regras(self) -> Dict[str, int]:
         """
         Retorna resumo das regras aplicadas.
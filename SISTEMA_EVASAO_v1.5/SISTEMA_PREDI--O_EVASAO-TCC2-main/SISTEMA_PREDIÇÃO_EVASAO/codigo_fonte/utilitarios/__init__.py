@@ -2,11 +2,35 @@
 Módulo de utilitários do sistema.
 """
 
-from .registrador import obter_registrador, Registrador
+from .registrador import obter_registrador, Registrador, FiltroAmostragem, AMOSTRAR
+from .instrumentacao import (Instrumentacao, MedicaoEtapa, medir_etapa, medir_iteracao, ativar_instrumentacao,
+                             obter_instrumentacao, obter_pico_memoria_mb)
+from .perfilamento import PerfilExecucao
 from .carregador_dados import CarregadorDados
+from .vetorizacao import aplicar_por_valor_unico, obter_coluna, agrupar_linhas_identicas
+from .cache_entradas import CacheEntradas, carregar_com_cache
+from .monitor_pasta import ObservadorPasta, FilaArquivos, MonitorPasta
 
 __all__ = [
     'obter_registrador',
     'Registrador', 
-    'CarregadorDados'
+    'FiltroAmostragem',
+    'AMOSTRAR',
+    'Instrumentacao',
+    'MedicaoEtapa',
+    'medir_etapa',
+    'medir_iteracao',
+    'ativar_instrumentacao',
+    'obter_instrumentacao',
+    'obter_pico_memoria_mb',
+    'PerfilExecucao',
+    'CarregadorDados',
+    'aplicar_por_valor_unico',
+    'obter_coluna',
+    'agrupar_linhas_identicas',
+    'CacheEntradas',
+    'carregar_com_cache',
+    'ObservadorPasta',
+    'FilaArquivos',
+    'MonitorPasta'
 ]
\ No newline at end of file
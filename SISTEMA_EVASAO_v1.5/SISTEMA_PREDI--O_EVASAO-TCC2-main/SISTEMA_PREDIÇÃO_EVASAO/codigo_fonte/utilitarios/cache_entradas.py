@@ -0,0 +1,211 @@
+﻿"""
+Cache das planilhas de entrada já convertidas em DataFrame.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .registrador import obter_registrador
+from ..configuracao import configuracoes
+
+registrador = obter_registrador(__name__)
+
+# Incrementar quando o formato dos DataFrames em cache mudar
+VERSAO_CACHE = 1
+
+class CacheEntradas:
+    """
+    Cache local de planilhas convertidas, indexado pelo hash do conteúdo.
+    
+    O DataFrame normalizado (após detecção de header e seleção de colunas)
+    é salvo em Parquet em data/processed; execuções seguintes sobre o mesmo
+    arquivo pulam a leitura do Excel. DataFrames que o Parquet não representa
+    fielmente (colunas com tipos mistos, nomes não textuais) são salvos em
+    pickle. Quando o tamanho total passa do limite, as entradas usadas há
+    mais tempo são removidas.
+    """
+    
+    def __init__(self, diretorio: Optional[Path] = None,
+                 tamanho_maximo_mb: Optional[float] = None):
+        """
+        Inicializa o cache.
+        
+        Args:
+            diretorio: Diretório das entradas (padrão: data/processed/cache_entradas)
+            tamanho_maximo_mb: Tamanho máximo total em MB
+                (padrão: configuracoes.dados.tamanho_maximo_cache_mb)
+        """
+        if diretorio is None:
+            diretorio = configuracoes.dados.diretorio_dados_processados / "cache_entradas"
+        if tamanho_maximo_mb is None:
+            tamanho_maximo_mb = configuracoes.dados.tamanho_maximo_cache_mb
+        
+        self.diretorio = Path(diretorio)
+        self.tamanho_maximo_bytes = int(tamanho_maximo_mb * 1024 * 1024)
+    
+    @staticmethod
+    def calcular_hash(origem: Union[Path, bytes], parametros: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Calcula a chave do cache a partir do conteúdo e dos parâmetros de leitura.
+        
+        Args:
+            origem: Caminho do arquivo ou seu conteúdo em bytes
+            parametros: Parâmetros que alteram o DataFrame resultante
+            
+        Returns:
+            Hash hexadecimal
+        """
+        resumo = hashlib.sha256()
+        if isinstance(origem, (bytes, bytearray, memoryview)):
+            resumo.update(origem)
+        else:
+            with open(origem, 'rb') as arquivo:
+                for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                    resumo.update(bloco)
+        
+        resumo.update(json.dumps([VERSAO_CACHE, parametros or {}], sort_keys=True, default=str).encode('utf-8'))
+        return resumo.hexdigest()
+    
+    def carregar(self, origem: Union[Path, bytes], carregador: Callable[[], pd.DataFrame],
+                 parametros: Optional[Dict[str, Any]] = None,
+                 forcar_atualizacao: bool = False) -> pd.DataFrame:
+        """
+        Retorna o DataFrame do cache ou o carrega e armazena.
+        
+        Args:
+            origem: Caminho do arquivo ou seu conteúdo em bytes
+            carregador: Função que lê e normaliza o arquivo quando não há cache
+            parametros: Parâmetros de leitura que fazem parte da chave
+            forcar_atualizacao: Ignora a entrada existente e a regrava
+            
+        Returns:
+            DataFrame normalizado
+        """
+        chave = self.calcular_hash(origem, parametros)
+        
+        if not forcar_atualizacao:
+            df = self._ler(chave)
+            if df is not None:
+                registrador.info(f"Entrada carregada do cache: {chave[:12]}")
+                return df
+        
+        df = carregador()
+        try:
+            self._gravar(chave, df)
+            self._remover_excedente()
+        except Exception as e:
+            registrador.warning(f"Não foi possível gravar a entrada no cache: {e}")
+        return df
+    
+    def limpar(self) -> int:
+        """
+        Remove todas as entradas do cache.
+        
+        Returns:
+            Quantidade de arquivos removidos
+        """
+        removidos = 0
+        for arquivo in self._listar_arquivos():
+            arquivo.unlink(missing_ok=True)
+            removidos += 1
+        registrador.info(f"Cache de entradas limpo: {removidos} arquivos removidos")
+        return removidos
+    
+    def _ler(self, chave: str) -> Optional[pd.DataFrame]:
+        """Lê a entrada do cache, se existir."""
+        caminho_parquet = self.diretorio / f"{chave}.parquet"
+        caminho_pickle = self.diretorio / f"{chave}.pkl"
+        try:
+            if caminho_parquet.exists():
+                df = self._restaurar_ausentes(pd.read_parquet(caminho_parquet))
+                os.utime(caminho_parquet)
+                return df
+            if caminho_pickle.exists():
+                with open(caminho_pickle, 'rb') as arquivo:
+                    df = pickle.load(arquivo)
+                os.utime(caminho_pickle)
+                return df
+        except Exception as e:
+            registrador.warning(f"Entrada de cache inválida ({chave[:12]}), recarregando: {e}")
+        return None
+    
+    def _gravar(self, chave: str, df: pd.DataFrame) -> None:
+        """Grava a entrada em Parquet ou, se não houver fidelidade, em pickle."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho_parquet = self.diretorio / f"{chave}.parquet"
+        # Nome único por processo: execuções paralelas podem gravar a mesma chave
+        caminho_temporario = self.diretorio / f"{chave}.{os.getpid()}.tmp"
+        
+        try:
+            df.to_parquet(caminho_temporario)
+            if self._mesmo_conteudo(df, self._restaurar_ausentes(pd.read_parquet(caminho_temporario))):
+                os.replace(caminho_temporario, caminho_parquet)
+                return
+        except Exception as e:
+            registrador.debug(f"Parquet indisponível para a entrada {chave[:12]}: {e}")
+        
+        with open(caminho_temporario, 'wb') as arquivo:
+            pickle.dump(df, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(caminho_temporario, self.diretorio / f"{chave}.pkl")
+    
+    def _remover_excedente(self) -> None:
+        """Remove as entradas menos usadas até respeitar o tamanho máximo."""
+        arquivos = sorted(self._listar_arquivos(), key=lambda arquivo: arquivo.stat().st_mtime)
+        tamanho_total = sum(arquivo.stat().st_size for arquivo in arquivos)
+        
+        for arquivo in arquivos:
+            if tamanho_total <= self.tamanho_maximo_bytes:
+                break
+            tamanho_total -= arquivo.stat().st_size
+            arquivo.unlink(missing_ok=True)
+            registrador.debug(f"Entrada removida do cache: {arquivo.name}")
+    
+    def _listar_arquivos(self) -> list:
+        """Lista os arquivos de entradas do cache."""
+        if not self.diretorio.exists():
+            return []
+        return [arquivo for arquivo in self.diretorio.iterdir() if arquivo.suffix in ('.parquet', '.pkl')]
+    
+    @staticmethod
+    def _restaurar_ausentes(df: pd.DataFrame) -> pd.DataFrame:
+        """O Parquet devolve None em colunas texto; o read_excel usa NaN."""
+        for coluna in df.columns[df.dtypes == object]:
+            df[coluna] = df[coluna].where(df[coluna].notna(), np.nan)
+        return df
+    
+    @staticmethod
+    def _mesmo_conteudo(original: pd.DataFrame, restaurado: pd.DataFrame) -> bool:
+        """Compara valores, dtypes e o tipo Python de cada valor das colunas texto."""
+        if not (original.columns.equals(restaurado.columns) and original.index.equals(restaurado.index)
+                and original.dtypes.equals(restaurado.dtypes) and original.equals(restaurado)):
+            return False
+        return all(
+            original[coluna].map(type).equals(restaurado[coluna].map(type))
+            for coluna in original.columns[original.dtypes == object]
+        )
+
+def carregar_com_cache(origem: Union[Path, bytes], carregador: Callable[[], pd.DataFrame],
+                       parametros: Optional[Dict[str, Any]] = None,
+                       forcar_atualizacao: bool = False) -> pd.DataFrame:
+    """
+    Carrega uma entrada usando o cache configurado, se estiver ativo.
+    
+    Args:
+        origem: Caminho do arquivo ou seu conteúdo em bytes
+        carregador: Função que lê e normaliza o arquivo
+        parametros: Parâmetros de leitura que fazem parte da chave
+        forcar_atualizacao: Ignora a entrada existente e a regrava
+        
+    Returns:
+        DataFrame normalizado
+    """
+    if not configuracoes.dados.cache_entradas:
+        return carregador()
+    return CacheEntradas().carregar(origem, carregador, parametros, forcar_atualizacao)
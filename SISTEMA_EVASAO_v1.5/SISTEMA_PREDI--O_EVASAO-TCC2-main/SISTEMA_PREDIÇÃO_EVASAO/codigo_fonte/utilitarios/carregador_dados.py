@@ -2,12 +2,16 @@
 Utilitários para carregamento e manipulação de dados.
 """
 
+import io
+import csv
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List, Union, BinaryIO, Iterator, Callable
 
 from .registrador import obter_registrador
+from .instrumentacao import medir_etapa
+from .vetorizacao import aplicar_por_valor_unico, obter_coluna
 from ..configuracao import configuracoes
 
 registrador = obter_registrador(__name__)
@@ -41,14 +45,79 @@ class CarregadorDados:
         return 0
     
     @staticmethod
-    def carregar_excel_com_deteccao_cabecalho(caminho_arquivo: Path, 
-                                            palavras_chave: list = None) -> pd.DataFrame:
+    def ler_conteudo(origem: Union[bytes, bytearray, memoryview, BinaryIO]) -> bytes:
+        """
+        Obtém os bytes de um buffer ou objeto tipo arquivo (ex.: upload do Streamlit).
+        
+        Args:
+            origem: Bytes ou objeto com método read()
+            
+        Returns:
+            Conteúdo completo em bytes
+        """
+        if isinstance(origem, (bytes, bytearray, memoryview)):
+            return bytes(origem)
+        if hasattr(origem, 'seek'):
+            origem.seek(0)
+        return origem.read()
+    
+    @staticmethod
+    def ler_linhas_iniciais(caminho_arquivo: Union[Path, bytes], quantidade: int = 5) -> pd.DataFrame:
+        """
+        Lê apenas as primeiras linhas da primeira planilha, sem header.
+        
+        Arquivos .xlsx/.xlsm são lidos em modo streaming (openpyxl read_only),
+        sem carregar o restante da planilha; os demais formatos usam o pandas.
+        
+        Args:
+            caminho_arquivo: Caminho para o arquivo Excel ou seu conteúdo em bytes
+            quantidade: Número de linhas a ler
+            
+        Returns:
+            DataFrame com as linhas lidas, indexado como no read_excel(header=None)
+        """
+        if isinstance(caminho_arquivo, bytes):
+            origem = io.BytesIO(caminho_arquivo)
+            eh_xlsx = caminho_arquivo[:2] == b'PK'  # .xlsx é um arquivo zip
+        else:
+            origem = caminho_arquivo
+            eh_xlsx = Path(caminho_arquivo).suffix.lower() in ('.xlsx', '.xlsm')
+        
+        if not eh_xlsx:
+            return pd.read_excel(origem, header=None, nrows=quantidade)
+        
+        from openpyxl import load_workbook
+        
+        livro = load_workbook(origem, read_only=True, data_only=True)
+        try:
+            planilha = livro.worksheets[0]
+            linhas = [
+                # Mesmas conversões do leitor openpyxl do pandas
+                [np.nan if valor is None else int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+                 for valor in linha]
+                for linha in planilha.iter_rows(max_row=quantidade, values_only=True)
+            ]
+        finally:
+            livro.close()
+        
+        return pd.DataFrame(linhas)
+    
+    @staticmethod
+    def carregar_excel_com_deteccao_cabecalho(caminho_arquivo: Union[Path, bytes, BinaryIO], 
+                                            palavras_chave: list = None,
+                                            colunas: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Carrega arquivo Excel com detecção automática de header.
         
+        O header é detectado nas primeiras linhas lidas em streaming e a
+        planilha é interpretada uma única vez.
+        
         Args:
-            caminho_arquivo: Caminho para o arquivo Excel
+            caminho_arquivo: Caminho para o arquivo Excel, seu conteúdo em bytes
+                ou um objeto tipo arquivo
             palavras_chave: Palavras-chave para detectar header
+            colunas: Se informado, apenas essas colunas são materializadas
+                (as ausentes na planilha são ignoradas)
             
         Returns:
             DataFrame carregado
@@ -56,22 +125,172 @@ class CarregadorDados:
         Raises:
             FileNotFoundError: Se o arquivo não for encontrado
         """
+        if isinstance(caminho_arquivo, (str, Path)):
+            caminho_arquivo = Path(caminho_arquivo)
+            if not caminho_arquivo.exists():
+                raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
+            registrador.info(f"Carregando arquivo: {caminho_arquivo}")
+        else:
+            caminho_arquivo = CarregadorDados.ler_conteudo(caminho_arquivo)
+            registrador.info(f"Carregando planilha em memória: {len(caminho_arquivo)} bytes")
+        
+        # Detectar header apenas nas primeiras linhas
+        with medir_etapa('header_detection') as etapa:
+            df_inicio = CarregadorDados.ler_linhas_iniciais(caminho_arquivo)
+            linha_cabecalho = CarregadorDados.detectar_linha_cabecalho(df_inicio, palavras_chave)
+            etapa.linhas = len(df_inicio)
+        
+        # Carregar uma única vez com header correto
+        usecols = None
+        if colunas is not None:
+            colunas_desejadas = set(colunas)
+            usecols = lambda coluna: coluna in colunas_desejadas
+        origem = io.BytesIO(caminho_arquivo) if isinstance(caminho_arquivo, bytes) else caminho_arquivo
+        df = pd.read_excel(origem, header=linha_cabecalho, usecols=usecols)
+        
+        registrador.info(f"Dados carregados: {df.shape[0]} linhas, {df.shape[1]} colunas")
+        return df
+    
+    @staticmethod
+    def ler_em_blocos(caminho_arquivo: Path, tamanho_bloco: int,
+                      palavras_chave: list = None,
+                      colunas: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Lê um arquivo de alunos (Excel ou CSV) em blocos de linhas, com detecção de header.
+        
+        Arquivos .xlsx/.xlsm são percorridos em modo streaming (openpyxl
+        read_only) e cada bloco passa pelo mesmo parser do read_excel; CSVs
+        usam read_csv com chunksize. Apenas um bloco fica em memória por vez.
+        Outros formatos (.xls) são carregados inteiros e fatiados.
+        
+        Args:
+            caminho_arquivo: Caminho para o arquivo
+            tamanho_bloco: Quantidade máxima de linhas por bloco
+            palavras_chave: Palavras-chave para detectar header
+            colunas: Se informado, apenas essas colunas são materializadas
+                (as ausentes no arquivo são ignoradas)
+                
+        Yields:
+            DataFrame de cada bloco, com índice contínuo entre os blocos
+            
+        Raises:
+            FileNotFoundError: Se o arquivo não for encontrado
+            ValueError: Se tamanho_bloco não for positivo
+        """
+        caminho_arquivo = Path(caminho_arquivo)
         if not caminho_arquivo.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
+        if tamanho_bloco <= 0:
+            raise ValueError(f"Tamanho de bloco inválido: {tamanho_bloco}")
+        registrador.info(f"Lendo arquivo em blocos de {tamanho_bloco} linhas: {caminho_arquivo}")
         
-        registrador.info(f"Carregando arquivo: {caminho_arquivo}")
+        usecols = None
+        if colunas is not None:
+            colunas_desejadas = set(colunas)
+            usecols = lambda coluna: coluna in colunas_desejadas
         
-        # Carregar sem header para detectar
-        df_bruto = pd.read_excel(caminho_arquivo, header=None)
+        sufixo = caminho_arquivo.suffix.lower()
+        if sufixo in ('.csv', '.txt'):
+            blocos = CarregadorDados._ler_csv_em_blocos(caminho_arquivo, tamanho_bloco, palavras_chave, usecols)
+        elif sufixo in ('.xlsx', '.xlsm'):
+            blocos = CarregadorDados._ler_xlsx_em_blocos(caminho_arquivo, tamanho_bloco, palavras_chave, usecols)
+        else:
+            df = CarregadorDados.carregar_excel_com_deteccao_cabecalho(caminho_arquivo, palavras_chave, colunas)
+            blocos = (df.iloc[inicio:inicio + tamanho_bloco] for inicio in range(0, len(df), tamanho_bloco))
         
-        # Detectar header
-        linha_cabecalho = CarregadorDados.detectar_linha_cabecalho(df_bruto, palavras_chave)
+        inicio = 0
+        for bloco in blocos:
+            bloco.index = pd.RangeIndex(inicio, inicio + len(bloco))
+            inicio += len(bloco)
+            yield bloco
         
-        # Recarregar com header correto
-        df = pd.read_excel(caminho_arquivo, header=linha_cabecalho)
+        registrador.info(f"Leitura em blocos concluída: {inicio} linhas")
+    
+    @staticmethod
+    def _ler_csv_em_blocos(caminho_arquivo: Path, tamanho_bloco: int, palavras_chave: Optional[list],
+                           usecols: Optional[Callable[[Any], bool]]) -> Iterator[pd.DataFrame]:
+        """Lê um CSV em blocos; separador e codificação são detectados nas primeiras linhas."""
+        with open(caminho_arquivo, 'rb') as arquivo:
+            amostra = arquivo.read(64 * 1024)
+        try:
+            amostra.decode('utf-8')
+            codificacao = 'utf-8-sig'
+        except UnicodeDecodeError:
+            # Exportações antigas do AcadWeb saem em latin-1
+            codificacao = 'latin-1'
         
-        registrador.info(f"Dados carregados: {df.shape[0]} linhas, {df.shape[1]} colunas")
-        return df
+        texto = amostra.decode(codificacao, errors='ignore')
+        try:
+            separador = csv.Sniffer().sniff(texto, delimiters=',;\t|').delimiter
+        except csv.Error:
+            separador = ','
+        
+        with medir_etapa('header_detection') as etapa:
+            linhas_iniciais = list(csv.reader(io.StringIO(texto), delimiter=separador))[:5]
+            df_inicio = pd.DataFrame(linhas_iniciais).replace('', np.nan)
+            linha_cabecalho = CarregadorDados.detectar_linha_cabecalho(df_inicio, palavras_chave)
+            etapa.linhas = len(df_inicio)
+        
+        yield from pd.read_csv(
+            caminho_arquivo, sep=separador, encoding=codificacao, skiprows=linha_cabecalho,
+            usecols=usecols, chunksize=tamanho_bloco
+        )
+    
+    @staticmethod
+    def _ler_xlsx_em_blocos(caminho_arquivo: Path, tamanho_bloco: int, palavras_chave: Optional[list],
+                            usecols: Optional[Callable[[Any], bool]]) -> Iterator[pd.DataFrame]:
+        """Percorre a primeira planilha de um .xlsx em blocos de linhas."""
+        from openpyxl import load_workbook
+        from pandas.io.parsers import TextParser
+        
+        with medir_etapa('header_detection') as etapa:
+            df_inicio = CarregadorDados.ler_linhas_iniciais(caminho_arquivo)
+            linha_cabecalho = CarregadorDados.detectar_linha_cabecalho(df_inicio, palavras_chave)
+            etapa.linhas = len(df_inicio)
+        
+        def converter(valor: Any) -> Any:
+            # Mesmas conversões do leitor openpyxl do pandas
+            if valor is None:
+                return ''
+            if isinstance(valor, float) and valor.is_integer():
+                return int(valor)
+            return valor
+        
+        def montar_bloco(cabecalho: list, linhas: list) -> pd.DataFrame:
+            # Parser do read_excel: nomes de coluna, tipos e valores ausentes idênticos
+            return TextParser([cabecalho] + linhas, header=0, usecols=usecols, skip_blank_lines=False).read()
+        
+        livro = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+        try:
+            planilha = livro.worksheets[0]
+            cabecalho = None
+            linhas = []
+            linhas_vazias = []
+            for linha in planilha.iter_rows(min_row=linha_cabecalho + 1, values_only=True):
+                linha = [converter(valor) for valor in linha]
+                if cabecalho is None:
+                    while linha and linha[-1] == '':
+                        linha.pop()
+                    cabecalho = linha
+                    continue
+                
+                linha = (linha + [''] * len(cabecalho))[:len(cabecalho)]
+                if all(valor == '' for valor in linha):
+                    # Linhas vazias só entram se houver dados depois delas, como no read_excel
+                    linhas_vazias.append(linha)
+                    continue
+                linhas.extend(linhas_vazias)
+                linhas_vazias.clear()
+                linhas.append(linha)
+                
+                if len(linhas) >= tamanho_bloco:
+                    yield montar_bloco(cabecalho, linhas[:tamanho_bloco])
+                    linhas = linhas[tamanho_bloco:]
+            
+            if linhas:
+                yield montar_bloco(cabecalho, linhas)
+        finally:
+            livro.close()
     
     @staticmethod
     def carregar_dados_curriculares() -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
@@ -88,10 +307,10 @@ class CarregadorDados:
             # Carregar disciplinas
             caminho_disciplinas = configuracoes.obter_caminho_disciplinas()
             if caminho_disciplinas.exists():
-                df_bruto = pd.read_excel(caminho_disciplinas)
-                # Usar linha 1 como header (que contém: Código, Disciplina, etc.)
-                cabecalho = df_bruto.iloc[1].values
+                # Usar a terceira linha como header (que contém: Código, Disciplina, etc.)
                 df_disciplinas = pd.read_excel(caminho_disciplinas, skiprows=2)
+                cabecalho = CarregadorDados.ler_linhas_iniciais(caminho_disciplinas, 3).iloc[2].tolist()
+                cabecalho = (cabecalho + [np.nan] * df_disciplinas.shape[1])[:df_disciplinas.shape[1]]
                 df_disciplinas.columns = cabecalho
                 registrador.info(f"Disciplinas carregadas: {len(df_disciplinas)} registros")
             
@@ -129,6 +348,39 @@ class CarregadorDados:
         nome = dados_aluno.get('Nome', 'Desconhecido')
         return f"NOME_{str(nome).replace(' ', '_')}"
     
+    @staticmethod
+    def limpar_identificadores_alunos(df: pd.DataFrame) -> np.ndarray:
+        """
+        Versão vetorizada de limpar_identificador_aluno para um DataFrame.
+        
+        Args:
+            df: DataFrame com dados dos alunos
+            
+        Returns:
+            Array com o identificador limpo de cada linha
+        """
+        identificadores_possiveis = ['Matrícula', 'Matricula', 'ID', 'Código']
+        
+        identificadores = np.empty(len(df), dtype=object)
+        pendentes = np.ones(len(df), dtype=bool)
+        
+        for campo in identificadores_possiveis:
+            if campo in df.columns:
+                validos = pendentes & df[campo].notna().to_numpy()
+                identificadores[validos] = aplicar_por_valor_unico(
+                    df[campo][validos], lambda valor: str(valor).strip()
+                )
+                pendentes &= ~validos
+        
+        # Se não encontrar, usar nome como fallback
+        if pendentes.any():
+            nomes = obter_coluna(df, 'Nome', 'Desconhecido')[pendentes]
+            identificadores[pendentes] = aplicar_por_valor_unico(
+                nomes, lambda nome: f"NOME_{str(nome).replace(' ', '_')}"
+            )
+        
+        return identificadores
+    
     @staticmethod
     def validar_dados_aluno(dados_aluno: pd.Series) -> bool:
         """
@@ -0,0 +1,323 @@
+﻿"""
+Instrumentação das etapas do pipeline (tempo de parede, CPU, linhas e memória).
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+@dataclass
+class MedicaoEtapa:
+    """Medições acumuladas de uma etapa (somadas entre blocos e chamadas)."""
+    nome: str
+    parede_s: float = 0.0
+    cpu_s: float = 0.0
+    linhas: int = 0
+    pico_memoria_mb: float = 0.0
+    chamadas: int = 0
+
+class EtapaMedida:
+    """
+    Etapa em andamento, devolvida por medir_etapa.
+    
+    O atributo linhas pode ser informado na abertura ou preenchido dentro
+    do bloco with, quando a quantidade só é conhecida depois da leitura.
+    """
+    
+    __slots__ = ('nome', 'linhas', 'inicio_parede', 'inicio_cpu', 'filhas_parede', 'filhas_cpu')
+    
+    def __init__(self, nome: str, linhas: Optional[int] = None):
+        self.nome = nome
+        self.linhas = linhas
+        self.inicio_parede = time.perf_counter()
+        self.inicio_cpu = time.process_time()
+        self.filhas_parede = 0.0
+        self.filhas_cpu = 0.0
+
+class _EtapaDesativada:
+    """Etapa sem coletor ativo: não mede nada e ignora as linhas informadas."""
+    
+    __slots__ = ()
+    
+    @property
+    def linhas(self) -> None:
+        return None
+    
+    @linhas.setter
+    def linhas(self, valor: Any) -> None:
+        pass
+    
+    def __enter__(self) -> '_EtapaDesativada':
+        return self
+    
+    def __exit__(self, *excecao: Any) -> None:
+        return None
+
+_ETAPA_DESATIVADA = _EtapaDesativada()
+
+def obter_pico_memoria_mb() -> float:
+    """
+    Retorna o pico de memória residente (RSS) do processo até agora, em MB.
+    
+    Returns:
+        Pico de RSS em MB; 0.0 onde o módulo resource não existe (Windows)
+    """
+    if resource is None:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+class Instrumentacao:
+    """
+    Coletor das medições de etapas do pipeline.
+    
+    Cada etapa registra tempo de parede, tempo de CPU, linhas processadas e
+    o pico de RSS do processo ao final. Etapas aninhadas (ex.: 'shap' dentro
+    de 'result_building') descontam o tempo das filhas, então a soma das
+    etapas não conta nada duas vezes. Etapas com o mesmo nome são
+    acumuladas, como os blocos do modo em streaming.
+    
+    O coletor só mede o que roda com ele ativo (ver ativar_instrumentacao);
+    sem coletor ativo, medir_etapa devolve um contexto vazio.
+    
+    Attributes:
+        observadores: Funções chamadas com o nome da etapa a cada etapa
+            encerrada, fora do tempo medido da etapa (ex.: PerfilExecucao
+            tira um snapshot de memória em cada fronteira)
+    """
+    
+    def __init__(self):
+        """Inicializa o coletor vazio."""
+        self.etapas: Dict[str, MedicaoEtapa] = {}
+        self.observadores: List[Callable[[str], None]] = []
+        # Etapas abertas, por thread: o mesmo coletor pode medir chamadas concorrentes
+        self._locais = threading.local()
+        self._trava = threading.Lock()
+        self._inicio = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+    
+    @contextmanager
+    def etapa(self, nome: str, linhas: Optional[int] = None) -> Iterator[EtapaMedida]:
+        """
+        Mede um bloco with como uma etapa.
+        
+        Args:
+            nome: Nome da etapa (ex.: 'load', 'predict')
+            linhas: Linhas processadas pela etapa, se já conhecidas
+            
+        Yields:
+            EtapaMedida, cujo atributo linhas pode ser alterado no bloco
+        """
+        pilha = self._obter_pilha()
+        medida = EtapaMedida(nome, linhas)
+        pilha.append(medida)
+        try:
+            yield medida
+        finally:
+            pilha.pop()
+            parede = time.perf_counter() - medida.inicio_parede
+            cpu = time.process_time() - medida.inicio_cpu
+            if pilha:
+                pilha[-1].filhas_parede += parede
+                pilha[-1].filhas_cpu += cpu
+            self._registrar(medida, parede - medida.filhas_parede, cpu - medida.filhas_cpu)
+            if self.observadores:
+                self._notificar(nome, pilha)
+    
+    def _notificar(self, nome: str, pilha: List[EtapaMedida]) -> None:
+        """Chama os observadores; o tempo gasto neles não entra na etapa que contém esta."""
+        inicio_parede = time.perf_counter()
+        inicio_cpu = time.process_time()
+        for observador in self.observadores:
+            observador(nome)
+        if pilha:
+            pilha[-1].filhas_parede += time.perf_counter() - inicio_parede
+            pilha[-1].filhas_cpu += time.process_time() - inicio_cpu
+    
+    def _obter_pilha(self) -> List[EtapaMedida]:
+        """Etapas abertas na thread atual."""
+        pilha = getattr(self._locais, 'pilha', None)
+        if pilha is None:
+            pilha = self._locais.pilha = []
+        return pilha
+    
+    def _registrar(self, medida: EtapaMedida, parede: float, cpu: float) -> None:
+        """Acumula uma etapa encerrada."""
+        pico = obter_pico_memoria_mb()
+        with self._trava:
+            medicao = self.etapas.get(medida.nome)
+            if medicao is None:
+                medicao = self.etapas[medida.nome] = MedicaoEtapa(medida.nome)
+            medicao.parede_s += parede
+            medicao.cpu_s += cpu
+            medicao.linhas += int(medida.linhas or 0)
+            medicao.pico_memoria_mb = max(medicao.pico_memoria_mb, pico)
+            medicao.chamadas += 1
+    
+    def para_dicionario(self) -> Dict[str, Any]:
+        """
+        Retorna as medições em formato JSON.
+        
+        Returns:
+            Dicionário com 'stages' (uma entrada por etapa, na ordem em que
+            terminaram pela primeira vez) e 'total' (tempo desde a criação
+            do coletor e pico de RSS)
+        """
+        with self._trava:
+            medicoes = [asdict(medicao) for medicao in self.etapas.values()]
+        etapas = {}
+        for medicao in medicoes:
+            etapas[medicao['nome']] = {
+                'wall_seconds': round(medicao['parede_s'], 6),
+                'cpu_seconds': round(medicao['cpu_s'], 6),
+                'rows': medicao['linhas'],
+                'rows_per_second': (round(medicao['linhas'] / medicao['parede_s'], 1)
+                                    if medicao['parede_s'] > 0 else None),
+                'peak_rss_mb': round(medicao['pico_memoria_mb'], 1),
+                'calls': medicao['chamadas']
+            }
+        return {
+            'stages': etapas,
+            'total': {
+                'wall_seconds': round(time.perf_counter() - self._inicio, 6),
+                'cpu_seconds': round(time.process_time() - self._inicio_cpu, 6),
+                'peak_rss_mb': round(obter_pico_memoria_mb(), 1)
+            }
+        }
+    
+    def para_prometheus(self, prefixo: str = 'evasao') -> str:
+        """
+        Retorna as medições no formato texto de exposição do Prometheus.
+        
+        Args:
+            prefixo: Prefixo dos nomes das métricas
+            
+        Returns:
+            Texto com uma série por etapa e métrica
+        """
+        metricas = self.para_dicionario()
+        linhas = []
+        series = (
+            ('stage_wall_seconds', 'wall_seconds', 'Tempo de parede da etapa (sem etapas aninhadas)'),
+            ('stage_cpu_seconds', 'cpu_seconds', 'Tempo de CPU da etapa (sem etapas aninhadas)'),
+            ('stage_rows', 'rows', 'Linhas processadas pela etapa'),
+            ('stage_peak_rss_megabytes', 'peak_rss_mb', 'Pico de RSS do processo ao fim da etapa'),
+            ('stage_calls', 'calls', 'Execuções da etapa')
+        )
+        for nome_metrica, chave, descricao in series:
+            nome_metrica = f"{prefixo}_{nome_metrica}"
+            linhas.append(f"# HELP {nome_metrica} {descricao}")
+            linhas.append(f"# TYPE {nome_metrica} gauge")
+            for etapa, valores in metricas['stages'].items():
+                linhas.append(f'{nome_metrica}{{stage="{etapa}"}} {valores[chave]}')
+        
+        for chave, valor in metricas['total'].items():
+            nome_metrica = f"{prefixo}_total_{chave.replace('_mb', '_megabytes')}"
+            linhas.append(f"# TYPE {nome_metrica} gauge")
+            linhas.append(f"{nome_metrica} {valor}")
+        return '\n'.join(linhas) + '\n'
+    
+    def salvar_json(self, caminho: Path) -> None:
+        """
+        Grava as medições em JSON.
+        
+        Args:
+            caminho: Arquivo de saída
+        """
+        Path(caminho).write_text(json.dumps(self.para_dicionario(), indent=2, ensure_ascii=False),
+                                 encoding='utf-8')
+    
+    def salvar_prometheus(self, caminho: Path, prefixo: str = 'evasao') -> None:
+        """
+        Grava as medições no formato texto do Prometheus (ex.: para o textfile collector).
+        
+        Args:
+            caminho: Arquivo de saída
+            prefixo: Prefixo dos nomes das métricas
+        """
+        Path(caminho).write_text(self.para_prometheus(prefixo), encoding='utf-8')
+
+# Coletor da chamada atual; cada thread (e cada tarefa asyncio) tem o seu
+_instrumentacao_ativa: ContextVar[Optional[Instrumentacao]] = ContextVar('instrumentacao_ativa', default=None)
+
+def obter_instrumentacao() -> Optional[Instrumentacao]:
+    """
+    Retorna o coletor ativo no contexto atual.
+    
+    Returns:
+        Instrumentacao ativa ou None
+    """
+    return _instrumentacao_ativa.get()
+
+@contextmanager
+def ativar_instrumentacao(instrumentacao: Optional[Instrumentacao]) -> Iterator[Optional[Instrumentacao]]:
+    """
+    Ativa um coletor para as etapas executadas dentro do bloco with.
+    
+    Args:
+        instrumentacao: Coletor a ativar; None desativa a medição no bloco
+        
+    Yields:
+        O próprio coletor
+    """
+    token = _instrumentacao_ativa.set(instrumentacao)
+    try:
+        yield instrumentacao
+    finally:
+        _instrumentacao_ativa.reset(token)
+
+def medir_etapa(nome: str, linhas: Optional[int] = None):
+    """
+    Mede uma etapa no coletor ativo.
+    
+    Sem coletor ativo devolve um contexto vazio compartilhado, de modo que
+    a instrumentação desligada custa uma leitura de ContextVar por etapa.
+    
+    Args:
+        nome: Nome da etapa
+        linhas: Linhas processadas, se já conhecidas
+        
+    Returns:
+        Gerenciador de contexto que produz a etapa em andamento
+    """
+    instrumentacao = _instrumentacao_ativa.get()
+    if instrumentacao is None:
+        return _ETAPA_DESATIVADA
+    return instrumentacao.etapa(nome, linhas)
+
+def medir_iteracao(nome: str, iteravel: Iterable[Any]) -> Iterator[Any]:
+    """
+    Mede a produção de cada item de um iterável (ex.: blocos lidos de um arquivo).
+    
+    Só o tempo gasto dentro de next() entra na etapa; o processamento do
+    item por quem consome o iterador fica de fora.
+    
+    Args:
+        nome: Nome da etapa
+        iteravel: Iterável cujos itens têm len() (ex.: DataFrames)
+        
+    Yields:
+        Os itens do iterável, na mesma ordem
+    """
+    iterador = iter(iteravel)
+    fim = object()
+    while True:
+        with medir_etapa(nome) as etapa:
+            item = next(iterador, fim)
+            if item is not fim:
+                etapa.linhas = len(item)
+        if item is fim:
+            return
+        yield item
@@ -0,0 +1,421 @@
+﻿"""
+Monitoramento de uma pasta de entrada com fila persistente de arquivos.
+"""
+
+import os
+import sys
+import time
+import fnmatch
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .registrador import obter_registrador, AMOSTRAR
+
+registrador = obter_registrador(__name__)
+
+class ObservadorPasta:
+    """
+    Espera por mudanças em um diretório.
+    
+    No Linux usa inotify (via ctypes, sem dependências); nos demais sistemas,
+    ou se o inotify não estiver disponível, apenas espera o intervalo de
+    varredura. Os eventos só antecipam a próxima varredura: quem decide o
+    que mudou é a varredura do diretório.
+    """
+    
+    # Criação, fim de escrita, renomeação para dentro e remoção
+    _EVENTOS = 0x00000100 | 0x00000008 | 0x00000080 | 0x00000200
+    
+    def __init__(self, diretorio: Path, usar_inotify: bool = True):
+        """
+        Inicializa o observador.
+        
+        Args:
+            diretorio: Diretório observado
+            usar_inotify: Tenta usar inotify; False força a varredura periódica
+        """
+        self.diretorio = Path(diretorio)
+        self._descritor = None
+        if usar_inotify:
+            self._descritor = self._iniciar_inotify()
+        registrador.info(f"Monitorando {self.diretorio} via {'inotify' if self.usa_inotify else 'varredura periódica'}")
+    
+    @property
+    def usa_inotify(self) -> bool:
+        return self._descritor is not None
+    
+    def _iniciar_inotify(self) -> Optional[int]:
+        """Cria o descritor inotify do diretório; None se indisponível."""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            import ctypes
+            import ctypes.util
+            
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            descritor = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if descritor < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_init1')
+            if libc.inotify_add_watch(descritor, os.fsencode(self.diretorio), self._EVENTOS) < 0:
+                erro = ctypes.get_errno()
+                os.close(descritor)
+                raise OSError(erro, 'inotify_add_watch')
+            return descritor
+        except (OSError, AttributeError) as e:
+            registrador.warning(f"inotify indisponível, usando varredura periódica: {e}")
+            return None
+    
+    def aguardar(self, tempo_limite: float) -> bool:
+        """
+        Bloqueia até haver evento no diretório ou o tempo acabar.
+        
+        Args:
+            tempo_limite: Espera máxima em segundos
+            
+        Returns:
+            True se algum evento foi recebido
+        """
+        if self._descritor is None:
+            time.sleep(tempo_limite)
+            return False
+        
+        import select
+        
+        prontos, _, _ = select.select([self._descritor], [], [], tempo_limite)
+        if not prontos:
+            return False
+        try:
+            # O conteúdo dos eventos não importa; a varredura seguinte lê o diretório
+            while os.read(self._descritor, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+    
+    def fechar(self) -> None:
+        """Libera o descritor inotify."""
+        if self._descritor is not None:
+            os.close(self._descritor)
+            self._descritor = None
+
+class FilaArquivos:
+    """
+    Fila persistente (SQLite) dos arquivos vistos pelo monitor.
+    
+    A chave é o hash SHA-256 do conteúdo: um arquivo processado com
+    sucesso não é processado de novo, mesmo que seja copiado outra vez para
+    a pasta ou que o monitor seja reiniciado. Um conteúdo em 'erro' volta a
+    'pendente' quando o arquivo reaparece (reinício do monitor ou nova
+    cópia), até `maximo_tentativas` falhas; um em 'ausente' volta sempre.
+    Estados: 'pendente', 'processando', 'concluido', 'erro' e 'ausente'
+    (removido antes do processamento). Deve ser usada por uma única thread.
+    """
+    
+    def __init__(self, caminho_banco: Path, maximo_tentativas: int = 3):
+        """
+        Abre (ou cria) a fila.
+        
+        Args:
+            caminho_banco: Arquivo SQLite da fila
+            maximo_tentativas: Falhas após as quais um conteúdo não é mais reenfileirado
+        """
+        self.caminho_banco = Path(caminho_banco)
+        self.maximo_tentativas = max(int(maximo_tentativas), 1)
+        self._conexao = sqlite3.connect(self.caminho_banco)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                hash TEXT PRIMARY KEY,
+                caminho TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                estado TEXT NOT NULL,
+                erro TEXT,
+                resultado TEXT,
+                enfileirado_em TEXT NOT NULL,
+                atualizado_em TEXT NOT NULL,
+                falhas INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Filas criadas antes da contagem de falhas
+        colunas = {linha[1] for linha in self._conexao.execute("PRAGMA table_info(arquivos)")}
+        if 'falhas' not in colunas:
+            self._conexao.execute("ALTER TABLE arquivos ADD COLUMN falhas INTEGER NOT NULL DEFAULT 0")
+            self._conexao.execute("UPDATE arquivos SET falhas = 1 WHERE estado = 'erro'")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_arquivos_estado ON arquivos (estado)")
+        self._conexao.commit()
+    
+    def enfileirar(self, chave: str, caminho: Path, tamanho: int) -> bool:
+        """
+        Adiciona um arquivo como pendente, ou devolve à fila um conteúdo que falhou ou sumiu.
+        
+        Args:
+            chave: Hash do conteúdo
+            caminho: Caminho do arquivo
+            tamanho: Tamanho em bytes
+            
+        Returns:
+            False se o conteúdo já está pendente, em processamento, concluído
+            ou esgotou as tentativas
+        """
+        agora = datetime.now().isoformat(timespec='seconds')
+        with self._conexao:
+            cursor = self._conexao.execute(
+                "INSERT INTO arquivos (hash, caminho, tamanho, estado, enfileirado_em, atualizado_em) "
+                "VALUES (?, ?, ?, 'pendente', ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET caminho = excluded.caminho, tamanho = excluded.tamanho, "
+                "estado = 'pendente', enfileirado_em = excluded.enfileirado_em, "
+                "atualizado_em = excluded.atualizado_em "
+                "WHERE arquivos.estado = 'ausente' OR (arquivos.estado = 'erro' AND arquivos.falhas < ?)",
+                (chave, str(caminho), tamanho, agora, agora, self.maximo_tentativas)
+            )
+        return cursor.rowcount == 1
+    
+    def obter_estado(self, chave: str) -> Optional[str]:
+        """Retorna o estado do conteúdo na fila, ou None se nunca foi visto."""
+        linha = self._conexao.execute("SELECT estado FROM arquivos WHERE hash = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+    
+    def obter_pendentes(self, limite: int) -> List[Tuple[str, Path]]:
+        """Retorna até `limite` arquivos pendentes, na ordem de chegada."""
+        linhas = self._conexao.execute(
+            "SELECT hash, caminho FROM arquivos WHERE estado = 'pendente' ORDER BY enfileirado_em, rowid LIMIT ?",
+            (limite,)
+        ).fetchall()
+        return [(chave, Path(caminho)) for chave, caminho in linhas]
+    
+    def marcar(self, chave: str, estado: str, erro: Optional[str] = None,
+               resultado: Optional[str] = None) -> None:
+        """Atualiza o estado de um arquivo; 'erro' também conta uma falha."""
+        with self._conexao:
+            self._conexao.execute(
+                "UPDATE arquivos SET estado = ?, erro = ?, resultado = COALESCE(?, resultado), atualizado_em = ?, "
+                "falhas = falhas + ? WHERE hash = ?",
+                (estado, erro, resultado, datetime.now().isoformat(timespec='seconds'),
+                 int(estado == 'erro'), chave)
+            )
+    
+    def obter_falhas(self, chave: str) -> int:
+        """Retorna quantas vezes o processamento do conteúdo falhou."""
+        linha = self._conexao.execute("SELECT falhas FROM arquivos WHERE hash = ?", (chave,)).fetchone()
+        return linha[0] if linha else 0
+    
+    def recuperar(self) -> int:
+        """
+        Devolve à fila os arquivos interrompidos por uma parada anterior.
+        
+        Um arquivo 'processando' que já saiu da pasta de entrada foi movido
+        pelo processamento, então é dado como concluído; os demais voltam a
+        'pendente'.
+        
+        Returns:
+            Quantidade de arquivos devolvidos à fila
+        """
+        linhas = self._conexao.execute(
+            "SELECT hash, caminho FROM arquivos WHERE estado = 'processando'"
+        ).fetchall()
+        devolvidos = 0
+        for chave, caminho in linhas:
+            if Path(caminho).exists():
+                self.marcar(chave, 'pendente')
+                devolvidos += 1
+            else:
+                self.marcar(chave, 'concluido')
+        return devolvidos
+    
+    def contar(self) -> Dict[str, int]:
+        """Retorna a quantidade de arquivos em cada estado."""
+        return dict(self._conexao.execute("SELECT estado, COUNT(*) FROM arquivos GROUP BY estado").fetchall())
+    
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco."""
+        self._conexao.close()
+
+class MonitorPasta:
+    """
+    Processa automaticamente os arquivos que chegam em um diretório.
+    
+    Um arquivo só entra na fila depois que tamanho e data de modificação
+    ficam inalterados por `tempo_estabilidade_s` (cópias e downloads em
+    andamento são ignorados). A fila é persistente e indexada pelo conteúdo,
+    e os arquivos são processados por um pool de threads que compartilham o
+    mesmo sistema já carregado. Um arquivo que falhou é tentado de novo
+    quando reaparece ou muda de data, até `maximo_tentativas` falhas.
+    """
+    
+    def __init__(self, diretorio: Path, processar: Callable[[Path], Dict[str, Any]],
+                 padroes: Tuple[str, ...] = ("*.xlsx",), tempo_estabilidade_s: float = 3.0,
+                 intervalo_varredura_s: float = 2.0, trabalhadores: int = 2,
+                 arquivo_fila: str = ".fila_monitor.sqlite3", usar_inotify: bool = True,
+                 maximo_tentativas: int = 3):
+        """
+        Inicializa o monitor.
+        
+        Args:
+            diretorio: Diretório monitorado
+            processar: Função chamada com o caminho de cada arquivo estável;
+                devolve um resumo com a chave 'erro' (None em caso de sucesso)
+            padroes: Padrões (fnmatch) dos arquivos aceitos
+            tempo_estabilidade_s: Tempo sem mudanças antes de processar
+            intervalo_varredura_s: Intervalo máximo entre varreduras do diretório
+            trabalhadores: Arquivos processados ao mesmo tempo
+            arquivo_fila: Nome do banco da fila, criado dentro do diretório
+            usar_inotify: False força a varredura periódica
+            maximo_tentativas: Falhas de um mesmo conteúdo antes de desistir dele
+        """
+        self.diretorio = Path(diretorio)
+        self.processar = processar
+        self.padroes = tuple(padroes)
+        self.tempo_estabilidade_s = tempo_estabilidade_s
+        self.intervalo_varredura_s = intervalo_varredura_s
+        self.trabalhadores = max(int(trabalhadores), 1)
+        self.arquivo_fila = arquivo_fila
+        self.usar_inotify = usar_inotify
+        self.maximo_tentativas = maximo_tentativas
+        
+        # caminho -> (tamanho, mtime_ns, momento em que essa assinatura foi vista)
+        self._candidatos: Dict[Path, Tuple[int, int, float]] = {}
+        # Arquivos já decididos nesta execução: caminho -> (tamanho, mtime_ns)
+        self._vistos: Dict[Path, Tuple[int, int]] = {}
+        self._em_andamento: Dict[Future, str] = {}
+        self._parar = threading.Event()
+    
+    def parar(self) -> None:
+        """Pede o encerramento; arquivos em processamento são concluídos."""
+        self._parar.set()
+    
+    def executar(self) -> None:
+        """Monitora o diretório até parar() ser chamado."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        fila = FilaArquivos(self.diretorio / self.arquivo_fila, self.maximo_tentativas)
+        observador = ObservadorPasta(self.diretorio, self.usar_inotify)
+        executor = ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix='monitor')
+        
+        devolvidos = fila.recuperar()
+        if devolvidos:
+            registrador.info(f"{devolvidos} arquivo(s) interrompido(s) devolvido(s) à fila")
+        
+        try:
+            while not self._parar.is_set():
+                try:
+                    self._varrer(fila)
+                    self._coletar_concluidos(fila)
+                    self._despachar(fila, executor)
+                except Exception as e:
+                    # Um ciclo com erro (pasta inacessível, banco ocupado...) não derruba o monitor
+                    registrador.error("Erro no ciclo do monitor de %s: %s", self.diretorio, e,
+                                      exc_info=True, extra=AMOSTRAR)
+                
+                # Com candidatos aguardando estabilidade a próxima varredura vem antes
+                tempo_limite = self.intervalo_varredura_s
+                if self._candidatos or self._em_andamento:
+                    tempo_limite = min(tempo_limite, self.tempo_estabilidade_s / 2)
+                observador.aguardar(tempo_limite)
+        finally:
+            executor.shutdown(wait=True)
+            self._coletar_concluidos(fila)
+            observador.fechar()
+            fila.fechar()
+    
+    def _varrer(self, fila: FilaArquivos) -> None:
+        """Lê o diretório, acompanha a estabilidade e enfileira os arquivos prontos."""
+        agora = time.monotonic()
+        presentes = set()
+        
+        for entrada in os.scandir(self.diretorio):
+            nome = entrada.name
+            # Arquivos de bloqueio do Excel (~$arquivo.xlsx) e ocultos
+            if nome.startswith(('~$', '.')) or not entrada.is_file():
+                continue
+            if not any(fnmatch.fnmatch(nome, padrao) for padrao in self.padroes):
+                continue
+            
+            caminho = Path(entrada.path)
+            presentes.add(caminho)
+            try:
+                estado = entrada.stat()
+            except OSError:
+                continue
+            assinatura = (estado.st_size, estado.st_mtime_ns)
+            
+            if self._vistos.get(caminho) == assinatura:
+                continue
+            
+            anterior = self._candidatos.get(caminho)
+            if anterior is None or anterior[:2] != assinatura:
+                self._candidatos[caminho] = assinatura + (agora,)
+                continue
+            if agora - anterior[2] < self.tempo_estabilidade_s or estado.st_size == 0:
+                continue
+            
+            # Estável: decide pelo conteúdo se é novo
+            try:
+                chave = self._calcular_hash(caminho)
+            except OSError as e:
+                # Removido ou bloqueado depois do stat: continua candidato e é lido de novo na próxima varredura
+                registrador.warning("Não foi possível ler %s, nova tentativa na próxima varredura: %s", nome, e,
+                                    extra=AMOSTRAR)
+                self._vistos.pop(caminho, None)
+                continue
+            del self._candidatos[caminho]
+            self._vistos[caminho] = assinatura
+            estado_anterior = fila.obter_estado(chave)
+            if fila.enfileirar(chave, caminho, estado.st_size):
+                if estado_anterior == 'erro':
+                    registrador.info(f"Arquivo reenfileirado após {fila.obter_falhas(chave)} falha(s): {nome}")
+                else:
+                    registrador.info(f"Arquivo enfileirado: {nome}")
+            elif estado_anterior == 'erro':
+                registrador.warning(f"Arquivo ignorado, {fila.obter_falhas(chave)} falhas "
+                                    f"(máximo {fila.maximo_tentativas}): {nome}")
+            else:
+                registrador.info(f"Arquivo ignorado, conteúdo já visto ({estado_anterior}): {nome}")
+        
+        for caminho in list(self._candidatos):
+            if caminho not in presentes:
+                del self._candidatos[caminho]
+        for caminho in list(self._vistos):
+            if caminho not in presentes:
+                del self._vistos[caminho]
+    
+    def _despachar(self, fila: FilaArquivos, executor: ThreadPoolExecutor) -> None:
+        """Envia arquivos pendentes ao pool enquanto houver trabalhadores livres."""
+        livres = self.trabalhadores - len(self._em_andamento)
+        if livres <= 0:
+            return
+        for chave, caminho in fila.obter_pendentes(livres):
+            if not caminho.exists():
+                fila.marcar(chave, 'ausente')
+                continue
+            fila.marcar(chave, 'processando')
+            registrador.info(f"Processando: {caminho.name}")
+            self._em_andamento[executor.submit(self.processar, caminho)] = chave
+    
+    def _coletar_concluidos(self, fila: FilaArquivos) -> None:
+        """Registra na fila o resultado dos processamentos terminados."""
+        for futuro in [futuro for futuro in self._em_andamento if futuro.done()]:
+            chave = self._em_andamento.pop(futuro)
+            try:
+                resumo = futuro.result()
+                erro = resumo.get('erro')
+            except Exception as e:
+                resumo, erro = {}, str(e)
+            
+            if erro is None:
+                fila.marcar(chave, 'concluido', resultado=str(resumo.get('arquivo_saida', '')))
+                registrador.info(f"Concluído: {resumo.get('arquivo', chave[:12])}")
+            else:
+                fila.marcar(chave, 'erro', erro=erro)
+                registrador.error(f"Falha ao processar {resumo.get('arquivo', chave[:12])}: {erro}")
+    
+    @staticmethod
+    def _calcular_hash(caminho: Path) -> str:
+        """Calcula o SHA-256 do conteúdo do arquivo."""
+        resumo = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                resumo.update(bloco)
+        return resumo.hexdigest()
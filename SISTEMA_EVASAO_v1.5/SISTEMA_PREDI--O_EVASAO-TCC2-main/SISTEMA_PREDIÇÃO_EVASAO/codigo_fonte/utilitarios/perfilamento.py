@@ -0,0 +1,261 @@
+﻿"""
+Perfil de execução do pipeline com cProfile e, opcionalmente, tracemalloc.
+"""
+
+import cProfile
+import pstats
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .registrador import obter_registrador
+from .instrumentacao import Instrumentacao, ativar_instrumentacao, obter_instrumentacao
+
+registrador = obter_registrador(__name__)
+
+# Funções listadas na tabela de pontos quentes
+TOP_N_PADRAO = 30
+
+# Alocações listadas por etapa no resumo de memória
+TOP_ALOCACOES_ETAPA = 5
+
+# Ramos com menos que esta fração do tempo total são omitidos das pilhas recolhidas
+FRACAO_MINIMA_PILHA = 1e-4
+
+Funcao = Tuple[str, int, str]
+
+class PerfilExecucao:
+    """
+    Perfil de um trecho do pipeline, usado como bloco with.
+    
+    Roda o trecho sob cProfile e grava em diretorio_saida:
+    
+    - <nome>.pstats: estatísticas brutas (pstats, snakeviz, gprof2dot);
+    - <nome>.collapsed: pilhas recolhidas ("a;b;c microssegundos"), lidas
+      por flamegraph.pl, speedscope e inferno;
+    - <nome>.txt: tabela dos top_n pontos quentes por tempo próprio e,
+      com memoria=True, o uso de memória em cada fronteira de etapa.
+    
+    Com memoria=True o tracemalloc é ligado e, ao fim de cada etapa medida
+    por medir_etapa, é tirado um snapshot comparado ao anterior; só as
+    maiores diferenças são guardadas. Se nenhum coletor de Instrumentacao
+    estiver ativo, o perfil ativa um próprio para receber as fronteiras.
+    """
+    
+    def __init__(self, diretorio_saida: Path, nome: Optional[str] = None, memoria: bool = False,
+                 top_n: int = TOP_N_PADRAO):
+        """
+        Inicializa o perfil.
+        
+        Args:
+            diretorio_saida: Diretório dos arquivos gerados
+            nome: Prefixo dos arquivos (padrão: perfil_<data e hora>)
+            memoria: Liga o tracemalloc e registra a memória em cada etapa
+            top_n: Funções listadas na tabela de pontos quentes
+        """
+        self.diretorio_saida = Path(diretorio_saida)
+        self.nome = nome or f"perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.memoria = memoria
+        self.top_n = top_n
+        self.arquivos: Dict[str, Path] = {}
+        self.etapas_memoria: List[Dict[str, Any]] = []
+        self._perfil = cProfile.Profile()
+        self._pilha_contextos: Optional[ExitStack] = None
+        self._instrumentacao: Optional[Instrumentacao] = None
+        self._snapshot_anterior = None
+        self._iniciou_tracemalloc = False
+        self._inicio = 0.0
+        self._duracao = 0.0
+        self._duracao_snapshots = 0.0
+    
+    def __enter__(self) -> 'PerfilExecucao':
+        self._pilha_contextos = ExitStack()
+        self._instrumentacao = obter_instrumentacao()
+        if self._instrumentacao is None:
+            self._instrumentacao = self._pilha_contextos.enter_context(ativar_instrumentacao(Instrumentacao()))
+        
+        if self.memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._iniciou_tracemalloc = True
+            self._snapshot_anterior = tracemalloc.take_snapshot()
+            self._instrumentacao.observadores.append(self._marcar_etapa)
+        
+        self._inicio = time.perf_counter()
+        self._perfil.enable()
+        return self
+    
+    def __exit__(self, *excecao: Any) -> None:
+        self._perfil.disable()
+        self._duracao = time.perf_counter() - self._inicio - self._duracao_snapshots
+        
+        if self.memoria:
+            self._instrumentacao.observadores.remove(self._marcar_etapa)
+            if self._iniciou_tracemalloc:
+                tracemalloc.stop()
+            self._snapshot_anterior = None
+        self._pilha_contextos.close()
+        
+        try:
+            self.salvar()
+        except Exception as e:
+            # O perfil não deve derrubar uma execução que terminou bem
+            registrador.warning(f"Não foi possível gravar o perfil {self.nome}: {e}")
+    
+    def _marcar_etapa(self, etapa: str) -> None:
+        """Registra a memória ao fim de uma etapa e as alocações que mais cresceram nela."""
+        # A comparação de snapshots não deve aparecer entre os pontos quentes
+        self._perfil.disable()
+        inicio = time.perf_counter()
+        try:
+            atual, pico = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            diferencas = snapshot.compare_to(self._snapshot_anterior, 'lineno')[:TOP_ALOCACOES_ETAPA]
+            self._snapshot_anterior = snapshot
+            tracemalloc.reset_peak()
+        finally:
+            self._duracao_snapshots += time.perf_counter() - inicio
+            self._perfil.enable()
+        self.etapas_memoria.append({
+            'etapa': etapa,
+            'atual_mb': atual / (1024 * 1024),
+            'pico_mb': pico / (1024 * 1024),
+            'alocacoes': [
+                (str(diferenca.traceback[0]), diferenca.size_diff / (1024 * 1024))
+                for diferenca in diferencas if diferenca.size_diff > 0
+            ]
+        })
+    
+    def salvar(self) -> Dict[str, Path]:
+        """
+        Grava os arquivos do perfil.
+        
+        Returns:
+            Caminho de cada arquivo gerado, por tipo ('pstats', 'collapsed', 'resumo')
+        """
+        self.diretorio_saida.mkdir(parents=True, exist_ok=True)
+        base = self.diretorio_saida / self.nome
+        estatisticas = pstats.Stats(self._perfil)
+        
+        self.arquivos = {
+            'pstats': base.with_suffix('.pstats'),
+            'collapsed': base.with_suffix('.collapsed'),
+            'resumo': base.with_suffix('.txt')
+        }
+        estatisticas.dump_stats(self.arquivos['pstats'])
+        
+        pilhas = self.recolher_pilhas(estatisticas)
+        with open(self.arquivos['collapsed'], 'w', encoding='utf-8') as arquivo:
+            for pilha, microssegundos in sorted(pilhas.items()):
+                arquivo.write(f"{pilha} {microssegundos}\n")
+        
+        self.arquivos['resumo'].write_text(self.formatar_resumo(estatisticas), encoding='utf-8')
+        registrador.info(f"Perfil gravado em {base}.(pstats|collapsed|txt)")
+        return self.arquivos
+    
+    @staticmethod
+    def nomear_funcao(funcao: Funcao) -> str:
+        """Nome legível de uma função do pstats: modulo.py:linha(funcao)."""
+        arquivo, linha, nome = funcao
+        if arquivo == '~':
+            # Funções embutidas, ex.: <built-in method numpy.array>
+            return nome
+        return f"{Path(arquivo).name}:{linha}({nome})"
+    
+    @classmethod
+    def recolher_pilhas(cls, estatisticas: pstats.Stats) -> Dict[str, int]:
+        """
+        Reconstrói pilhas de chamadas a partir do grafo chamador -> chamado do cProfile.
+        
+        O cProfile guarda só as arestas entre funções, não as pilhas completas.
+        Partindo das funções sem chamador, o tempo próprio de cada função é
+        repartido entre os caminhos que levam a ela na proporção do tempo
+        acumulado de cada aresta. É a mesma aproximação de ferramentas como
+        flameprof: exata para funções com um único chamador e proporcional
+        nas demais. Chamadas recursivas não são expandidas de novo e ramos
+        abaixo de FRACAO_MINIMA_PILHA do tempo total são omitidos.
+        
+        Args:
+            estatisticas: Estatísticas do perfil
+            
+        Returns:
+            Dicionário "f1;f2;f3" -> tempo próprio em microssegundos
+        """
+        dados = estatisticas.stats
+        chamados: Dict[Funcao, Dict[Funcao, float]] = {}
+        for funcao, (_, _, _, _, chamadores) in dados.items():
+            for chamador, (_, _, _, acumulado_aresta) in chamadores.items():
+                chamados.setdefault(chamador, {})[funcao] = acumulado_aresta
+        
+        pilhas: Dict[str, int] = {}
+        tempo_minimo = max(sum(valores[2] for valores in dados.values()) * FRACAO_MINIMA_PILHA, 1e-6)
+        
+        def visitar(funcao: Funcao, caminho: List[Funcao], nomes: List[str], fator: float) -> None:
+            proprio = dados[funcao][2] * fator
+            microssegundos = int(round(proprio * 1e6))
+            if microssegundos > 0:
+                chave = ';'.join(nomes)
+                pilhas[chave] = pilhas.get(chave, 0) + microssegundos
+            
+            for filho, acumulado_aresta in chamados.get(funcao, {}).items():
+                acumulado_filho = dados[filho][3]
+                if filho in caminho or acumulado_filho <= 0:
+                    continue
+                tempo_ramo = acumulado_aresta * fator
+                if tempo_ramo < tempo_minimo:
+                    continue
+                caminho.append(filho)
+                nomes.append(cls.nomear_funcao(filho))
+                visitar(filho, caminho, nomes, tempo_ramo / acumulado_filho)
+                caminho.pop()
+                nomes.pop()
+        
+        raizes = [funcao for funcao, valores in dados.items() if not valores[4]]
+        for raiz in raizes:
+            visitar(raiz, [raiz], [cls.nomear_funcao(raiz)], 1.0)
+        return pilhas
+    
+    def formatar_resumo(self, estatisticas: pstats.Stats) -> str:
+        """
+        Monta a tabela de pontos quentes e, se houver, o resumo de memória por etapa.
+        
+        Args:
+            estatisticas: Estatísticas do perfil
+            
+        Returns:
+            Texto do resumo
+        """
+        dados = estatisticas.stats
+        total_proprio = sum(valores[2] for valores in dados.values()) or 1.0
+        ordenadas = sorted(dados.items(), key=lambda item: item[1][2], reverse=True)[:self.top_n]
+        
+        linhas = [
+            f"Perfil: {self.nome}",
+            f"Duração: {self._duracao:.3f}s; {estatisticas.total_calls} chamadas de função"
+            + (f" (mais {self._duracao_snapshots:.3f}s em snapshots de memória, fora do perfil)"
+               if self._duracao_snapshots else ""),
+            "",
+            f"PONTOS QUENTES (top {self.top_n} por tempo próprio)",
+            f"{'#':>3} {'próprio (s)':>12} {'%':>6} {'acumulado (s)':>14} {'chamadas':>10}  função",
+        ]
+        for posicao, (funcao, (chamadas_primitivas, chamadas, proprio, acumulado, _)) in enumerate(ordenadas, 1):
+            texto_chamadas = str(chamadas) if chamadas == chamadas_primitivas else f"{chamadas}/{chamadas_primitivas}"
+            linhas.append(
+                f"{posicao:>3} {proprio:>12.4f} {proprio / total_proprio * 100:>5.1f}% {acumulado:>14.4f} "
+                f"{texto_chamadas:>10}  {self.nomear_funcao(funcao)}"
+            )
+        
+        if self.etapas_memoria:
+            linhas += [
+                "",
+                "MEMÓRIA POR ETAPA (tracemalloc)",
+                f"{'etapa':<20} {'atual (MB)':>11} {'pico (MB)':>10}  maiores alocações da etapa",
+            ]
+            for registro in self.etapas_memoria:
+                linhas.append(f"{registro['etapa']:<20} {registro['atual_mb']:>11.1f} {registro['pico_mb']:>10.1f}")
+                for origem, megabytes in registro['alocacoes']:
+                    linhas.append(f"{'':<20} {'':>11} {'':>10}  +{megabytes:.2f} MB {origem}")
+        return '\n'.join(linhas) + '\n'
@@ -2,17 +2,105 @@
 Sistema de logging para o projeto de predição de evasão estudantil.
 """
 
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 from ..configuracao import configuracoes
 
+# Marca mensagens emitidas por aluno ou por coluna, sujeitas a FiltroAmostragem:
+# registrador.debug("Analisando aluno: faltas=%s", faltas, extra=AMOSTRAR)
+AMOSTRAR = {'amostrar': True}
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Limita a frequência das mensagens marcadas com extra=AMOSTRAR.
+    
+    Cada modelo de mensagem (logger e texto antes da formatação) passa no
+    máximo `limite` vezes a cada `intervalo_s` segundos; a primeira mensagem
+    da janela seguinte informa quantas foram suprimidas. Mensagens sem a
+    marca passam sempre.
+    """
+    
+    def __init__(self, limite: int, intervalo_s: float):
+        """
+        Inicializa o filtro.
+        
+        Args:
+            limite: Mensagens por modelo e janela
+            intervalo_s: Duração da janela em segundos
+        """
+        super().__init__()
+        self.limite = limite
+        self.intervalo_s = intervalo_s
+        # (logger, modelo) -> [início da janela, emitidas, suprimidas]
+        self._janelas: Dict[tuple, List[float]] = {}
+        self._trava = threading.Lock()
+    
+    def filter(self, registro: logging.LogRecord) -> bool:
+        if not getattr(registro, 'amostrar', False):
+            return True
+        
+        chave = (registro.name, registro.msg)
+        agora = time.monotonic()
+        with self._trava:
+            janela = self._janelas.get(chave)
+            if janela is None or agora - janela[0] >= self.intervalo_s:
+                suprimidas = int(janela[2]) if janela is not None else 0
+                self._janelas[chave] = [agora, 1, 0]
+                if suprimidas:
+                    registro.msg = f"{registro.msg} [{suprimidas} mensagens semelhantes suprimidas]"
+                return True
+            if janela[1] < self.limite:
+                janela[1] += 1
+                return True
+            janela[2] += 1
+            return False
+
+class _ManipuladorFila(logging.handlers.QueueHandler):
+    """QueueHandler que adia a formatação da mensagem para a thread de escrita."""
+    
+    def prepare(self, registro: logging.LogRecord) -> logging.LogRecord:
+        # O QueueHandler padrão formata aqui para que o registro possa ir por
+        # pickle a outro processo; a fila é do próprio processo, então basta
+        # enfileirar o registro e formatar na thread do QueueListener
+        return registro
+
+class _FiltroDestino(logging.Filter):
+    """Deixa passar só os registros dos loggers que gravam no arquivo do manipulador."""
+    
+    def __init__(self, caminho: str):
+        super().__init__()
+        self.caminho = caminho
+    
+    def filter(self, registro: logging.LogRecord) -> bool:
+        return Registrador._destinos.get(registro.name) == self.caminho
+
 class Registrador:
-    """Classe para configurar e gerenciar logging."""
+    """
+    Classe para configurar e gerenciar logging.
+    
+    Todos os loggers obtidos aqui enfileiram os registros em uma única fila
+    em memória (QueueHandler); uma thread de fundo (QueueListener) formata
+    e grava no console e no arquivo de log, compartilhados por todos os
+    módulos. Quem registra não espera pelo disco nem pela formatação.
+    """
     
     _registradores = {}
+    _destinos: Dict[str, str] = {}
+    _manipuladores_arquivo: Dict[str, logging.Handler] = {}
+    _manipulador_console: Optional[logging.Handler] = None
+    _filtro_amostragem: Optional[FiltroAmostragem] = None
+    _fila: Optional[queue.SimpleQueue] = None
+    _ouvinte: Optional[logging.handlers.QueueListener] = None
+    _trava = threading.RLock()
     
     @classmethod
     def obter_registrador(cls, nome: str, arquivo_log: Optional[str] = None) -> logging.Logger:
@@ -36,32 +124,88 @@ class Registrador:
         if registrador.handlers:
             return registrador
         
-        formatador = logging.Formatter(configuracoes.logs.formato)
-        
-        # Console handler
-        if configuracoes.logs.console_handler:
-            manipulador_console = logging.StreamHandler(sys.stdout)
-            manipulador_console.setLevel(logging.INFO)
-            manipulador_console.setFormatter(formatador)
-            registrador.addHandler(manipulador_console)
-        
-        # File handler
-        if configuracoes.logs.arquivo_handler:
-            caminho_arquivo_log = arquivo_log or configuracoes.logs.arquivo_log
+        with cls._trava:
+            if configuracoes.logs.arquivo_handler:
+                caminho_arquivo_log = arquivo_log or configuracoes.logs.arquivo_log
+                cls._destinos[nome] = caminho_arquivo_log
+                if caminho_arquivo_log not in cls._manipuladores_arquivo:
+                    cls._manipuladores_arquivo[caminho_arquivo_log] = cls._criar_manipulador_arquivo(
+                        caminho_arquivo_log
+                    )
+                    # O QueueListener tem a lista de manipuladores fixa: recriá-lo com o novo arquivo
+                    cls._parar_ouvinte()
+            cls._iniciar_ouvinte()
             
-            # Garantir que o diretório pai existe
-            if '/' in caminho_arquivo_log or '\\' in caminho_arquivo_log:
-                Path(caminho_arquivo_log).parent.mkdir(parents=True, exist_ok=True)
-            
-            manipulador_arquivo = logging.FileHandler(
-                caminho_arquivo_log, encoding='utf-8'
-            )
-            manipulador_arquivo.setLevel(logging.DEBUG)
-            manipulador_arquivo.setFormatter(formatador)
-            registrador.addHandler(manipulador_arquivo)
+            manipulador_fila = _ManipuladorFila(cls._fila)
+            manipulador_fila.addFilter(cls._filtro_amostragem)
+            registrador.addHandler(manipulador_fila)
         
         cls._registradores[nome] = registrador
         return registrador
+    
+    @classmethod
+    def encerrar(cls) -> None:
+        """Grava os registros ainda na fila e para a thread de escrita (chamado ao sair)."""
+        with cls._trava:
+            cls._parar_ouvinte()
+    
+    @staticmethod
+    def _criar_manipulador_arquivo(caminho_arquivo_log: str) -> logging.Handler:
+        """Cria o manipulador de um arquivo de log, compartilhado pelos loggers que gravam nele."""
+        # Garantir que o diretório pai existe
+        if '/' in caminho_arquivo_log or '\\' in caminho_arquivo_log:
+            Path(caminho_arquivo_log).parent.mkdir(parents=True, exist_ok=True)
+        
+        manipulador_arquivo = logging.FileHandler(caminho_arquivo_log, encoding='utf-8')
+        manipulador_arquivo.setLevel(logging.DEBUG)
+        manipulador_arquivo.setFormatter(logging.Formatter(configuracoes.logs.formato))
+        manipulador_arquivo.addFilter(_FiltroDestino(caminho_arquivo_log))
+        return manipulador_arquivo
+    
+    @classmethod
+    def _iniciar_ouvinte(cls) -> None:
+        """Cria a fila e inicia a thread de escrita, se ainda não estiverem ativas."""
+        if cls._ouvinte is not None:
+            return
+        
+        if cls._fila is None:
+            cls._fila = queue.SimpleQueue()
+            cls._filtro_amostragem = FiltroAmostragem(configuracoes.logs.limite_mensagens_amostradas,
+                                                      configuracoes.logs.intervalo_amostragem_s)
+            atexit.register(cls.encerrar)
+        
+        manipuladores = list(cls._manipuladores_arquivo.values())
+        if configuracoes.logs.console_handler:
+            if cls._manipulador_console is None:
+                cls._manipulador_console = logging.StreamHandler(sys.stdout)
+                cls._manipulador_console.setLevel(logging.INFO)
+                cls._manipulador_console.setFormatter(logging.Formatter(configuracoes.logs.formato))
+            manipuladores.append(cls._manipulador_console)
+        
+        cls._ouvinte = logging.handlers.QueueListener(cls._fila, *manipuladores, respect_handler_level=True)
+        cls._ouvinte.start()
+    
+    @classmethod
+    def _parar_ouvinte(cls) -> None:
+        """Para a thread de escrita depois de gravar o que já está na fila."""
+        if cls._ouvinte is not None:
+            cls._ouvinte.stop()
+            cls._ouvinte = None
+    
+    @classmethod
+    def _reiniciar_apos_fork(cls) -> None:
+        """No processo filho a thread de escrita não existe: descarta a herdada e inicia outra."""
+        cls._trava = threading.RLock()
+        if cls._fila is None:
+            return
+        # Registros herdados na fila já serão gravados pelo processo pai
+        while not cls._fila.empty():
+            cls._fila.get_nowait()
+        cls._ouvinte = None
+        cls._iniciar_ouvinte()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=Registrador._reiniciar_apos_fork)
 
 def obter_registrador(nome: str, arquivo_log: Optional[str] = None) -> logging.Logger:
     """
@@ -74,4 +218,4 @@ def obter_registrador(nome: str, arquivo_log: Optional[str] = None) -> logging.L
     Returns:
         Logger configurado
     """
-    return Registrador.obter_registrador(nome, arquivo_log)
\ No newline at end of file
+    return Registrador.obter_registrador(nome, arquivo_log)
@@ -0,0 +1,84 @@
+﻿"""
+Utilitários para aplicar regras escalares sobre colunas inteiras.
+"""
+
+from typing import Any, Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+def aplicar_por_valor_unico(serie: pd.Series, funcao: Callable[[Any], Any],
+                            tipo: Any = object) -> np.ndarray:
+    """
+    Aplica uma função escalar uma única vez por valor distinto da série.
+    
+    As colunas da planilha do AcadWeb têm poucos valores distintos, então
+    avaliar a função apenas nos valores únicos e espalhar o resultado pelos
+    códigos de fatoração produz exatamente o mesmo resultado da versão
+    linha a linha, com custo proporcional à cardinalidade da coluna.
+    
+    Args:
+        serie: Série com os valores de entrada
+        funcao: Função escalar a ser aplicada
+        tipo: dtype do array de saída
+        
+    Returns:
+        Array com o resultado da função para cada linha da série
+    """
+    if len(serie) == 0:
+        return np.empty(0, dtype=tipo)
+    
+    valores = serie.to_numpy()
+    codigos, _ = pd.factorize(serie, use_na_sentinel=False)
+    
+    # Em colunas object, 1, 1.0 e True são iguais para o hash mas não para str();
+    # separar os valores também pelo tipo mantém o resultado idêntico ao escalar
+    if valores.dtype == object:
+        codigos_tipo, tipos = pd.factorize(serie.map(type))
+        if len(tipos) > 1:
+            codigos, _ = pd.factorize(codigos * len(tipos) + codigos_tipo)
+    
+    _, primeiras_posicoes = np.unique(codigos, return_index=True)
+    resultados = np.array([funcao(valores[posicao]) for posicao in primeiras_posicoes], dtype=tipo)
+    return resultados[codigos]
+
+def obter_coluna(df: pd.DataFrame, coluna: str, valor_padrao: Any) -> pd.Series:
+    """
+    Retorna a coluna do DataFrame ou uma série constante com o valor padrão.
+    
+    Equivale ao ``dados_aluno.get(coluna, valor_padrao)`` do caminho escalar.
+    
+    Args:
+        df: DataFrame com os dados
+        coluna: Nome da coluna
+        valor_padrao: Valor usado quando a coluna não existe
+        
+    Returns:
+        Série alinhada ao índice do DataFrame
+    """
+    if coluna in df.columns:
+        return df[coluna]
+    return pd.Series([valor_padrao] * len(df), index=df.index, dtype=object)
+
+def agrupar_linhas_identicas(matriz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Agrupa as linhas byte a byte idênticas de uma matriz numérica.
+    
+    Cada linha é vista como um único valor binário, então a comparação é
+    exata (NaN agrupa com NaN) e feita com uma só ordenação.
+    
+    Args:
+        matriz: Matriz 2D (n_linhas, n_colunas)
+        
+    Returns:
+        Tuple com (posição da primeira ocorrência de cada linha distinta,
+        índice da linha distinta de cada linha), de modo que
+        ``matriz[primeiras][inverso]`` reconstrói a matriz
+    """
+    matriz = np.ascontiguousarray(matriz)
+    if matriz.ndim != 2 or matriz.shape[1] == 0 or len(matriz) == 0:
+        return np.arange(len(matriz)), np.arange(len(matriz))
+    
+    linhas = matriz.view(np.dtype((np.void, matriz.dtype.itemsize * matriz.shape[1]))).ravel()
+    _, primeiras, inverso = np.unique(linhas, return_index=True, return_inverse=True)
+    return primeiras, inverso.ravel()
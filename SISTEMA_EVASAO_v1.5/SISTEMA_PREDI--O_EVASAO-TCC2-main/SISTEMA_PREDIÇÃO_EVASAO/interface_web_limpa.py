@@ -27,10 +27,24 @@ except ImportError:
     POWERBI_DISPONIVEL = False
     print("⚠️ Automação Power BI não disponível")
 
-from codigo_fonte.nucleo.preditor import SistemaPredicaoEvasao
+from codigo_fonte.nucleo.registro import obter_sistema_predicao
 from codigo_fonte.utilitarios.carregador_dados import CarregadorDados
 from codigo_fonte.utilitarios.registrador import Registrador
 
+# Colunas exibidas na interface e enviadas ao Power BI (exportação -> rótulo)
+COLUNAS_RESULTADO_WEB = {
+    'Matricula': 'Matrícula',
+    'Nome': 'Nome',
+    'Situacao_Atual_Sistema': 'Situação Atual',
+    'Curso': 'Curso',
+    'Status_Predicao': 'Status Predição',
+    'Situacao_Predita': 'Situação Predita',
+    'Probabilidade_Evasao_Total': 'Probabilidade Evasão',
+    'Nivel_Urgencia': 'Nível Urgência',
+    'Fator_Principal': 'Fator Principal',
+    'Confianca_Predicao': 'Confiança'
+}
+
 def main():
     # Configurar a página
     st.set_page_config(
@@ -336,44 +350,27 @@ def processar_arquivo(uploaded_file, incluir_shap, incluir_regras, formato_saida
             st.error("❌ Falha ao carregar dados")
             return
         
-        # Salvar temporariamente para o sistema processar
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            df.to_excel(tmp_file.name, index=False)
-            tmp_path = Path(tmp_file.name)
-        
         # Etapa 2: Inicializar sistema
         status_text.text("🤖 Inicializando sistema de predição...")
         progress_bar.progress(40)
         
-        sistema = SistemaPredicaoEvasao()
-        sistema.inicializar()
+        # Sistema aquecido do processo: recarrega só se os artefatos mudarem
+        sistema = obter_sistema_predicao()
         
         # Etapa 3: Processar predições
         status_text.text("⚡ Processando predições...")
         progress_bar.progress(60)
         
-        predicoes, estatisticas = sistema.predizer_alunos(tmp_path)
-        
-        # Converter predições para DataFrame
-        resultados = pd.DataFrame([
-            {
-                'Matrícula': p.matricula,
-                'Nome': p.nome,
-                'Situação Atual': p.situacao_atual,
-                'Curso': p.curso,
-                'Status Predição': p.status_predicao,
-                'Situação Predita': p.situacao_predita,
-                'Probabilidade Evasão': p.probabilidade_evasao_total,
-                'Nível Urgência': p.nivel_urgencia,
-                'Fator Principal': p.fator_principal,
-                'Confiança': p.confianca_predicao
-            }
-            for p in predicoes
-        ])
-        
-        # Limpeza
-        os.unlink(tmp_path)
+        # O DataFrame já carregado vai direto ao sistema, sem arquivo temporário;
+        # sem SHAP marcado, o explicador não é executado
+        predicoes, estatisticas = sistema.predizer_alunos(
+            df, modo_explicacao=None if incluir_shap else 'desativado'
+        )
+        
+        # Converter predições para DataFrame (formatação feita em lote)
+        resultados = predicoes.para_dataframe_exportacao(
+            list(COLUNAS_RESULTADO_WEB.keys())
+        ).rename(columns=COLUNAS_RESULTADO_WEB)
         
         # Etapa 4: Aplicar regras adicionais se solicitado
         if incluir_regras:
@@ -0,0 +1,107 @@
+﻿#!/usr/bin/env python3
+"""
+Monitor da pasta input: processa cada planilha assim que ela termina de chegar.
+
+Mantém o sistema de predição carregado e observa a pasta (inotify no Linux,
+varredura periódica nos demais sistemas). Cada arquivo estável é processado
+como em processar_producao.py: CSV com data e hora em output/ e planilha
+movida para input/processados. A fila fica em input/.fila_monitor.sqlite3 e
+sobrevive a reinícios; um conteúdo processado com sucesso nunca é
+processado duas vezes. Uma planilha que falhou é tentada de novo quando o
+monitor reinicia ou ela é copiada outra vez, até --tentativas falhas.
+
+Uso:
+    python monitorar_entrada.py
+    python monitorar_entrada.py --trabalhadores 4 --estabilidade 5
+    python monitorar_entrada.py --sem-inotify       # Apenas varredura periódica
+"""
+
+import sys
+import signal
+import argparse
+from functools import partial
+from pathlib import Path
+
+from codigo_fonte.utilitarios import obter_registrador, MonitorPasta
+from codigo_fonte.configuracao import configuracoes
+from codigo_fonte.nucleo import obter_sistema_predicao
+from processar_producao import processar_arquivo
+
+def configurar_argumentos() -> argparse.ArgumentParser:
+    """
+    Configura os argumentos da linha de comando.
+    
+    Returns:
+        Parser configurado
+    """
+    padrao = configuracoes.monitor
+    parser = argparse.ArgumentParser(description='Monitor da pasta de entrada do sistema de predição')
+    
+    parser.add_argument('--entrada', default=str(padrao.diretorio_entrada),
+                        help=f'Pasta monitorada (padrão: {padrao.diretorio_entrada})')
+    parser.add_argument('--saida', default=str(padrao.diretorio_saida),
+                        help=f'Pasta dos CSVs gerados (padrão: {padrao.diretorio_saida})')
+    parser.add_argument('--trabalhadores', type=int, default=padrao.trabalhadores,
+                        help=f'Arquivos processados ao mesmo tempo (padrão: {padrao.trabalhadores})')
+    parser.add_argument('--estabilidade', type=float, default=padrao.tempo_estabilidade_s,
+                        help=f'Segundos sem mudança antes de processar (padrão: {padrao.tempo_estabilidade_s})')
+    parser.add_argument('--intervalo', type=float, default=padrao.intervalo_varredura_s,
+                        help=f'Segundos entre varreduras da pasta (padrão: {padrao.intervalo_varredura_s})')
+    parser.add_argument('--tentativas', type=int, default=padrao.maximo_tentativas,
+                        help=f'Falhas de uma planilha antes de desistir dela (padrão: {padrao.maximo_tentativas})')
+    parser.add_argument('--sem-inotify', action='store_true',
+                        help='Usa apenas a varredura periódica')
+    
+    return parser
+
+def principal() -> int:
+    """
+    Carrega o sistema e monitora a pasta até ser interrompido.
+    
+    Returns:
+        Código de saída (0 = sucesso, 1 = erro)
+    """
+    registrador = obter_registrador(__name__)
+    args = configurar_argumentos().parse_args()
+    padrao = configuracoes.monitor
+    
+    try:
+        print("Carregando modelo e grade curricular...")
+        obter_sistema_predicao()
+    except Exception as e:
+        registrador.error(f"Erro ao iniciar o monitor: {e}", exc_info=True)
+        print(f"Erro ao iniciar o monitor: {e}")
+        return 1
+    
+    diretorio_entrada = Path(args.entrada)
+    diretorio_saida = Path(args.saida)
+    diretorio_processados = diretorio_entrada / "processados"
+    for diretorio in (diretorio_entrada, diretorio_saida, diretorio_processados):
+        diretorio.mkdir(parents=True, exist_ok=True)
+    
+    monitor = MonitorPasta(
+        diretorio_entrada,
+        partial(processar_arquivo, output_dir=diretorio_saida, processed_dir=diretorio_processados),
+        padroes=padrao.padroes_arquivos,
+        tempo_estabilidade_s=args.estabilidade,
+        intervalo_varredura_s=args.intervalo,
+        trabalhadores=args.trabalhadores,
+        arquivo_fila=padrao.arquivo_fila,
+        usar_inotify=not args.sem_inotify,
+        maximo_tentativas=args.tentativas
+    )
+    
+    def encerrar(numero_sinal, quadro):
+        print("\nEncerrando monitor (aguardando arquivos em processamento)...")
+        monitor.parar()
+    
+    signal.signal(signal.SIGINT, encerrar)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, encerrar)
+    
+    print(f"Monitorando {diretorio_entrada.resolve()} (Ctrl+C para encerrar)")
+    monitor.executar()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(principal())
@@ -11,6 +11,7 @@ Uso:
     python principal.py                    # Usar arquivo padrão
     python principal.py arquivo.xlsx      # Especificar arquivo
     python principal.py --verbose         # Modo detalhado
+    python principal.py --perfil          # Perfil de CPU (e memória com --perfil-memoria)
     python principal.py --ajuda          # Mostrar ajuda
 
 Exemplo:
@@ -19,13 +20,13 @@ Exemplo:
 
 import sys
 import argparse
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List
-import csv
+from typing import Optional
 
-from codigo_fonte.utilitarios import obter_registrador
+from codigo_fonte.utilitarios import obter_registrador, Instrumentacao, ativar_instrumentacao, PerfilExecucao
 from codigo_fonte.configuracao import configuracoes
-from codigo_fonte.nucleo import SistemaPredicaoEvasao, PredicaoAluno
+from codigo_fonte.nucleo import obter_sistema_predicao, ResultadoPredicoes, COLUNAS_EXPORTACAO
 
 def configurar_argumentos() -> argparse.ArgumentParser:
     """
@@ -37,6 +38,7 @@ def configurar_argumentos() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description='Sistema de Predição de Evasão Estudantil',
         formatter_class=argparse.RawDescriptionHelpFormatter,
+        add_help=False,
         epilog="""
 Exemplos:
   python principal.py                              # Arquivo padrão
@@ -46,6 +48,12 @@ Exemplos:
         """
     )
     
+    parser.add_argument(
+        '--ajuda', '--help', '-h',
+        action='help',
+        help='Mostra esta mensagem de ajuda e sai'
+    )
+    
     parser.add_argument(
         'arquivo_alunos',
         nargs='?',
@@ -58,55 +66,103 @@ Exemplos:
         help='Modo verboso para debugging'
     )
     
+    parser.add_argument(
+        '--atualizar-cache',
+        action='store_true',
+        help='Relê a planilha mesmo que ela já esteja no cache (data/processed/cache_entradas)'
+    )
+    
+    parser.add_argument(
+        '--blocos',
+        type=int,
+        metavar='N',
+        help='Processa o arquivo (Excel ou CSV) em blocos de N linhas, gravando cada bloco '
+             'no CSV de saída (memória constante para arquivos muito grandes)'
+    )
+    
+    parser.add_argument(
+        '--regras-primeiro',
+        action='store_true',
+        help='Aplica as regras antes do modelo; ML e SHAP só para alunos que nenhuma regra decide'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Reaproveita a predição anterior dos alunos sem alteração; só novos e alterados '
+             'passam por regras, modelo e SHAP (data/processed/estado_execucao)'
+    )
+    
+    parser.add_argument(
+        '--historico',
+        action='store_true',
+        help='Registra a execução no histórico de predições (data/processed/historico_predicoes.sqlite3)'
+    )
+    
+    parser.add_argument(
+        '--metricas',
+        action='store_true',
+        help='Mede cada etapa (tempo, CPU, linhas, pico de memória) e grava as métricas em JSON '
+             'e no formato do Prometheus ao lado do CSV de saída'
+    )
+    
+    parser.add_argument(
+        '--perfil',
+        action='store_true',
+        help='Executa sob cProfile e grava em output/ o .pstats, as pilhas recolhidas '
+             '(.collapsed, para flamegraph) e a tabela de pontos quentes (.txt)'
+    )
+    
+    parser.add_argument(
+        '--perfil-memoria',
+        action='store_true',
+        help='Com --perfil, liga também o tracemalloc e registra a memória ao fim de cada etapa'
+    )
+    
+    parser.add_argument(
+        '--perfil-top',
+        type=int,
+        default=30,
+        metavar='N',
+        help='Funções listadas na tabela de pontos quentes do --perfil (padrão: 30)'
+    )
+    
     return parser
 
-def salvar_predicoes_em_csv(predicoes: List[PredicaoAluno], arquivo_saida: Path) -> None:
+def salvar_predicoes_em_csv(predicoes: ResultadoPredicoes, arquivo_saida: Path) -> None:
     """
     Salva as predições em arquivo CSV.
     
     Args:
-        predicoes: Lista de predições dos alunos
+        predicoes: Resultado colunar das predições dos alunos
         arquivo_saida: Caminho do arquivo de saída
     """
-    with open(arquivo_saida, 'w', newline='', encoding='utf-8') as csvfile:
-        # Definir cabeçalhos
-        cabecalhos = [
-            'Nome', 'Matricula', 'Situacao_Atual_Sistema', 'Curso', 'Sexo', 'Turma',
-            'Status_Predicao', 'Situacao_Predita', 'Probabilidade_Situacao',
-            'Probabilidade_Evasao_Total', 'Nivel_Urgencia', 'Fator_Principal',
-            'Valor_Importancia', 'Confianca_Predicao', 'Fonte_Predicao',
-            'Predicao_ML_Original', 'Prob_ML_Original',
-            'Top_1_Situacao_ML', 'Top_1_Probabilidade_ML',
-            'Top_2_Situacao_ML', 'Top_2_Probabilidade_ML',
-            'Top_3_Situacao_ML', 'Top_3_Probabilidade_ML'
-        ]
-        
-        escritor = csv.writer(csvfile)
-        escritor.writerow(cabecalhos)
-        
-        # Escrever dados
-        for predicao in predicoes:
-            linha = [
-                predicao.nome, predicao.matricula, predicao.situacao_atual,
-                predicao.curso, predicao.sexo, predicao.turma,
-                predicao.status_predicao, predicao.situacao_predita,
-                predicao.probabilidade_situacao, predicao.probabilidade_evasao_total,
-                predicao.nivel_urgencia, predicao.fator_principal,
-                predicao.valor_importancia, predicao.confianca_predicao,
-                predicao.fonte_predicao, predicao.predicao_ml_original,
-                predicao.prob_ml_original, predicao.top_1_situacao_ml,
-                predicao.top_1_probabilidade_ml, predicao.top_2_situacao_ml,
-                predicao.top_2_probabilidade_ml, predicao.top_3_situacao_ml,
-                predicao.top_3_probabilidade_ml
-            ]
-            escritor.writerow(linha)
+    # Percentuais e nomes de classes são formatados apenas aqui, na exportação
+    predicoes.salvar_csv(arquivo_saida, colunas=COLUNAS_EXPORTACAO)
+
+def salvar_metricas(instrumentacao: Instrumentacao, arquivo_saida: Path) -> dict:
+    """
+    Grava as métricas das etapas ao lado do CSV de saída.
+    
+    Args:
+        instrumentacao: Coletor usado na execução
+        arquivo_saida: CSV de saída (ex.: analise_completa.csv gera
+            analise_completa.metrics.json e analise_completa.metrics.prom)
+            
+    Returns:
+        Métricas no formato de Instrumentacao.para_dicionario
+    """
+    instrumentacao.salvar_json(arquivo_saida.with_suffix('.metrics.json'))
+    instrumentacao.salvar_prometheus(arquivo_saida.with_suffix('.metrics.prom'))
+    return instrumentacao.para_dicionario()
 
-def imprimir_relatorio_resumo(predicoes: List[PredicaoAluno], estatisticas: dict) -> None:
+def imprimir_relatorio_resumo(predicoes: Optional[ResultadoPredicoes], estatisticas: dict) -> None:
     """
     Imprime relatório resumo dos resultados.
     
     Args:
-        predicoes: Lista de predições
+        predicoes: Resultado colunar das predições; None no processamento em
+            blocos, quando só as estatísticas acumuladas são impressas
         estatisticas: Estatísticas compiladas
     """
     print("=" * 80)
@@ -117,29 +173,30 @@ def imprimir_relatorio_resumo(predicoes: List[PredicaoAluno], estatisticas: dict
     print(f"Total de alunos analisados: {estatisticas['total_students']}")
     print(f"Matriculados: {estatisticas['enrolled_students']} ({estatisticas['enrolled_percentage']:.1f}%)")
     print(f"Em risco de evasão: {estatisticas['dropout_risk_students']} ({estatisticas['dropout_risk_percentage']:.1f}%)")
+    if estatisticas.get('reused_students'):
+        print(f"Reaproveitados da execução anterior: {estatisticas['reused_students']}")
     
-    # Distribuição por urgência
-    alunos_risco = [p for p in predicoes if p.status_predicao == 'RISCO_EVASAO']
-    if alunos_risco:
-        niveis_urgencia = {}
-        for aluno in alunos_risco:
-            nivel = aluno.nivel_urgencia
-            niveis_urgencia[nivel] = niveis_urgencia.get(nivel, 0) + 1
-        
-        print(f"\nDISTRIBUIÇÃO POR URGÊNCIA:")
-        total_risco = len(alunos_risco)
-        for nivel, quantidade in niveis_urgencia.items():
-            percentual = (quantidade / total_risco) * 100
-            print(f"  {nivel}: {quantidade} alunos ({percentual:.1f}%)")
-    
-    # Casos urgentes
-    casos_urgentes = [p for p in alunos_risco if p.nivel_urgencia == 'URGENTE']
-    if casos_urgentes:
-        print(f"\nALUNOS QUE PRECISAM DE AÇÃO IMEDIATA ({len(casos_urgentes)} alunos):")
-        for i, aluno in enumerate(casos_urgentes[:5]):  # Mostrar apenas os primeiros 5
-            print(f"  • {aluno.nome} (Matrícula: {aluno.matricula})")
-            print(f"    Situação: {aluno.situacao_predita} - Prob: {aluno.probabilidade_situacao}")
-            print(f"    Fonte: {aluno.fonte_predicao}")
+    # No processamento em blocos só há as estatísticas acumuladas
+    if predicoes is not None:
+        # Distribuição por urgência
+        alunos_risco = predicoes.dados[predicoes.dados['status_predicao'] == 'RISCO_EVASAO']
+        if len(alunos_risco) > 0:
+            niveis_urgencia = alunos_risco['nivel_urgencia'].value_counts(sort=False)
+            
+            print(f"\nDISTRIBUIÇÃO POR URGÊNCIA:")
+            total_risco = len(alunos_risco)
+            for nivel, quantidade in niveis_urgencia.items():
+                percentual = (quantidade / total_risco) * 100
+                print(f"  {nivel}: {quantidade} alunos ({percentual:.1f}%)")
+        
+        # Casos urgentes
+        casos_urgentes = alunos_risco[alunos_risco['nivel_urgencia'] == 'URGENTE']
+        if len(casos_urgentes) > 0:
+            print(f"\nALUNOS QUE PRECISAM DE AÇÃO IMEDIATA ({len(casos_urgentes)} alunos):")
+            for aluno in casos_urgentes.head(5).itertuples():  # Mostrar apenas os primeiros 5
+                print(f"  • {aluno.nome} (Matrícula: {aluno.matricula})")
+                print(f"    Situação: {aluno.situacao_predita} - Prob: {aluno.probabilidade_situacao*100:.1f}%")
+                print(f"    Fonte: {aluno.fonte_predicao}")
     
     # Resumo das regras aplicadas
     resumo_regras = estatisticas.get('rules_summary', {})
@@ -152,6 +209,15 @@ def imprimir_relatorio_resumo(predicoes: List[PredicaoAluno], estatisticas: dict
         print(f"  LAC (Limpeza Acadêmica): {resumo_regras.get('LAC_por_regra', 0)} alunos")
         print(f"  NF (Não Formados): {resumo_regras.get('NF_por_regra', 0)} alunos")
         print(f"  MT (Matriculados): {resumo_regras.get('MT_por_regra', 0)} alunos")
+    
+    # Métricas das etapas (--metricas)
+    metricas = estatisticas.get('metrics')
+    if metricas:
+        print(f"\nDESEMPENHO POR ETAPA:")
+        for etapa, valores in metricas['stages'].items():
+            print(f"  {etapa}: {valores['wall_seconds']:.3f}s (CPU {valores['cpu_seconds']:.3f}s), "
+                  f"{valores['rows']} linhas, pico {valores['peak_rss_mb']:.0f} MB")
+        print(f"  Total: {metricas['total']['wall_seconds']:.3f}s")
 
 def principal() -> int:
     """
@@ -180,6 +246,9 @@ def principal() -> int:
             print(f"Erro: Arquivo não encontrado: {arquivo_alunos}")
             return 1
         
+        # Diretórios de dados e saída são criados só na execução, não ao importar configurações
+        configuracoes.dados.criar_diretorios()
+        
         # Determinar arquivo de saída
         arquivo_saida = configuracoes.dados.diretorio_saida / "analise_completa.csv"
         
@@ -192,24 +261,50 @@ def principal() -> int:
         registrador.info("Inicializando sistema de predição de evasão...")
         print("Inicializando sistema de predição de evasão...")
         
-        sistema = SistemaPredicaoEvasao()
-        sistema.inicializar()
+        sistema = obter_sistema_predicao()
         
         # Fazer predições
         registrador.info(f"Processando arquivo: {arquivo_alunos}")
         print(f"Processando arquivo: {arquivo_alunos}")
         
-        predicoes, estatisticas = sistema.predizer_alunos(arquivo_alunos)
-        
-        # Salvar resultados
+        modo_inferencia = 'regras_primeiro' if args.regras_primeiro else None
         arquivo_saida.parent.mkdir(parents=True, exist_ok=True)
-        salvar_predicoes_em_csv(predicoes, arquivo_saida)
+        # O coletor cobre também a exportação, que acontece fora de predizer_alunos
+        instrumentacao = Instrumentacao() if args.metricas or configuracoes.logs.instrumentacao else None
+        perfil = None
+        if args.perfil:
+            perfil = PerfilExecucao(configuracoes.dados.diretorio_saida, memoria=args.perfil_memoria,
+                                    top_n=args.perfil_top)
+        with ativar_instrumentacao(instrumentacao), perfil or nullcontext():
+            if args.blocos:
+                # Cada bloco é gravado assim que processado; não há resultado completo em memória
+                predicoes = None
+                estatisticas = sistema.predizer_alunos_em_blocos(
+                    arquivo_alunos, arquivo_saida, tamanho_bloco=args.blocos,
+                    modo_inferencia=modo_inferencia, colunas=COLUNAS_EXPORTACAO,
+                    incremental=args.incremental or None, historico=args.historico or None
+                )
+            else:
+                predicoes, estatisticas = sistema.predizer_alunos(
+                    arquivo_alunos, atualizar_cache=args.atualizar_cache, modo_inferencia=modo_inferencia,
+                    incremental=args.incremental or None, historico=args.historico or None
+                )
+                
+                # Salvar resultados
+                salvar_predicoes_em_csv(predicoes, arquivo_saida)
+        
+        if instrumentacao is not None:
+            estatisticas['metrics'] = salvar_metricas(instrumentacao, arquivo_saida)
         
         # Imprimir relatório
         imprimir_relatorio_resumo(predicoes, estatisticas)
         
         print(f"\nAnálise concluída com sucesso!")
         print(f"Arquivo de saída: {arquivo_saida}")
+        if instrumentacao is not None:
+            print(f"Métricas: {arquivo_saida.with_suffix('.metrics.json')}")
+        if perfil is not None and perfil.arquivos:
+            print(f"Perfil: {perfil.arquivos['resumo']} (.pstats, .collapsed)")
         print(f"Sistema híbrido: ML + Regras de Negócio aplicadas")
         
         registrador.info(f"Predições salvas em: {arquivo_saida}")
@@ -2,34 +2,230 @@
 # -*- coding: utf-8 -*-
 """
 Script de produção para processar automaticamente arquivos na pasta input
+
+Todos os arquivos .xlsx pendentes são processados em paralelo, um por
+processo. O modelo é carregado uma única vez antes do fork e compartilhado
+pelos processos (no Windows, uma vez por processo). Cada arquivo gera seu próprio CSV com data e hora em output/ e é
+movido para input/processados. Ao final é impresso um resumo consolidado.
+
+Uso:
+    python processar_producao.py                 # Um processo por núcleo
+    python processar_producao.py --processos 1   # Sequencial
+    python processar_producao.py --perfil        # Perfil cProfile de cada arquivo em output/
 """
 import sys
 import os
-import glob
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 # Adicionar o caminho do projeto
 sys.path.insert(0, os.getcwd())
 
-from codigo_fonte.nucleo import SistemaPredicaoEvasao
+from codigo_fonte.nucleo import obter_sistema_predicao, COLUNAS_EXPORTACAO
 from codigo_fonte.configuracao import configuracoes
-from codigo_fonte.utilitarios import registrador
+from codigo_fonte.utilitarios import obter_registrador, PerfilExecucao
+
+registrador = obter_registrador(__name__)
+
+def configurar_argumentos() -> argparse.ArgumentParser:
+    """
+    Configura os argumentos da linha de comando.
+    
+    Returns:
+        Parser configurado
+    """
+    parser = argparse.ArgumentParser(description='Processa todos os arquivos Excel da pasta input')
+    
+    parser.add_argument(
+        '--processos',
+        type=int,
+        help='Quantidade de processos em paralelo (padrão: um por núcleo, limitado ao número de arquivos)'
+    )
+    
+    parser.add_argument(
+        '--perfil',
+        action='store_true',
+        help='Executa cada arquivo sob cProfile e grava em output/ o .pstats, as pilhas '
+             'recolhidas (.collapsed, para flamegraph) e a tabela de pontos quentes (.txt)'
+    )
+    
+    parser.add_argument(
+        '--perfil-memoria',
+        action='store_true',
+        help='Com --perfil, liga também o tracemalloc e registra a memória ao fim de cada etapa'
+    )
+    
+    return parser
+
+def _inicializar_trabalhador(threads_modelo: int) -> None:
+    """Obtém o sistema no processo de trabalho e limita as threads do XGBoost."""
+    sistema = obter_sistema_predicao()
+    # Sem limite cada processo usaria todos os núcleos e eles disputariam a CPU
+    if hasattr(sistema.preditor_ml.modelo, 'set_params'):
+        sistema.preditor_ml.modelo.set_params(n_jobs=threads_modelo)
+
+def processar_arquivo(arquivo_entrada: Path, output_dir: Path, processed_dir: Path,
+                      perfil: bool = False, perfil_memoria: bool = False) -> Dict[str, Any]:
+    """
+    Processa um arquivo de alunos: predições, CSV de saída e arquivamento da entrada.
+    
+    Args:
+        arquivo_entrada: Planilha de alunos
+        output_dir: Diretório dos CSVs gerados
+        processed_dir: Diretório para onde a planilha é movida após o processamento
+        perfil: Executa predição e exportação sob cProfile (ver PerfilExecucao)
+        perfil_memoria: Com perfil, registra também a memória de cada etapa
+        
+    Returns:
+        Resumo do arquivo (contadores, arquivos gerados e eventual erro)
+    """
+    resumo = {'arquivo': arquivo_entrada.name, 'erro': None}
+    try:
+        sistema = obter_sistema_predicao()
+        
+        # O nome do arquivo de entrada evita colisão entre processos no mesmo segundo
+        perfil_arquivo = None
+        if perfil:
+            perfil_arquivo = PerfilExecucao(
+                output_dir, nome=f"perfil_{arquivo_entrada.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                memoria=perfil_memoria
+            )
+        
+        with perfil_arquivo or nullcontext():
+            predicoes, estatisticas = sistema.predizer_alunos(arquivo_entrada)
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            arquivo_saida = output_dir / f"predicao_evasao_{arquivo_entrada.stem}_{timestamp}.csv"
+            predicoes.salvar_csv(
+                arquivo_saida,
+                colunas=COLUNAS_EXPORTACAO[:15],
+                colunas_extras={'Data_Processamento': datetime.now().strftime("%Y-%m-%d %H:%M:%S")},
+                encoding='utf-8-sig'
+            )
+        if perfil_arquivo is not None and perfil_arquivo.arquivos:
+            resumo['arquivo_perfil'] = str(perfil_arquivo.arquivos['resumo'])
+        
+        # Mover arquivo processado para subpasta
+        novo_nome = processed_dir / f"{arquivo_entrada.stem}_processado_{timestamp}{arquivo_entrada.suffix}"
+        arquivo_entrada.rename(novo_nome)
+        
+        resumo.update({
+            'total_alunos': len(predicoes),
+            'matriculados': predicoes.contar('status_predicao', 'MATRICULADO'),
+            'em_risco': predicoes.contar('status_predicao', 'RISCO_EVASAO'),
+            'urgentes': predicoes.contar('nivel_urgencia', 'URGENTE'),
+            'rules_summary': estatisticas['rules_summary'],
+            'arquivo_saida': str(arquivo_saida),
+            'arquivo_movido': str(novo_nome)
+        })
+    except Exception as e:
+        registrador.error(f"Erro ao processar {arquivo_entrada.name}: {e}", exc_info=True)
+        resumo['erro'] = str(e)
+    
+    return resumo
 
-def processar_arquivo_automatico():
-    """Processa automaticamente arquivos da pasta input"""
+def processar_arquivos(arquivos: List[Path], output_dir: Path, processed_dir: Path,
+                       processos: Optional[int] = None, perfil: bool = False,
+                       perfil_memoria: bool = False) -> List[Dict[str, Any]]:
+    """
+    Processa vários arquivos, em paralelo quando houver mais de um processo.
+    
+    Cada arquivo é independente, então o resultado é o mesmo do
+    processamento sequencial.
+    
+    Args:
+        arquivos: Planilhas de alunos
+        output_dir: Diretório dos CSVs gerados
+        processed_dir: Diretório para onde as planilhas são movidas
+        processos: Quantidade de processos (padrão: núcleos disponíveis)
+        perfil: Como em processar_arquivo; cada processo perfila os próprios arquivos
+        perfil_memoria: Como em processar_arquivo
+        
+    Returns:
+        Resumo de cada arquivo, na ordem de entrada
+    """
+    nucleos = os.cpu_count() or 1
+    processos = max(1, min(processos or nucleos, len(arquivos)))
+    
+    if processos == 1:
+        return [processar_arquivo(arquivo, output_dir, processed_dir, perfil, perfil_memoria)
+                for arquivo in arquivos]
+    
+    registrador.info(f"Processando {len(arquivos)} arquivos em {processos} processos")
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Carregado antes do fork, o sistema é herdado pelos processos (copy-on-write)
+        contexto = multiprocessing.get_context('fork')
+        obter_sistema_predicao()
+    else:
+        # spawn (Windows): cada processo carrega o modelo uma vez no inicializador
+        contexto = multiprocessing.get_context()
+    
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto, initializer=_inicializar_trabalhador,
+                             initargs=(max(1, nucleos // processos),)) as executor:
+        return list(executor.map(
+            processar_arquivo, arquivos, [output_dir] * len(arquivos), [processed_dir] * len(arquivos),
+            [perfil] * len(arquivos), [perfil_memoria] * len(arquivos)
+        ))
+
+def imprimir_resumo_consolidado(resumos: List[Dict[str, Any]], duracao: float) -> None:
+    """
+    Imprime o resumo de cada arquivo e o total do lote.
+    
+    Args:
+        resumos: Resumos devolvidos por processar_arquivo
+        duracao: Tempo total do lote em segundos
+    """
+    sucesso = [resumo for resumo in resumos if resumo['erro'] is None]
+    
+    print("\n" + "="*50)
+    print("📊 RESUMO DOS RESULTADOS:")
+    print("="*50)
+    for resumo in resumos:
+        if resumo['erro'] is not None:
+            print(f"❌ {resumo['arquivo']}: {resumo['erro']}")
+            continue
+        print(f"📁 {resumo['arquivo']}: {resumo['total_alunos']} alunos, "
+              f"{resumo['em_risco']} em risco, {resumo['urgentes']} urgentes")
+        print(f"   💾 {resumo['arquivo_saida']}")
+        if resumo.get('arquivo_perfil'):
+            print(f"   🔬 {resumo['arquivo_perfil']}")
+    
+    total_alunos = sum(resumo['total_alunos'] for resumo in sucesso)
+    if total_alunos:
+        matriculados = sum(resumo['matriculados'] for resumo in sucesso)
+        em_risco = sum(resumo['em_risco'] for resumo in sucesso)
+        urgentes = sum(resumo['urgentes'] for resumo in sucesso)
+        print("-"*50)
+        print(f"📁 Arquivos processados: {len(sucesso)} de {len(resumos)}")
+        print(f"👥 Total de alunos: {total_alunos}")
+        print(f"✅ Matriculados: {matriculados} ({(matriculados/total_alunos)*100:.1f}%)")
+        print(f"⚠️  Em risco: {em_risco} ({(em_risco/total_alunos)*100:.1f}%)")
+        print(f"🚨 Casos urgentes: {urgentes}")
+    print(f"⏱️  Tempo total: {duracao:.1f}s")
+    print("="*50)
+
+def processar_arquivo_automatico(processos: Optional[int] = None, perfil: bool = False,
+                                 perfil_memoria: bool = False):
+    """Processa automaticamente todos os arquivos da pasta input"""
     
     # Criar diretórios se não existirem
     input_dir = Path("input")
     output_dir = Path("output")
+    processed_dir = input_dir / "processados"
     input_dir.mkdir(exist_ok=True)
     output_dir.mkdir(exist_ok=True)
+    processed_dir.mkdir(exist_ok=True)
     
     try:
         print("🔍 Procurando arquivos Excel na pasta 'input'...")
         
         # Buscar arquivos Excel
-        arquivos_excel = list(input_dir.glob("*.xlsx"))
+        arquivos_excel = sorted(input_dir.glob("*.xlsx"))
         
         if not arquivos_excel:
             print("❌ Nenhum arquivo Excel encontrado na pasta 'input'")
@@ -38,79 +234,15 @@ def processar_arquivo_automatico():
             print("2. Execute este script novamente")
             return False
         
-        # Processar o primeiro arquivo encontrado
-        arquivo_entrada = arquivos_excel[0]
-        print(f"📁 Processando: {arquivo_entrada.name}")
-        
-        # Inicializar sistema
-        print("🤖 Inicializando sistema de predição...")
-        sistema = SistemaPredicaoEvasao()
-        sistema.inicializar()
-        print("✅ Sistema inicializado com sucesso")
-        
-        # Fazer predições
+        print(f"📁 {len(arquivos_excel)} arquivo(s) encontrado(s): {', '.join(a.name for a in arquivos_excel)}")
         print("🧠 Processando predições...")
-        predicoes, estatisticas = sistema.predizer_alunos(arquivo_entrada)
-        
-        # Gerar nome do arquivo de saída
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        nome_arquivo_saida = f"predicao_evasao_{timestamp}.csv"
-        arquivo_saida = output_dir / nome_arquivo_saida
         
-        # Salvar CSV
-        print("💾 Salvando resultados...")
-        import csv
-        
-        with open(arquivo_saida, 'w', newline='', encoding='utf-8-sig') as arquivo_csv:
-            escritor = csv.writer(arquivo_csv)
-            
-            # Cabeçalho
-            escritor.writerow([
-                'Nome', 'Matricula', 'Situacao_Atual_Sistema', 'Curso', 'Sexo', 'Turma',
-                'Status_Predicao', 'Situacao_Predita', 'Probabilidade_Situacao',
-                'Probabilidade_Evasao_Total', 'Nivel_Urgencia', 'Fator_Principal',
-                'Valor_Importancia', 'Confianca_Predicao', 'Fonte_Predicao',
-                'Data_Processamento'
-            ])
-            
-            # Dados
-            for predicao in predicoes:
-                escritor.writerow([
-                    predicao.nome, predicao.matricula, predicao.situacao_atual,
-                    predicao.curso, predicao.sexo, predicao.turma,
-                    predicao.status_predicao, predicao.situacao_predita,
-                    predicao.probabilidade_situacao, predicao.probabilidade_evasao_total,
-                    predicao.nivel_urgencia, predicao.fator_principal,
-                    abs(predicao.valor_importancia), predicao.confianca_predicao,
-                    predicao.fonte_predicao, datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                ])
-        
-        # Estatísticas finais
-        total_alunos = len(predicoes)
-        matriculados = len([p for p in predicoes if p.status_predicao == 'MATRICULADO'])
-        em_risco = len([p for p in predicoes if p.status_predicao == 'RISCO_EVASAO'])
-        urgentes = len([p for p in predicoes if p.nivel_urgencia == 'URGENTE'])
-        
-        print("\n" + "="*50)
-        print("📊 RESUMO DOS RESULTADOS:")
-        print("="*50)
-        print(f"📁 Arquivo processado: {arquivo_entrada.name}")
-        print(f"👥 Total de alunos: {total_alunos}")
-        print(f"✅ Matriculados: {matriculados} ({(matriculados/total_alunos)*100:.1f}%)")
-        print(f"⚠️  Em risco: {em_risco} ({(em_risco/total_alunos)*100:.1f}%)")
-        print(f"🚨 Casos urgentes: {urgentes}")
-        print(f"💾 Arquivo gerado: {arquivo_saida}")
-        print("="*50)
-        
-        # Mover arquivo processado para subpasta
-        processed_dir = input_dir / "processados"
-        processed_dir.mkdir(exist_ok=True)
-        novo_nome = processed_dir / f"{arquivo_entrada.stem}_processado_{timestamp}.xlsx"
-        arquivo_entrada.rename(novo_nome)
-        print(f"📁 Arquivo original movido para: {novo_nome}")
-        
-        return True
+        inicio = datetime.now()
+        resumos = processar_arquivos(arquivos_excel, output_dir, processed_dir, processos, perfil, perfil_memoria)
+        imprimir_resumo_consolidado(resumos, (datetime.now() - inicio).total_seconds())
         
+        return all(resumo['erro'] is None for resumo in resumos)
+    
     except Exception as e:
         print(f"\n❌ ERRO durante processamento:")
         print(f"   {str(e)}")
@@ -118,6 +250,7 @@ def processar_arquivo_automatico():
         return False
 
 if __name__ == "__main__":
-    sucesso = processar_arquivo_automatico()
+    args = configurar_argumentos().parse_args()
+    sucesso = processar_arquivo_automatico(args.processos, args.perfil, args.perfil_memoria)
     if not sucesso:
         sys.exit(1)
\ No newline at end of file
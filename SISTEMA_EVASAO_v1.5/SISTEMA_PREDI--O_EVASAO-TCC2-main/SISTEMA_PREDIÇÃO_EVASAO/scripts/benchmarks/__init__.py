@@ -0,0 +1,8 @@
+﻿"""
+Benchmarks de desempenho do sistema de predição.
+
+- gerar_coorte.py: gera coortes sintéticas no formato do AcadWeb (v1.5)
+  e da base de treinamento do v2.0, de 1 mil a 1 milhão de alunos
+- executar_benchmarks.py: mede cada etapa do pipeline sobre essas coortes
+  e salva os resultados em JSON (output/benchmarks) para comparação
+"""
@@ -0,0 +1,390 @@
+﻿#!/usr/bin/env python3
+"""
+Benchmarks por etapa do pipeline de predição sobre coortes sintéticas.
+
+Para cada tamanho de coorte (gerada por gerar_coorte.py e reaproveitada
+entre execuções) mede separadamente: leitura do Excel, leitura do CSV em
+blocos, preprocessar_dados, predict_proba, SHAP, motor de regras,
+montagem do resultado e exportação CSV/Power BI. Cada etapa registra o
+tempo de parede e de CPU (menor, mediana e média das repetições), linhas
+por segundo e o pico de memória do processo. Os resultados são salvos em
+JSON para comparação entre execuções; com --comparar, retorna código 1
+se alguma etapa ficar mais lenta que a tolerância.
+
+Uso:
+    python scripts/benchmarks/executar_benchmarks.py [--alunos 1000 10000] [--etapas regras shap]
+                                                     [--repeticoes 3] [--json arquivo.json]
+                                                     [--comparar anterior.json] [--tolerancia 1.25]
+    
+Exemplo:
+    python scripts/benchmarks/executar_benchmarks.py --alunos 1000 10000 100000
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+# Adicionar a raiz do projeto ao path para que possamos importar codigo_fonte
+RAIZ_PROJETO = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(RAIZ_PROJETO))
+
+from codigo_fonte.utilitarios import CarregadorDados
+from codigo_fonte.configuracao import configuracoes
+from codigo_fonte.nucleo import SistemaPredicaoEvasao, COLUNAS_EXPORTACAO
+from gerar_coorte import gerar_arquivo
+
+# Etapas na ordem do pipeline
+ETAPAS = ('carregar_excel', 'carregar_csv_blocos', 'preprocessar', 'predict_proba', 'shap',
+          'regras', 'montar_resultado', 'exportar_csv', 'exportar_powerbi')
+
+def obter_pico_memoria_mb() -> Optional[float]:
+    """Pico de memória residente do processo em MB (None se indisponível)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def medir(funcao: Callable[[], Any], repeticoes: int) -> Dict[str, Any]:
+    """
+    Executa a função várias vezes e resume os tempos de parede e de CPU.
+    
+    Args:
+        funcao: Etapa a medir
+        repeticoes: Número de execuções
+        
+    Returns:
+        Dicionário com os tempos e o retorno da última execução em 'retorno'
+    """
+    paredes, cpus = [], []
+    retorno = None
+    for _ in range(max(repeticoes, 1)):
+        inicio_parede, inicio_cpu = time.perf_counter(), time.process_time()
+        retorno = funcao()
+        paredes.append(time.perf_counter() - inicio_parede)
+        cpus.append(time.process_time() - inicio_cpu)
+    
+    return {
+        'parede_s': {'min': min(paredes), 'mediana': statistics.median(paredes),
+                     'media': statistics.fmean(paredes)},
+        'cpu_s': {'min': min(cpus), 'mediana': statistics.median(cpus), 'media': statistics.fmean(cpus)},
+        'retorno': retorno
+    }
+
+def executar_coorte(sistema: SistemaPredicaoEvasao, quantidade: int, etapas: List[str],
+                    repeticoes: int, diretorio_dados: Path, limite_shap: int,
+                    semente: int) -> List[Dict[str, Any]]:
+    """
+    Mede as etapas selecionadas sobre uma coorte.
+    
+    As etapas seguintes usam a saída das anteriores; as que não foram
+    selecionadas rodam uma vez, fora da medição, quando alguma etapa
+    posterior precisa da sua saída.
+    
+    Args:
+        sistema: Sistema inicializado
+        quantidade: Número de alunos da coorte
+        etapas: Etapas a medir
+        repeticoes: Execuções por etapa
+        diretorio_dados: Diretório das coortes geradas
+        limite_shap: Máximo de alunos explicados na etapa shap
+        semente: Semente do gerador
+        
+    Returns:
+        Um registro por etapa medida
+    """
+    registros = []
+    contexto: Dict[str, Any] = {}
+    colunas = configuracoes.dados.caracteristicas_esperadas + configuracoes.dados.colunas_identificacao
+    preditor = sistema.preditor_ml
+    diretorio_temporario = Path(tempfile.mkdtemp(prefix='benchmark_'))
+    
+    def exportar_powerbi():
+        from automacao_powerbi import AutomacaoPowerBI
+        
+        # A automação imprime um resumo a cada exportação
+        with redirect_stdout(io.StringIO()):
+            return AutomacaoPowerBI(diretorio_temporario).salvar_csv_para_powerbi(
+                contexto['resultado'].para_dataframe_exportacao(),
+                {'data_processamento': datetime.now(), 'arquivo_original': 'benchmark'}
+            )
+    
+    def explicar():
+        linhas = np.arange(min(limite_shap, len(contexto['df_processado'])))
+        indices_classe = np.argmax(contexto['resultado_ml'].probabilidades, axis=1)
+        return preditor.explicar_predicoes(contexto['df_processado'], linhas, indices_classe)
+    
+    def aplicar_regras():
+        sistema.motor_regras_negocio.resetar_contadores()
+        return sistema.motor_regras_negocio.aplicar_regras_negocio_lote(
+            contexto['df'], contexto['resultado_ml'].predicoes, contexto['resultado_ml'].probabilidade_maxima
+        )
+    
+    # Etapa: (função, chave do contexto onde guardar o retorno, linhas processadas)
+    definicoes = {
+        'carregar_excel': (
+            lambda: CarregadorDados.carregar_excel_com_deteccao_cabecalho(contexto['arquivo_xlsx'], colunas=colunas),
+            'df', lambda: quantidade),
+        'carregar_csv_blocos': (
+            lambda: pd.concat(CarregadorDados.ler_em_blocos(
+                contexto['arquivo_csv'], configuracoes.dados.tamanho_bloco_streaming, colunas=colunas
+            ), ignore_index=True),
+            None, lambda: quantidade),
+        'preprocessar': (lambda: preditor.preprocessar_dados(contexto['df']), 'df_processado', lambda: quantidade),
+        'predict_proba': (lambda: np.asarray(preditor.modelo.predict_proba(contexto['df_processado'])),
+                          None, lambda: quantidade),
+        'shap': (explicar, None, lambda: min(limite_shap, quantidade)),
+        'regras': (aplicar_regras, 'resultados_regras', lambda: quantidade),
+        'montar_resultado': (
+            lambda: sistema._montar_resultado(contexto['df'], contexto['resultados_regras'], contexto['resultado_ml'],
+                                              contexto['df_processado'], modo_explicacao='desativado'),
+            'resultado', lambda: quantidade),
+        'exportar_csv': (
+            lambda: contexto['resultado'].salvar_csv(diretorio_temporario / 'analise.csv', colunas=COLUNAS_EXPORTACAO),
+            None, lambda: quantidade),
+        'exportar_powerbi': (exportar_powerbi, None, lambda: quantidade),
+    }
+    
+    # Dependências de cada etapa no contexto
+    preparacao = {
+        'df': 'carregar_excel',
+        'df_processado': 'preprocessar',
+        'resultados_regras': 'regras',
+        'resultado': 'montar_resultado',
+    }
+    necessidades = {
+        'preprocessar': ['df'], 'predict_proba': ['df_processado'], 'shap': ['df_processado', 'resultado_ml'],
+        'regras': ['df', 'resultado_ml'], 'montar_resultado': ['df', 'df_processado', 'resultados_regras', 'resultado_ml'],
+        'exportar_csv': ['resultado'], 'exportar_powerbi': ['resultado'],
+    }
+    
+    def garantir(chave: str) -> None:
+        if chave in contexto:
+            return
+        if chave == 'resultado_ml':
+            garantir('df_processado')
+            contexto[chave] = preditor.fazer_predicoes(contexto['df_processado'], calcular_shap=False)
+            return
+        etapa = preparacao[chave]
+        for dependencia in necessidades.get(etapa, []):
+            garantir(dependencia)
+        funcao, _, _ = definicoes[etapa]
+        contexto[chave] = funcao()
+    
+    contexto['arquivo_xlsx'] = gerar_arquivo('acadweb', quantidade, 'xlsx', diretorio_dados, semente)
+    if 'carregar_csv_blocos' in etapas:
+        contexto['arquivo_csv'] = gerar_arquivo('acadweb', quantidade, 'csv', diretorio_dados, semente)
+    
+    try:
+        for etapa in ETAPAS:
+            if etapa not in etapas:
+                continue
+            for dependencia in necessidades.get(etapa, []):
+                garantir(dependencia)
+            
+            funcao, chave, linhas = definicoes[etapa]
+            try:
+                medicao = medir(funcao, repeticoes)
+            except ImportError as e:
+                print(f"   {etapa:<20} ignorada: {e}")
+                registros.append({'alunos': quantidade, 'etapa': etapa, 'ignorada': str(e)})
+                continue
+            if chave is not None:
+                contexto[chave] = medicao['retorno']
+            
+            registro = {
+                'alunos': quantidade,
+                'etapa': etapa,
+                'linhas': linhas(),
+                'repeticoes': max(repeticoes, 1),
+                'parede_s': {nome: round(valor, 6) for nome, valor in medicao['parede_s'].items()},
+                'cpu_s': {nome: round(valor, 6) for nome, valor in medicao['cpu_s'].items()},
+                'linhas_por_s': round(linhas() / medicao['parede_s']['min'], 1) if medicao['parede_s']['min'] else None,
+                'pico_memoria_mb': obter_pico_memoria_mb()
+            }
+            registros.append(registro)
+            print(f"   {etapa:<20} {registro['parede_s']['min']:>10.4f} s {registro['cpu_s']['min']:>10.4f} s "
+                  f"{registro['linhas_por_s'] or 0:>14,.0f} {registro['pico_memoria_mb'] or 0:>10.1f}")
+    finally:
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+    
+    return registros
+
+def descrever_ambiente() -> Dict[str, Any]:
+    """Versões e máquina, para que resultados de execuções diferentes sejam comparáveis."""
+    import sklearn
+    import xgboost
+    
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ_PROJETO,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+    }
+
+def comparar(registros: List[Dict[str, Any]], arquivo_anterior: Path, tolerancia: float) -> List[str]:
+    """
+    Compara os tempos com uma execução anterior salva em JSON.
+    
+    Args:
+        registros: Registros da execução atual
+        arquivo_anterior: JSON de uma execução anterior
+        tolerancia: Razão máxima aceita entre o tempo atual e o anterior
+        
+    Returns:
+        Descrição das etapas que ficaram mais lentas que a tolerância
+    """
+    with open(arquivo_anterior, encoding='utf-8') as arquivo:
+        anteriores = {
+            (registro['alunos'], registro['etapa']): registro
+            for registro in json.load(arquivo)['resultados'] if 'parede_s' in registro
+        }
+    
+    regressoes = []
+    print(f"\n{'Alunos':>9} {'Etapa':<20} {'Anterior (s)':>13} {'Atual (s)':>11} {'Razão':>7}")
+    for registro in registros:
+        anterior = anteriores.get((registro['alunos'], registro['etapa']))
+        if anterior is None or 'parede_s' not in registro:
+            continue
+        tempo_anterior, tempo_atual = anterior['parede_s']['min'], registro['parede_s']['min']
+        razao = tempo_atual / tempo_anterior if tempo_anterior else float('inf')
+        situacao = '❌' if razao > tolerancia else '✅'
+        print(f"{registro['alunos']:>9} {registro['etapa']:<20} {tempo_anterior:>13.4f} {tempo_atual:>11.4f} "
+              f"{razao:>7.2f} {situacao}")
+        if razao > tolerancia:
+            regressoes.append(f"{registro['alunos']} alunos, {registro['etapa']}: {razao:.2f}x mais lento")
+    return regressoes
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Benchmarks por etapa do pipeline de predição')
+    
+    parser.add_argument(
+        '--alunos',
+        type=int,
+        nargs='+',
+        default=[1000, 10000],
+        help='Tamanhos das coortes (padrão: 1000 10000; use também 100000 e 1000000)'
+    )
+    
+    parser.add_argument(
+        '--etapas',
+        nargs='+',
+        choices=ETAPAS,
+        default=list(ETAPAS),
+        help='Etapas a medir (padrão: todas)'
+    )
+    
+    parser.add_argument(
+        '--repeticoes',
+        type=int,
+        default=3,
+        help='Execuções por etapa; o relatório usa o menor tempo (padrão: 3)'
+    )
+    
+    parser.add_argument(
+        '--limite-shap',
+        type=int,
+        default=10000,
+        help='Máximo de alunos explicados na etapa shap (padrão: 10000)'
+    )
+    
+    parser.add_argument(
+        '--dados',
+        default=str(RAIZ_PROJETO / 'output' / 'benchmarks' / 'dados'),
+        help='Diretório das coortes geradas (padrão: output/benchmarks/dados)'
+    )
+    
+    parser.add_argument(
+        '--semente',
+        type=int,
+        default=42,
+        help='Semente do gerador de coortes (padrão: 42)'
+    )
+    
+    parser.add_argument(
+        '--json',
+        help='Arquivo onde salvar os resultados (padrão: output/benchmarks/benchmark_<data>.json)'
+    )
+    
+    parser.add_argument(
+        '--comparar',
+        help='JSON de uma execução anterior para comparação'
+    )
+    
+    parser.add_argument(
+        '--tolerancia',
+        type=float,
+        default=1.25,
+        help='Razão máxima aceita entre o tempo atual e o anterior (padrão: 1.25)'
+    )
+    
+    args = parser.parse_args()
+    
+    sistema = SistemaPredicaoEvasao()
+    sistema.inicializar()
+    
+    registros = []
+    for quantidade in args.alunos:
+        print(f"\n📊 Coorte de {quantidade:,} alunos")
+        print(f"   {'Etapa':<20} {'Parede':>12} {'CPU':>12} {'Linhas/s':>14} {'Pico (MB)':>10}")
+        registros.extend(executar_coorte(sistema, quantidade, args.etapas, args.repeticoes,
+                                         Path(args.dados), args.limite_shap, args.semente))
+    
+    arquivo_json = Path(args.json) if args.json else (
+        RAIZ_PROJETO / 'output' / 'benchmarks' / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    arquivo_json.parent.mkdir(parents=True, exist_ok=True)
+    with open(arquivo_json, 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'ambiente': descrever_ambiente(),
+            'parametros': {'repeticoes': args.repeticoes, 'limite_shap': args.limite_shap, 'semente': args.semente},
+            'resultados': registros
+        }, arquivo, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados salvos em: {arquivo_json}")
+    
+    if args.comparar:
+        regressoes = comparar(registros, Path(args.comparar), args.tolerancia)
+        if regressoes:
+            print("\n❌ Etapas mais lentas que a execução anterior:")
+            for regressao in regressoes:
+                print(f"   {regressao}")
+            return 1
+        print("\n✅ Nenhuma etapa acima da tolerância")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+﻿#!/usr/bin/env python3
+"""
+Gerador de coortes sintéticas no formato do AcadWeb.
+
+Gera alunos com as distribuições da base de treinamento (cursos,
+currículos, turmas, situações, pendências e faltas, com os espaços e
+tipos mistos das exportações reais) em dois esquemas:
+
+- acadweb: planilha de alunos ativos lida pelo v1.5 (três linhas de
+  título antes do cabeçalho, como em carregar_planilha_acadweb), em
+  .xlsx ou .csv separado por ';'
+- expandido: base de treinamento do v2.0 (Planilhabasedados_EXPANDIDO.csv)
+
+Uso:
+    python scripts/benchmarks/gerar_coorte.py [--alunos 1000 10000] [--esquema acadweb expandido]
+                                              [--formato xlsx csv] [--saida dir] [--semente 42]
+    
+Exemplo:
+    python scripts/benchmarks/gerar_coorte.py --alunos 100000 --formato csv
+"""
+
+import sys
+import csv
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+RAIZ_PROJETO = Path(__file__).parent.parent.parent
+
+# Tamanhos padrão das coortes
+TAMANHOS_PADRAO = (1000, 10000, 100000, 1000000)
+
+# Linhas de título que o AcadWeb exporta antes do cabeçalho
+LINHAS_TITULO = (
+    ('Relatório de Alunos Ativos',),
+    ('Unidade: Vitória da Conquista',),
+    (),
+)
+
+# Colunas da planilha de alunos ativos (v1.5)
+COLUNAS_ACADWEB = [
+    'Matrícula', 'Nome', 'Situação', 'Pend. Financ.', 'Faltas Consecutivas', 'Pend. Acad.',
+    'Módulo atual', 'Cód.Curso', 'Curso', 'Currículo', 'Sexo', 'Identidade', 'Turma Atual',
+    'Cód.Disc. atual', 'Disciplina atual'
+]
+
+# Colunas de Planilhabasedados_EXPANDIDO.csv (v2.0)
+COLUNAS_EXPANDIDO = [
+    'Matricula', 'nome', 'situacao', 'descricao', 'prematricula', 'turmaatual', 'pendacad',
+    'codcurso', 'curso', 'coddiscatual', 'disciplinaatual', 'curriculo', 'moduloatual',
+    'pendfinanc', 'sexo', 'faltasconsecutivas', 'identidade', 'orgaoexpedidor', 'cpf',
+    'endereco', 'bairro', 'uf', 'cidade', 'cep', 'foneres', 'fonecom', 'fonefax', 'fonecel',
+    'email', 'naturalidade', 'ufnascimento', 'Satisfacao_Geral', 'Qualidade_Ensino',
+    'Motivacao_Continuar', 'Dificuldade_Disciplina', 'Pretende_Desistir', 'Avaliacao_Professor'
+]
+
+# Cursos: (código, nome como exportado, sigla, currículos, peso)
+CURSOS = [
+    (2, 'Curso Técnico em Enfermagem ', 'ENF', ['ENF2019MG', 'ENF23VITCO '], 0.42),
+    (21, 'Curso Técnico em Radiologia', 'RAD', ['RAD20151', 'RAD23VITCO'], 0.18),
+    (3, 'Curso Técnico em Administração', 'ADM', ['ADM20191', 'ADM23VITCO'], 0.165),
+    (11, 'Curso Técnico em Eletrotécnica', 'ELT', ['ELT20162', 'ELT23VITCO'], 0.08),
+    (33, 'Curso Técnico em Farmácia', 'FMC', ['FMC2019CE', 'FMC23VITCO'], 0.078),
+    (1, 'Curso Técnico em Segurança do Trabalho', 'STB', ['STB20161', 'STB23VITCO'], 0.061),
+    (14, 'Curso Técnico em Análises Clínicas', 'ANC', ['ANC20201'], 0.016),
+]
+
+# Disciplinas por sigla de curso: (código, nome)
+DISCIPLINAS = {
+    'ENF': [('ENF152CEHELE', 'Hematologia e Eletrocardiografia'), ('ENF2019SPPSI', 'Psicologia Aplicada'),
+            ('ENF152AFUNEN', 'Fundamentos de Enfermagem'), ('ENF2019SPNFAR', 'Noções de Farmacologia'),
+            ('ENF2019SPECM', 'Enfermagem em Clínica Médica'), ('ENF2019SPESCA', 'Enfermagem em Saúde Coletiva')],
+    'RAD': [('RAD151ATERC1', 'Técnicas Radiológicas I'), ('RAD151AANATO', 'Anatomia Radiológica'),
+            ('RAD151APROTR', 'Proteção Radiológica'), ('RAD151AFISRA', 'Física das Radiações')],
+    'ADM': [('ADM111ACONCU', 'Contabilidade de Custo'), ('ADM111ACARSB', 'Cargos, Salários e Benefícios'),
+            ('ADM111ARESOA', 'Responsabilidade Social'), ('ADM111AINTAM', 'Introdução a Administração e Marketing'),
+            ('ADM111AMAFIN', 'Matemática Financeira')],
+    'ELT': [('ELT121AACEI2', 'Máquinas Elétricas '), ('ELT121AMATAP', 'Comandos Elétricos'),
+            ('ELT151AINGIN', 'Proteção dos Sistemas Elétricos II')],
+    'FMC': [('FMC182AINEFA', 'Introdução à Farmácia'), ('FMC182AFARMA', 'Farmacologia'),
+            ('FMC182AMANIP', 'Manipulação Magistral')],
+    'STB': [('STB161AINSEG', 'Introdução à Segurança do Trabalho'), ('STB161AHIGIE', 'Higiene Ocupacional'),
+            ('STB161ALEGIS', 'Legislação Aplicada')],
+    'ANC': [('ANC201ABIOQU', 'Bioquímica Clínica'), ('ANC201AMICRO', 'Microbiologia'),
+            ('ANC201APARAS', 'Parasitologia')],
+}
+
+# Situações: (sigla, descrição, peso)
+SITUACOES = [
+    ('MT', 'Matriculado', 0.18), ('CAN', 'Cancelamento Normal', 0.16), ('LFI', 'Limpeza Financeira', 0.14),
+    ('CAC', 'Cancelamento Comercial', 0.138), ('LFR', 'Limpeza de Frequencia', 0.134), ('FO', 'Formado', 0.088),
+    ('LAC', 'Limpeza Academica', 0.064), ('CAI', 'Cancelamento Interno', 0.036), ('NC', 'Nunca Compareceu', 0.032),
+    ('TF', 'Transferência Interna', 0.025), ('CAU', 'Cancelamento Unidade', 0.005), ('TR', 'Trancado', 0.004),
+]
+
+PRIMEIROS_NOMES = ['Ana', 'Maria', 'José', 'João', 'Gabriela', 'Lucas', 'Juliana', 'Pedro', 'Fernanda',
+                   'Carlos', 'Patrícia', 'Rafael', 'Aline', 'Bruno', 'Camila', 'Diego', 'Larissa', 'Willian']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rocha', 'Lima', 'Gomes', 'Almeida', 'Pereira',
+              'Costa', 'Ribeiro', 'Carvalho', 'Cirqueira', 'Lavezzo', 'Goncalves', 'Ferreira']
+CIDADES = [('Vitória da Conquista', 'BA'), ('Planalto', 'BA'), ('Anagé', 'BA'), ('Barra do Choça', 'BA'),
+           ('Itapetinga', 'BA'), ('Queimados', 'RJ'), ('São Paulo', 'SP')]
+
+def _escolher(gerador: np.random.Generator, valores: List, pesos: List[float], quantidade: int) -> np.ndarray:
+    """Sorteia índices de `valores` segundo os pesos normalizados."""
+    pesos = np.asarray(pesos, dtype=float)
+    return gerador.choice(len(valores), size=quantidade, p=pesos / pesos.sum())
+
+def _texto_ou_vazio(valores: np.ndarray, vazio: np.ndarray) -> np.ndarray:
+    """Troca por None as posições marcadas como vazias."""
+    valores = valores.astype(object)
+    valores[vazio] = None
+    return valores
+
+def gerar_alunos(quantidade: int, semente: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Gera os campos acadêmicos de uma coorte, comuns aos dois esquemas.
+    
+    Args:
+        quantidade: Número de alunos
+        semente: Semente do gerador aleatório
+        
+    Returns:
+        Dicionário campo -> array com um valor por aluno
+    """
+    gerador = np.random.default_rng(semente)
+    
+    indice_curso = _escolher(gerador, CURSOS, [curso[4] for curso in CURSOS], quantidade)
+    cod_curso = np.array([curso[0] for curso in CURSOS])[indice_curso]
+    nome_curso = np.array([curso[1] for curso in CURSOS], dtype=object)[indice_curso]
+    sigla = np.array([curso[2] for curso in CURSOS], dtype=object)[indice_curso]
+    
+    curriculo = np.empty(quantidade, dtype=object)
+    cod_disciplina = np.empty(quantidade, dtype=object)
+    nome_disciplina = np.empty(quantidade, dtype=object)
+    for posicao, (_, _, sigla_curso, curriculos, _) in enumerate(CURSOS):
+        linhas = np.flatnonzero(indice_curso == posicao)
+        curriculo[linhas] = np.array(curriculos, dtype=object)[gerador.integers(len(curriculos), size=len(linhas))]
+        disciplinas = DISCIPLINAS[sigla_curso]
+        escolhidas = gerador.integers(len(disciplinas), size=len(linhas))
+        cod_disciplina[linhas] = np.array([codigo for codigo, _ in disciplinas], dtype=object)[escolhidas]
+        nome_disciplina[linhas] = np.array([nome for _, nome in disciplinas], dtype=object)[escolhidas]
+    
+    indice_situacao = _escolher(gerador, SITUACOES, [situacao[2] for situacao in SITUACOES], quantidade)
+    situacao = np.array([situacao[0] for situacao in SITUACOES], dtype=object)[indice_situacao]
+    descricao = np.array([situacao[1] for situacao in SITUACOES], dtype=object)[indice_situacao]
+    
+    # Turma: sigla + número + turno, às vezes com espaços à direita como no AcadWeb
+    turma = (sigla + pd.Series(gerador.integers(1, 30, size=quantidade)).map('{:02d}'.format).to_numpy(dtype=object)
+             + np.where(gerador.random(quantidade) < 0.7, '-N', '-M').astype(object))
+    turma = np.where(gerador.random(quantidade) < 0.05, turma + '        ', turma)
+    sem_turma = gerador.random(quantidade) < 0.3
+    
+    # Pendência financeira: em geral vazia; senão parcelas em aberto ou 'PC' (tipos mistos)
+    pend_financ = pd.Series(gerador.integers(1, 37, size=quantidade)).map('{:02d}'.format).to_numpy(dtype=object)
+    pend_financ = np.where(gerador.random(quantidade) < 0.03, 'PC', pend_financ)
+    sem_pend_financ = gerador.random(quantidade) < 0.67
+    
+    indice_pend_acad = _escolher(gerador, [None, 'PR', 'PV', 'PF'], [0.914, 0.063, 0.018, 0.005], quantidade)
+    pend_acad = np.array([None, 'PR', 'PV', 'PF'], dtype=object)[indice_pend_acad]
+    
+    faltas = np.where(gerador.random(quantidade) < 0.58, 0, gerador.integers(1, 31, size=quantidade)).astype(float)
+    faltas[gerador.random(quantidade) < 0.16] = np.nan
+    
+    modulo = gerador.integers(1, 5, size=quantidade).astype(float)
+    modulo[gerador.random(quantidade) < 0.39] = np.nan
+    
+    primeiro = np.array(PRIMEIROS_NOMES, dtype=object)[gerador.integers(len(PRIMEIROS_NOMES), size=quantidade)]
+    sobrenome_1 = np.array(SOBRENOMES, dtype=object)[gerador.integers(len(SOBRENOMES), size=quantidade)]
+    sobrenome_2 = np.array(SOBRENOMES, dtype=object)[gerador.integers(len(SOBRENOMES), size=quantidade)]
+    nome = primeiro + ' ' + sobrenome_1 + ' ' + sobrenome_2
+    nome = np.where(gerador.random(quantidade) < 0.1, nome + ' ', nome)
+    
+    sequencia = pd.Series(np.arange(quantidade)).map('{:07d}'.format).to_numpy(dtype=object)
+    matricula = sigla + '20' + sequencia
+    
+    identidade = pd.Series(gerador.integers(10**8, 10**10, size=quantidade)).astype(str).to_numpy(dtype=object)
+    identidade = np.where(gerador.random(quantidade) < 0.1, identidade + '-X', identidade)
+    
+    return {
+        'matricula': matricula,
+        'nome': nome,
+        'situacao': situacao,
+        'descricao': descricao,
+        'turma': _texto_ou_vazio(turma, sem_turma),
+        'pend_acad': pend_acad,
+        'cod_curso': cod_curso,
+        'curso': nome_curso,
+        'cod_disciplina': _texto_ou_vazio(cod_disciplina, sem_turma),
+        'disciplina': _texto_ou_vazio(nome_disciplina, sem_turma),
+        'curriculo': curriculo,
+        'modulo': modulo,
+        'pend_financ': _texto_ou_vazio(pend_financ, sem_pend_financ),
+        'sexo': np.where(gerador.random(quantidade) < 0.71, 'F', 'M').astype(object),
+        'faltas': faltas,
+        'identidade': identidade,
+    }
+
+def gerar_coorte_acadweb(quantidade: int, semente: int = 42) -> pd.DataFrame:
+    """
+    Gera a planilha de alunos ativos do v1.5.
+    
+    Args:
+        quantidade: Número de alunos
+        semente: Semente do gerador aleatório
+        
+    Returns:
+        DataFrame com as colunas de COLUNAS_ACADWEB
+    """
+    campos = gerar_alunos(quantidade, semente)
+    return pd.DataFrame({
+        'Matrícula': campos['matricula'],
+        'Nome': campos['nome'],
+        'Situação': campos['situacao'],
+        'Pend. Financ.': campos['pend_financ'],
+        'Faltas Consecutivas': campos['faltas'],
+        'Pend. Acad.': campos['pend_acad'],
+        'Módulo atual': campos['modulo'],
+        'Cód.Curso': campos['cod_curso'],
+        'Curso': campos['curso'],
+        'Currículo': campos['curriculo'],
+        'Sexo': campos['sexo'],
+        'Identidade': campos['identidade'],
+        'Turma Atual': campos['turma'],
+        'Cód.Disc. atual': campos['cod_disciplina'],
+        'Disciplina atual': campos['disciplina'],
+    })
+
+def gerar_coorte_expandida(quantidade: int, semente: int = 42) -> pd.DataFrame:
+    """
+    Gera a base de treinamento no esquema de Planilhabasedados_EXPANDIDO.csv (v2.0).
+    
+    Args:
+        quantidade: Número de alunos
+        semente: Semente do gerador aleatório
+        
+    Returns:
+        DataFrame com as colunas de COLUNAS_EXPANDIDO
+    """
+    campos = gerar_alunos(quantidade, semente)
+    gerador = np.random.default_rng(semente + 1)
+    
+    def numeros(digitos: int) -> np.ndarray:
+        return pd.Series(gerador.integers(10**(digitos - 1), 10**digitos, size=quantidade)).astype(str).to_numpy(dtype=object)
+    
+    indice_cidade = gerador.integers(len(CIDADES), size=quantidade)
+    cidade = np.array([cidade for cidade, _ in CIDADES], dtype=object)[indice_cidade]
+    uf = np.array([uf for _, uf in CIDADES], dtype=object)[indice_cidade]
+    email = (pd.Series(campos['nome']).str.split().str[0].str.lower()
+             + pd.Series(gerador.integers(1000, 9999, size=quantidade)).astype(str) + '@gmail.com')
+    
+    df = pd.DataFrame({
+        'Matricula': campos['matricula'],
+        'nome': campos['nome'],
+        'situacao': campos['situacao'],
+        'descricao': campos['descricao'],
+        'prematricula': None,
+        'turmaatual': campos['turma'],
+        'pendacad': campos['pend_acad'],
+        'codcurso': campos['cod_curso'],
+        'curso': campos['curso'],
+        'coddiscatual': campos['cod_disciplina'],
+        'disciplinaatual': campos['disciplina'],
+        'curriculo': campos['curriculo'],
+        'moduloatual': campos['modulo'],
+        'pendfinanc': campos['pend_financ'],
+        'sexo': campos['sexo'],
+        'faltasconsecutivas': campos['faltas'],
+        'identidade': campos['identidade'],
+        'orgaoexpedidor': np.where(gerador.random(quantidade) < 0.8, 'SSP BA', 'SSP SP').astype(object),
+        'cpf': numeros(10),
+        'endereco': 'Rua ' + pd.Series(gerador.integers(1, 500, size=quantidade)).astype(str).to_numpy(dtype=object),
+        'bairro': np.where(gerador.random(quantidade) < 0.5, 'Centro', 'Patagônia').astype(object),
+        'uf': uf,
+        'cidade': cidade,
+        'cep': numeros(8),
+        'foneres': numeros(11),
+        'fonecom': numeros(11).astype(float),
+        'fonefax': None,
+        'fonecel': '00' + numeros(11),
+        'email': email.to_numpy(dtype=object),
+        'naturalidade': cidade,
+        'ufnascimento': uf,
+    })
+    
+    # Questionário de satisfação (1 a 5; Pretende_Desistir de 0 a 2)
+    for coluna, pesos in (('Satisfacao_Geral', [0.01, 0.05, 0.17, 0.38, 0.39]),
+                          ('Qualidade_Ensino', [0.02, 0.05, 0.18, 0.37, 0.38]),
+                          ('Motivacao_Continuar', [0.04, 0.08, 0.2, 0.34, 0.34]),
+                          ('Dificuldade_Disciplina', [0.3, 0.3, 0.2, 0.12, 0.08])):
+        df[coluna] = _escolher(gerador, pesos, pesos, quantidade) + 1
+    df['Pretende_Desistir'] = _escolher(gerador, [0, 1, 2], [0.8, 0.155, 0.045], quantidade)
+    df['Avaliacao_Professor'] = _escolher(gerador, [1, 2, 3, 4, 5], [0.02, 0.04, 0.16, 0.38, 0.4], quantidade) + 1
+    
+    return df[COLUNAS_EXPANDIDO]
+
+def salvar_planilha_acadweb(df: pd.DataFrame, caminho: Path) -> Path:
+    """
+    Salva a coorte como o AcadWeb exporta: linhas de título e depois o cabeçalho.
+    
+    Args:
+        df: Coorte de gerar_coorte_acadweb
+        caminho: Arquivo .xlsx ou .csv (separado por ';')
+        
+    Returns:
+        Caminho gravado
+    """
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    linhas = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    
+    if caminho.suffix.lower() == '.csv':
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            escritor = csv.writer(arquivo, delimiter=';')
+            escritor.writerows(LINHAS_TITULO)
+            escritor.writerow(df.columns)
+            escritor.writerows(linhas)
+        return caminho
+    
+    from openpyxl import Workbook
+    
+    # write_only grava em streaming; a planilha inteira não fica em memória
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet('Alunos')
+    for linha in LINHAS_TITULO:
+        planilha.append(list(linha))
+    planilha.append(list(df.columns))
+    for linha in linhas:
+        planilha.append(linha)
+    livro.save(caminho)
+    return caminho
+
+def gerar_arquivo(esquema: str, quantidade: int, formato: str, diretorio: Path,
+                  semente: int = 42, reutilizar: bool = True) -> Path:
+    """
+    Gera (ou reaproveita) o arquivo de uma coorte.
+    
+    Args:
+        esquema: 'acadweb' ou 'expandido'
+        quantidade: Número de alunos
+        formato: 'xlsx' ou 'csv' (o esquema expandido é sempre CSV)
+        diretorio: Diretório de saída
+        semente: Semente do gerador aleatório
+        reutilizar: Não regrava um arquivo já existente
+        
+    Returns:
+        Caminho do arquivo
+    """
+    if esquema == 'expandido':
+        caminho = Path(diretorio) / f"Planilhabasedados_EXPANDIDO_{quantidade}_s{semente}.csv"
+    else:
+        caminho = Path(diretorio) / f"alunos_acadweb_{quantidade}_s{semente}.{formato}"
+    if reutilizar and caminho.exists():
+        return caminho
+    
+    if esquema == 'expandido':
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        gerar_coorte_expandida(quantidade, semente).to_csv(caminho, index=False, encoding='utf-8')
+    else:
+        salvar_planilha_acadweb(gerar_coorte_acadweb(quantidade, semente), caminho)
+    return caminho
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Gerador de coortes sintéticas do AcadWeb')
+    
+    parser.add_argument(
+        '--alunos',
+        type=int,
+        nargs='+',
+        default=list(TAMANHOS_PADRAO),
+        help=f'Tamanhos das coortes (padrão: {" ".join(map(str, TAMANHOS_PADRAO))})'
+    )
+    
+    parser.add_argument(
+        '--esquema',
+        nargs='+',
+        choices=['acadweb', 'expandido'],
+        default=['acadweb'],
+        help='acadweb (planilha de alunos do v1.5) e/ou expandido (base de treinamento do v2.0)'
+    )
+    
+    parser.add_argument(
+        '--formato',
+        nargs='+',
+        choices=['xlsx', 'csv'],
+        default=['xlsx'],
+        help='Formato da planilha acadweb (padrão: xlsx)'
+    )
+    
+    parser.add_argument(
+        '--saida',
+        default=str(RAIZ_PROJETO / 'output' / 'benchmarks' / 'dados'),
+        help='Diretório de saída (padrão: output/benchmarks/dados)'
+    )
+    
+    parser.add_argument(
+        '--semente',
+        type=int,
+        default=42,
+        help='Semente do gerador aleatório (padrão: 42)'
+    )
+    
+    args = parser.parse_args()
+    
+    for quantidade in args.alunos:
+        for esquema in args.esquema:
+            for formato in (args.formato if esquema == 'acadweb' else ['csv']):
+                caminho = gerar_arquivo(esquema, quantidade, formato, Path(args.saida), args.semente,
+                                        reutilizar=False)
+                print(f"✅ {esquema} {quantidade} alunos: {caminho}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+﻿#!/usr/bin/env python3
+"""
+Script para medir o tempo de importação dos pontos de entrada do sistema.
+
+Executa cada alvo com ``python -X importtime`` em um processo novo, soma o
+tempo acumulado dos módulos de primeiro nível e compara com o orçamento do
+alvo. Também verifica que bibliotecas pesadas (shap, sklearn, xgboost,
+matplotlib, seaborn) não são importadas por ajuda, configuração e regras.
+Retorna código 1 se algum orçamento for ultrapassado ou se alguma
+biblioteca proibida for importada.
+
+Uso:
+    python scripts/medir_tempo_importacao.py [--repeticoes 5] [--fator 1.0] [--json arquivo.json]
+    
+Exemplo:
+    python scripts/medir_tempo_importacao.py --fator 2.0
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+RAIZ_PROJETO = Path(__file__).parent.parent
+
+# Bibliotecas que só devem ser importadas ao carregar o modelo ou treinar
+MODULOS_PROIBIDOS = ('shap', 'sklearn', 'xgboost', 'matplotlib', 'seaborn')
+
+# Alvo: (argumentos do interpretador, orçamento em ms, verificar módulos proibidos).
+# Os orçamentos têm folga de ~2x sobre os tempos medidos; importar pandas na
+# configuração ou shap/sklearn em qualquer alvo já os ultrapassa.
+ALVOS = {
+    'principal --ajuda': (['principal.py', '--ajuda'], 1200.0, True),
+    'configuracao': (['-c', 'import codigo_fonte.configuracao'], 150.0, True),
+    'regras_negocio': (['-c', 'import codigo_fonte.regras_negocio'], 1000.0, True),
+    'nucleo': (['-c', 'import codigo_fonte.nucleo'], 1200.0, True),
+}
+
+def medir_importacao(argumentos: List[str]) -> Tuple[float, Dict[str, float]]:
+    """
+    Executa o interpretador com -X importtime e interpreta a saída.
+    
+    Args:
+        argumentos: Argumentos passados ao interpretador após -X importtime
+        
+    Returns:
+        Tupla com o tempo total em ms e o tempo acumulado (ms) de cada módulo importado
+        
+    Raises:
+        RuntimeError: Se o processo terminar com erro
+    """
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + argumentos,
+        cwd=RAIZ_PROJETO, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao executar {' '.join(argumentos)}: {processo.stderr[-500:]}")
+    
+    total_us = 0
+    modulos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        partes = linha[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue  # Cabeçalho
+        acumulado_us = int(partes[1])
+        nome = partes[2][1:]
+        modulos[nome.strip()] = acumulado_us / 1000
+        # Módulos de primeiro nível não têm recuo; os demais já estão contados neles
+        if not nome.startswith(' '):
+            total_us += acumulado_us
+    
+    return total_us / 1000, modulos
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Benchmark do tempo de importação (python -X importtime)')
+    
+    parser.add_argument(
+        '--repeticoes',
+        type=int,
+        default=5,
+        help='Execuções por alvo; vale o menor tempo (padrão: 5)'
+    )
+    
+    parser.add_argument(
+        '--fator',
+        type=float,
+        default=1.0,
+        help='Multiplicador dos orçamentos, para máquinas mais lentas (padrão: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--json',
+        help='Arquivo onde salvar os resultados em JSON'
+    )
+    
+    args = parser.parse_args()
+    
+    resultados = {}
+    falhas = []
+    
+    print(f"{'Alvo':<20} {'Tempo (ms)':>12} {'Orçamento':>12}")
+    for nome_alvo, (argumentos, orcamento_ms, verificar_proibidos) in ALVOS.items():
+        # Primeira execução compila os .pyc e não entra na medição
+        medir_importacao(argumentos)
+        medicoes = [medir_importacao(argumentos) for _ in range(max(args.repeticoes, 1))]
+        tempo_ms, modulos = min(medicoes, key=lambda medicao: medicao[0])
+        orcamento_ms *= args.fator
+        
+        proibidos = []
+        if verificar_proibidos:
+            proibidos = sorted({
+                modulo.split('.')[0] for modulo in modulos
+                if modulo.split('.')[0] in MODULOS_PROIBIDOS
+            })
+        
+        mais_lentos = sorted(modulos.items(), key=lambda item: item[1], reverse=True)[:5]
+        resultados[nome_alvo] = {
+            'tempo_ms': round(tempo_ms, 1),
+            'orcamento_ms': orcamento_ms,
+            'modulos_proibidos': proibidos,
+            'mais_lentos': {modulo: round(tempo, 1) for modulo, tempo in mais_lentos}
+        }
+        
+        situacao = '✅' if tempo_ms <= orcamento_ms and not proibidos else '❌'
+        print(f"{nome_alvo:<20} {tempo_ms:>12.1f} {orcamento_ms:>12.1f} {situacao}")
+        
+        if tempo_ms > orcamento_ms:
+            falhas.append(f"{nome_alvo}: {tempo_ms:.1f} ms excede o orçamento de {orcamento_ms:.1f} ms")
+        if proibidos:
+            falhas.append(f"{nome_alvo}: importa {', '.join(proibidos)}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados salvos em: {args.json}")
+    
+    if falhas:
+        print("\n❌ Regressão no tempo de importação:")
+        for falha in falhas:
+            print(f"   {falha}")
+        return 1
+    
+    print("\n✅ Tempos de importação dentro do orçamento")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
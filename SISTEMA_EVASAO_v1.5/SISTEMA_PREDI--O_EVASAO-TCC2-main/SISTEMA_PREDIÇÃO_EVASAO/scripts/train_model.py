@@ -18,8 +18,6 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import LabelEncoder
@@ -269,6 +267,9 @@ class ModelTrainer:
     
     def _plot_feature_importance(self, feature_names: list, output_dir: Path) -> None:
         """Plota importância das features."""
+        # Bibliotecas gráficas só são importadas quando um gráfico é gerado
+        import matplotlib.pyplot as plt
+        
         importances = self.model.feature_importances_
         indices = np.argsort(importances)[::-1]
         
@@ -286,6 +287,9 @@ class ModelTrainer:
     
     def _plot_confusion_matrix(self, metrics: dict, output_dir: Path) -> None:
         """Plota matriz de confusão."""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
         cm = confusion_matrix(metrics['y_test'], metrics['y_pred_test'])
         classes = self.class_mapping['classes_mantidas']
         
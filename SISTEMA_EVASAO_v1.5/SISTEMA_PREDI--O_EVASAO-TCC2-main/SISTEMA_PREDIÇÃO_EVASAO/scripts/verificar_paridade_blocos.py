@@ -0,0 +1,109 @@
+﻿#!/usr/bin/env python3
+"""
+Script para verificar a paridade entre o processamento em blocos e o do arquivo inteiro.
+
+Prediz a planilha inteira de uma vez (predizer_alunos) e em blocos de N
+linhas (predizer_alunos_em_blocos, como o --blocos do principal.py) e
+compara os dois CSVs byte a byte. Retorna código 1 se houver divergência.
+
+Uso:
+    python scripts/verificar_paridade_blocos.py arquivo_alunos [--blocos N [N ...]] [--regras-primeiro]
+    
+Exemplo:
+    python scripts/verificar_paridade_blocos.py data/raw/alunos_ativos_atual.xlsx --blocos 37 1000
+"""
+
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Adicionar o diretório pai ao path para que possamos importar codigo_fonte
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codigo_fonte.utilitarios import obter_registrador
+from codigo_fonte.nucleo import SistemaPredicaoEvasao, COLUNAS_EXPORTACAO
+
+registrador = obter_registrador(__name__)
+
+def descrever_diferencas(arquivo_referencia: Path, arquivo_blocos: Path) -> None:
+    """Imprime as colunas que diferem e em quantas linhas."""
+    referencia = pd.read_csv(arquivo_referencia, dtype=str, keep_default_na=False)
+    blocos = pd.read_csv(arquivo_blocos, dtype=str, keep_default_na=False)
+    if referencia.shape != blocos.shape or list(referencia.columns) != list(blocos.columns):
+        print(f"   Formatos diferentes: {referencia.shape} x {blocos.shape}")
+        return
+    diferentes = (referencia != blocos).sum()
+    for coluna, quantidade in diferentes[diferentes > 0].items():
+        print(f"   {coluna}: {quantidade} linhas")
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Verificação de paridade do processamento em blocos')
+    
+    parser.add_argument(
+        'arquivo_alunos',
+        help='Arquivo Excel com dados dos alunos'
+    )
+    
+    parser.add_argument(
+        '--blocos',
+        type=int,
+        nargs='+',
+        default=[37, 1000],
+        metavar='N',
+        help='Tamanhos de bloco comparados com o arquivo inteiro (padrão: 37 1000)'
+    )
+    
+    parser.add_argument(
+        '--regras-primeiro',
+        action='store_true',
+        help="Compara no modo de inferência 'regras_primeiro'"
+    )
+    
+    args = parser.parse_args()
+    arquivo_alunos = Path(args.arquivo_alunos)
+    modo_inferencia = 'regras_primeiro' if args.regras_primeiro else None
+    
+    try:
+        sistema = SistemaPredicaoEvasao()
+        sistema.inicializar()
+        
+        with tempfile.TemporaryDirectory() as diretorio:
+            arquivo_referencia = Path(diretorio) / "arquivo_inteiro.csv"
+            resultado, _ = sistema.predizer_alunos(arquivo_alunos, modo_inferencia=modo_inferencia,
+                                                    incremental=False, historico=False)
+            resultado.salvar_csv(arquivo_referencia, colunas=COLUNAS_EXPORTACAO)
+            conteudo_referencia = arquivo_referencia.read_bytes()
+            
+            divergentes = []
+            for tamanho_bloco in args.blocos:
+                arquivo_blocos = Path(diretorio) / f"blocos_{tamanho_bloco}.csv"
+                estatisticas = sistema.predizer_alunos_em_blocos(
+                    arquivo_alunos, arquivo_blocos, tamanho_bloco=tamanho_bloco,
+                    modo_inferencia=modo_inferencia, colunas=COLUNAS_EXPORTACAO,
+                    incremental=False, historico=False
+                )
+                if arquivo_blocos.read_bytes() == conteudo_referencia:
+                    print(f"✅ Blocos de {tamanho_bloco} ({estatisticas['chunks']} blocos): idêntico")
+                else:
+                    print(f"❌ Blocos de {tamanho_bloco} ({estatisticas['chunks']} blocos): divergente")
+                    descrever_diferencas(arquivo_referencia, arquivo_blocos)
+                    divergentes.append(tamanho_bloco)
+        
+        if divergentes:
+            print(f"❌ Processamento em blocos divergente para {divergentes}")
+            return 1
+        
+        print(f"✅ Processamento em blocos equivalente ao arquivo inteiro ({len(resultado)} alunos)")
+        return 0
+    
+    except Exception as e:
+        registrador.error(f"Erro na verificação de paridade: {e}", exc_info=True)
+        print(f"❌ Erro na verificação de paridade: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
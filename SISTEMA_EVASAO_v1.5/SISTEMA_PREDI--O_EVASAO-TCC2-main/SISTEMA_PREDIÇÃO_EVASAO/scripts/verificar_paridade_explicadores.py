@@ -0,0 +1,94 @@
+﻿#!/usr/bin/env python3
+"""
+Script para verificar a paridade entre os backends de explicação SHAP.
+
+Compara os valores do shap.TreeExplainer com as contribuições nativas do
+XGBoost (pred_contribs) sobre uma planilha de alunos, incluindo o fator
+principal extraído de cada aluno. Retorna código 1 se houver divergência.
+
+Uso:
+    python scripts/verificar_paridade_explicadores.py arquivo_alunos [--tolerancia 1e-4]
+    
+Exemplo:
+    python scripts/verificar_paridade_explicadores.py data/raw/alunos_ativos_atual.xlsx
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Adicionar o diretório pai ao path para que possamos importar codigo_fonte
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codigo_fonte.utilitarios import obter_registrador, CarregadorDados
+from codigo_fonte.modelos import PreditorEvasaoEstudantil, criar_explicador
+
+registrador = obter_registrador(__name__)
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Verificação de paridade dos explicadores SHAP')
+    
+    parser.add_argument(
+        'arquivo_alunos',
+        help='Arquivo Excel com dados dos alunos'
+    )
+    
+    parser.add_argument(
+        '--tolerancia',
+        type=float,
+        default=1e-4,
+        help='Diferença absoluta máxima aceita entre os valores SHAP (padrão: 1e-4)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        preditor = PreditorEvasaoEstudantil()
+        preditor.carregar_modelo()
+        
+        df = CarregadorDados.carregar_excel_com_deteccao_cabecalho(Path(args.arquivo_alunos))
+        df_processado = preditor.preprocessar_dados(df)
+        nomes_features = df_processado.columns.tolist()
+        
+        valores = {}
+        for backend in ('shap', 'xgboost'):
+            explicador = criar_explicador(preditor.modelo, backend)
+            inicio = time.perf_counter()
+            valores[backend] = PreditorEvasaoEstudantil.normalizar_valores_shap(
+                explicador.shap_values(df_processado)
+            )
+            print(f"⏱️ {backend}: {time.perf_counter() - inicio:.3f}s para {len(df_processado)} alunos")
+        
+        if valores['shap'].shape != valores['xgboost'].shape:
+            print(f"❌ Formatos diferentes: {valores['shap'].shape} x {valores['xgboost'].shape}")
+            return 1
+        
+        diferenca_maxima = float(np.max(np.abs(valores['shap'] - valores['xgboost']), initial=0.0))
+        fatores_shap = PreditorEvasaoEstudantil.extrair_fatores_shap(valores['shap'], nomes_features)
+        fatores_xgboost = PreditorEvasaoEstudantil.extrair_fatores_shap(valores['xgboost'], nomes_features)
+        fatores_iguais = fatores_shap.fator_principal == fatores_xgboost.fator_principal
+        
+        print(f"📊 Diferença absoluta máxima: {diferenca_maxima:.2e} (tolerância {args.tolerancia:.0e})")
+        print(f"📊 Fator principal igual: {int(fatores_iguais.sum())}/{len(fatores_iguais)} alunos")
+        
+        if diferenca_maxima > args.tolerancia:
+            print("❌ Backends divergentes")
+            return 1
+        
+        if not fatores_iguais.all():
+            # Empates numéricos podem trocar o fator principal sem violar a tolerância
+            print("⚠️ Fator principal diferente apenas por empate dentro da tolerância")
+        
+        print("✅ Backends equivalentes")
+        return 0
+    
+    except Exception as e:
+        registrador.error(f"Erro na verificação de paridade: {e}", exc_info=True)
+        print(f"❌ Erro na verificação de paridade: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
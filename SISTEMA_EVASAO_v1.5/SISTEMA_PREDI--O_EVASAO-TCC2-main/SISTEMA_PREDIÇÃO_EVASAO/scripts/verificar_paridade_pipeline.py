@@ -0,0 +1,213 @@
+﻿#!/usr/bin/env python3
+"""
+Script para verificar que predizer_alunos aplica as regras sobre os valores originais.
+
+Monta uma variante da planilha com módulos em texto ('I', 'Módulo 1', 'IV',
+'ÚLTIMO'...) e códigos de curso em texto ('ENF', 'ADM'...) e a prediz com
+predizer_alunos, nos modos de inferência 'completo' e 'regras_primeiro'.
+A referência é o motor de regras aplicado diretamente sobre a variante,
+como antes da conversão numérica das features do modelo, com a predição
+ML calculada à parte. A comparação é feita sem grade curricular (regras
+pelas heurísticas de módulo) e com uma grade montada a partir da própria
+planilha, indexada pelos códigos em texto. O DataFrame passado a
+predizer_alunos não pode ser alterado. Retorna código 1 se houver
+divergência.
+
+Uso:
+    python scripts/verificar_paridade_pipeline.py arquivo_alunos [--fracao F] [--semente S]
+    
+Exemplo:
+    python scripts/verificar_paridade_pipeline.py data/raw/alunos_ativos_atual.xlsx --fracao 0.5
+"""
+
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório pai ao path para que possamos importar codigo_fonte
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codigo_fonte.utilitarios import obter_registrador, CarregadorDados
+from codigo_fonte.nucleo import SistemaPredicaoEvasao
+from codigo_fonte.regras_negocio import MotorRegrasNegocio, AnalisadorCurriculo, IndiceCurricular
+from codigo_fonte.regras_negocio.indice_curricular import numero_modulo
+
+registrador = obter_registrador(__name__)
+
+# Grafias em texto de cada módulo, como aparecem em exportações do AcadWeb
+MODULOS_TEXTO = {
+    1: ['I', 'Módulo 1'],
+    2: ['II', 'Módulo 2'],
+    3: ['III', 'Módulo 3'],
+    4: ['IV', 'Módulo 4', 'ÚLTIMO'],
+}
+
+SIGLAS_CURSO = ['ENF', 'ADM', 'RAD', 'INF', 'SEG', 'LOG', 'FAR', 'EST', 'NUT', 'CON']
+
+def gerar_variante_texto(df: pd.DataFrame, fracao: float, gerador: np.random.Generator) -> pd.DataFrame:
+    """
+    Troca parte dos módulos e todos os códigos de curso por texto.
+    
+    Args:
+        df: Linhas da planilha
+        fracao: Fração das linhas com o módulo escrito em texto
+        gerador: Gerador de números aleatórios
+        
+    Returns:
+        Cópia da planilha com 'Módulo atual' misto e 'Cód.Curso' textual
+    """
+    variante = df.copy()
+    if 'Módulo atual' in variante.columns:
+        modulos = variante['Módulo atual'].astype(object)
+        numeros = pd.to_numeric(modulos, errors='coerce')
+        trocar = (gerador.random(len(variante)) < fracao) & numeros.isin(list(MODULOS_TEXTO)).to_numpy()
+        escolhas = gerador.integers(0, 3, len(variante))
+        variante['Módulo atual'] = [
+            MODULOS_TEXTO[int(numero)][escolha % len(MODULOS_TEXTO[int(numero)])] if troca else valor
+            for valor, numero, troca, escolha in zip(modulos, numeros, trocar, escolhas)
+        ]
+    if 'Cód.Curso' in variante.columns:
+        codigos = sorted(variante['Cód.Curso'].dropna().astype(str).unique())
+        siglas = {codigo: f"{SIGLAS_CURSO[posicao % len(SIGLAS_CURSO)]}{posicao // len(SIGLAS_CURSO) or ''}"
+                  for posicao, codigo in enumerate(codigos)}
+        variante['Cód.Curso'] = [siglas.get(str(codigo), codigo) if pd.notna(codigo) else codigo
+                                 for codigo in variante['Cód.Curso']]
+    return variante
+
+def montar_grade_texto(df: pd.DataFrame) -> IndiceCurricular:
+    """
+    Monta uma grade curricular com os códigos de curso em texto da variante.
+    
+    Cada disciplina atual da planilha entra no módulo informado pelo aluno,
+    então as consultas pela grade dependem do curso e do módulo lidos como texto.
+    
+    Args:
+        df: Variante da planilha (ver gerar_variante_texto)
+        
+    Returns:
+        Índice curricular indexado pelo curso
+    """
+    disciplinas = pd.DataFrame({
+        'Cód.Curso': df['Cód.Curso'],
+        'Cód.Disc.': df['Cód.Disc. atual'],
+        'Módulo': [numero_modulo(valor) for valor in df['Módulo atual']],
+    }).dropna().drop_duplicates(['Cód.Curso', 'Cód.Disc.'])
+    return IndiceCurricular.construir(disciplinas, None)
+
+def comparar(sistema: SistemaPredicaoEvasao, df: pd.DataFrame, modo_inferencia: str) -> list:
+    """
+    Compara predizer_alunos com o motor de regras aplicado sobre o DataFrame original.
+    
+    Args:
+        sistema: Sistema inicializado (com o motor de regras a comparar)
+        df: DataFrame de alunos
+        modo_inferencia: 'completo' ou 'regras_primeiro'
+        
+    Returns:
+        Lista de descrições das divergências
+    """
+    # Referência: predição ML sobre uma cópia e regras sobre o DataFrame original
+    preditor_ml = sistema.preditor_ml
+    resultado_ml = preditor_ml.fazer_predicoes(
+        preditor_ml.preprocessar_dados(sistema.converter_features_numericas(df.copy())), calcular_shap=False
+    )
+    motor = sistema.motor_regras_negocio
+    if modo_inferencia == 'regras_primeiro':
+        referencia = motor.aplicar_regras_negocio_lote(df)
+        linhas_ml = referencia.obter_linhas_ml()
+        referencia.preencher_ml(linhas_ml, resultado_ml.predicoes[linhas_ml],
+                                resultado_ml.probabilidade_maxima[linhas_ml])
+    else:
+        referencia = motor.aplicar_regras_negocio_lote(df, resultado_ml.predicoes,
+                                                       resultado_ml.probabilidade_maxima)
+    
+    entrada = df.copy()
+    resultado, _ = sistema.predizer_alunos(entrada, modo_explicacao='desativado', modo_inferencia=modo_inferencia,
+                                            incremental=False, historico=False)
+    dados = resultado.dados
+    
+    divergencias = []
+    if not entrada.equals(df):
+        divergencias.append("predizer_alunos alterou o DataFrame de entrada")
+    for campo, coluna in (('situacao', 'situacao_predita'), ('regra_aplicada', 'regra_aplicada')):
+        esperado = getattr(referencia, campo)
+        obtido = dados[coluna].to_numpy()
+        diferentes = np.flatnonzero(esperado != obtido)
+        if len(diferentes):
+            divergencias.append(f"{coluna}: {len(diferentes)} linhas (ex.: linha {diferentes[0]}, "
+                                f"{esperado[diferentes[0]]!r} x {obtido[diferentes[0]]!r})")
+    
+    obtido = dados['probabilidade_situacao'].to_numpy(dtype=float)
+    diferentes = np.flatnonzero(~((referencia.probabilidade == obtido)
+                                  | (np.isnan(referencia.probabilidade) & np.isnan(obtido))))
+    if len(diferentes):
+        divergencias.append(f"probabilidade_situacao: {len(diferentes)} linhas (ex.: linha {diferentes[0]})")
+    
+    regras = pd.Series(referencia.regra_aplicada).value_counts()
+    print(f"   Regras: {', '.join(f'{regra}={quantidade}' for regra, quantidade in regras.items())}")
+    return divergencias
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Verificação de paridade das regras em predizer_alunos')
+    
+    parser.add_argument(
+        'arquivo_alunos',
+        help='Arquivo Excel com dados dos alunos'
+    )
+    
+    parser.add_argument(
+        '--fracao',
+        type=float,
+        default=0.5,
+        metavar='F',
+        help='Fração das linhas com o módulo escrito em texto (padrão: 0.5)'
+    )
+    
+    parser.add_argument(
+        '--semente',
+        type=int,
+        default=42,
+        help='Semente do sorteio dos módulos em texto (padrão: 42)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        df_planilha = CarregadorDados.carregar_excel_com_deteccao_cabecalho(Path(args.arquivo_alunos))
+        df_variante = gerar_variante_texto(df_planilha, args.fracao, np.random.default_rng(args.semente))
+        
+        sistema = SistemaPredicaoEvasao()
+        sistema.inicializar()
+        grade_texto = AnalisadorCurriculo(indice=montar_grade_texto(df_variante))
+        motores = {
+            'sem grade': MotorRegrasNegocio(AnalisadorCurriculo(indice=IndiceCurricular())),
+            'grade com códigos em texto': MotorRegrasNegocio(grade_texto),
+        }
+        
+        total_divergencias = 0
+        for nome_motor, motor in motores.items():
+            sistema.motor_regras_negocio = motor
+            for modo_inferencia in ('completo', 'regras_primeiro'):
+                print(f"📊 {nome_motor}, {modo_inferencia}")
+                divergencias = comparar(sistema, df_variante, modo_inferencia)
+                for divergencia in divergencias:
+                    print(f"   ❌ {divergencia}")
+                total_divergencias += len(divergencias)
+        
+        if total_divergencias:
+            print(f"❌ predizer_alunos divergente do motor de regras ({total_divergencias} divergências)")
+            return 1
+        
+        print(f"✅ predizer_alunos aplica as regras sobre os valores originais ({len(df_variante)} alunos)")
+        return 0
+    
+    except Exception as e:
+        registrador.error(f"Erro na verificação de paridade: {e}", exc_info=True)
+        print(f"❌ Erro na verificação de paridade: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
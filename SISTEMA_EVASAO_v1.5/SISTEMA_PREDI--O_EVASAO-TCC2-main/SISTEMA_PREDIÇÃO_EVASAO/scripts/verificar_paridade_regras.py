@@ -0,0 +1,193 @@
+﻿#!/usr/bin/env python3
+"""
+Script para verificar a paridade entre o motor de regras escalar e o vetorizado.
+
+Aplica aplicar_regras_negocio linha a linha e aplicar_regras_negocio_lote
+sobre o mesmo DataFrame e compara situação, probabilidade, razão, regra
+aplicada e contadores. Além das linhas da planilha, o DataFrame recebe
+cópias com células ausentes, de tipos misturados e números como texto nas
+colunas lidas pelas regras e pelo analisador de currículo. A comparação é
+feita com e sem grade curricular e com e sem predições ML. Retorna código 1
+se houver divergência.
+
+Uso:
+    python scripts/verificar_paridade_regras.py arquivo_alunos [--variacoes N] [--semente S]
+    
+Exemplo:
+    python scripts/verificar_paridade_regras.py data/raw/alunos_ativos_atual.xlsx --variacoes 2000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório pai ao path para que possamos importar codigo_fonte
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codigo_fonte.utilitarios import obter_registrador, CarregadorDados
+from codigo_fonte.regras_negocio import MotorRegrasNegocio, AnalisadorCurriculo, IndiceCurricular
+
+registrador = obter_registrador(__name__)
+
+# Valores problemáticos por coluna: ausentes, tipos misturados e números como texto
+VALORES_EXTREMOS = {
+    'Faltas Consecutivas': [np.nan, None, 0, 3, 5, 12, 25, 3.0, 4.5, -1, '5', ' 12 ', '3.0', 'abc', '', True],
+    'Pend. Financ.': [np.nan, None, 0, 1, 2, 3, 2.5, -1, 'PC', 'pc', '2', ' 3 ', '1.0', 'abc', '', False],
+    'Pend. Acad.': [np.nan, None, '', 'PR', 'pv', ' PF ', 'Não', 'NAO', 'nan', 'None', 'X', 0, 1, 2.0],
+    'Situação': [np.nan, None, '', 'Matriculado', 'FORMADO', 'Concluído', 'tf', 'Trancado', 1, 4.0],
+    'Módulo atual': [np.nan, None, '', 1, 4, 1.0, 4.0, 2, '1', '4', 'I', 'IV', 'Módulo 1', 'Módulo 4', 'ÚLTIMO'],
+    'Cód.Disc. atual': [np.nan, None, '', 0, 1001, 101, '001', 'INTRO10', 'intro', 'ABC01', 'XYZ'],
+}
+
+def gerar_variacoes(df: pd.DataFrame, quantidade: int, gerador: np.random.Generator) -> pd.DataFrame:
+    """
+    Sorteia linhas da planilha e troca células das colunas das regras por valores extremos.
+    
+    Args:
+        df: Linhas da planilha
+        quantidade: Quantidade de linhas geradas
+        gerador: Gerador de números aleatórios
+        
+    Returns:
+        DataFrame com colunas object de tipos misturados
+    """
+    variacoes = df.iloc[gerador.integers(0, len(df), quantidade)].reset_index(drop=True).astype(object)
+    for coluna, valores in VALORES_EXTREMOS.items():
+        if coluna not in variacoes.columns:
+            continue
+        trocar = gerador.random(quantidade) < 0.5
+        escolhidos = gerador.integers(0, len(valores), quantidade)
+        variacoes[coluna] = [valores[escolha] if troca else valor
+                             for valor, troca, escolha in zip(variacoes[coluna], trocar, escolhidos)]
+    return variacoes
+
+def comparar(motor: MotorRegrasNegocio, df: pd.DataFrame, predicoes_ml, probabilidades_ml) -> list:
+    """
+    Aplica as regras nos dois caminhos e devolve as divergências encontradas.
+    
+    Args:
+        motor: Motor de regras (os contadores são zerados a cada caminho)
+        df: DataFrame de alunos
+        predicoes_ml: Predição ML de cada linha, ou None
+        probabilidades_ml: Probabilidade ML de cada linha, ou None
+        
+    Returns:
+        Lista de descrições das divergências
+    """
+    motor.resetar_contadores()
+    inicio = time.perf_counter()
+    escalares = [
+        motor.aplicar_regras_negocio(
+            registro,
+            None if predicoes_ml is None else predicoes_ml[indice],
+            np.nan if probabilidades_ml is None else probabilidades_ml[indice]
+        )
+        for indice, registro in enumerate(df.to_dict('records'))
+    ]
+    tempo_escalar = time.perf_counter() - inicio
+    contadores_escalar = motor.obter_resumo_regras()
+    
+    motor.resetar_contadores()
+    inicio = time.perf_counter()
+    lote = motor.aplicar_regras_negocio_lote(df, predicoes_ml, probabilidades_ml)
+    tempo_lote = time.perf_counter() - inicio
+    print(f"   ⏱️ escalar {tempo_escalar:.3f}s, lote {tempo_lote:.3f}s para {len(df)} alunos")
+    
+    divergencias = []
+    for campo in ('situacao', 'razao', 'regra_aplicada'):
+        esperado = np.array([getattr(resultado, campo) for resultado in escalares], dtype=object)
+        diferentes = np.flatnonzero(esperado != getattr(lote, campo))
+        if len(diferentes):
+            divergencias.append(f"{campo}: {len(diferentes)} linhas (ex.: linha {diferentes[0]}, "
+                                f"{esperado[diferentes[0]]!r} x {getattr(lote, campo)[diferentes[0]]!r})")
+    
+    esperado = np.array([resultado.probabilidade for resultado in escalares], dtype=float)
+    diferentes = np.flatnonzero(~((esperado == lote.probabilidade)
+                                  | (np.isnan(esperado) & np.isnan(lote.probabilidade))))
+    if len(diferentes):
+        divergencias.append(f"probabilidade: {len(diferentes)} linhas (ex.: linha {diferentes[0]})")
+    
+    if lote.contadores != contadores_escalar:
+        divergencias.append(f"contadores do lote: {lote.contadores} x {contadores_escalar}")
+    if motor.obter_resumo_regras() != contadores_escalar:
+        divergencias.append(f"contadores do motor: {motor.obter_resumo_regras()} x {contadores_escalar}")
+    return divergencias
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Verificação de paridade do motor de regras')
+    
+    parser.add_argument(
+        'arquivo_alunos',
+        help='Arquivo Excel com dados dos alunos'
+    )
+    
+    parser.add_argument(
+        '--variacoes',
+        type=int,
+        default=2000,
+        metavar='N',
+        help='Linhas geradas com valores ausentes, mistos e numéricos em texto (padrão: 2000)'
+    )
+    
+    parser.add_argument(
+        '--semente',
+        type=int,
+        default=42,
+        help='Semente do sorteio das variações (padrão: 42)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        df_planilha = CarregadorDados.carregar_excel_com_deteccao_cabecalho(Path(args.arquivo_alunos))
+        gerador = np.random.default_rng(args.semente)
+        df_variacoes = gerar_variacoes(df_planilha, args.variacoes, gerador)
+        
+        # Colunas das regras ausentes: os dois caminhos usam o mesmo valor padrão
+        df_sem_colunas = df_variacoes.drop(columns=['Pend. Acad.', 'Situação'], errors='ignore')
+        
+        conjuntos = {
+            'planilha': df_planilha,
+            'variações': df_variacoes,
+            'planilha + variações': pd.concat([df_planilha, df_variacoes], ignore_index=True),
+            'sem Pend. Acad./Situação': df_sem_colunas,
+        }
+        motores = {
+            'com grade': MotorRegrasNegocio(AnalisadorCurriculo(indice=IndiceCurricular.carregar())),
+            'sem grade': MotorRegrasNegocio(None),
+        }
+        
+        total_divergencias = 0
+        for nome_motor, motor in motores.items():
+            for nome_conjunto, df in conjuntos.items():
+                predicoes_ml = np.array(['Matriculado', 'Trancado', 'Desistente'], dtype=object)[
+                    gerador.integers(0, 3, len(df))
+                ]
+                probabilidades_ml = gerador.random(len(df))
+                for com_ml in (True, False):
+                    descricao = f"{nome_motor}, {nome_conjunto}, {'com' if com_ml else 'sem'} ML"
+                    print(f"📊 {descricao}")
+                    divergencias = comparar(motor, df, predicoes_ml if com_ml else None,
+                                            probabilidades_ml if com_ml else None)
+                    for divergencia in divergencias:
+                        print(f"   ❌ {divergencia}")
+                    total_divergencias += len(divergencias)
+        
+        if total_divergencias:
+            print(f"❌ Motor de regras divergente ({total_divergencias} divergências)")
+            return 1
+        
+        print("✅ Motor de regras vetorizado equivalente ao escalar")
+        return 0
+    
+    except Exception as e:
+        registrador.error(f"Erro na verificação de paridade: {e}", exc_info=True)
+        print(f"❌ Erro na verificação de paridade: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+﻿#!/usr/bin/env python3
+"""
+Script para verificar a paridade entre o serviço de predição e predizer_alunos.
+
+Prediz a planilha inteira com predizer_alunos e, em seguida, envia as mesmas
+linhas ao ServicoPredicao como registros JSON, em requisições concorrentes
+de N alunos que o serviço agrupa em micro-lotes. Cada registro devolvido
+pelo serviço deve ser igual ao da predição da planilha. No meio delas vai
+uma requisição inválida, que deve falhar sozinha sem afetar as demais do
+seu micro-lote. Retorna código 1 se houver divergência.
+
+Uso:
+    python scripts/verificar_paridade_servico.py arquivo_alunos [--alunos-requisicao N] [--modo-explicacao MODO]
+    
+Exemplo:
+    python scripts/verificar_paridade_servico.py data/raw/alunos_ativos_atual.xlsx --alunos-requisicao 7
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Adicionar o diretório pai ao path para que possamos importar codigo_fonte
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codigo_fonte.utilitarios import obter_registrador, CarregadorDados
+from codigo_fonte.nucleo import ServicoPredicao, obter_sistema_predicao
+
+registrador = obter_registrador(__name__)
+
+# Em top_n_urgencia a explicação de um aluno depende dos demais do lote
+MODOS_COMPARAVEIS = ('desativado', 'completo', 'apenas_risco')
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Verificação de paridade do serviço de predição')
+    
+    parser.add_argument(
+        'arquivo_alunos',
+        help='Arquivo Excel com dados dos alunos'
+    )
+    
+    parser.add_argument(
+        '--alunos-requisicao',
+        type=int,
+        default=7,
+        metavar='N',
+        help='Alunos por requisição enviada ao serviço (padrão: 7)'
+    )
+    
+    parser.add_argument(
+        '--modo-explicacao',
+        choices=MODOS_COMPARAVEIS,
+        default='completo',
+        help='Modo de explicação SHAP (padrão: completo)'
+    )
+    
+    args = parser.parse_args()
+    arquivo_alunos = Path(args.arquivo_alunos)
+    
+    try:
+        sistema = obter_sistema_predicao()
+        resultado, _ = sistema.predizer_alunos(arquivo_alunos, modo_explicacao=args.modo_explicacao,
+                                                incremental=False, historico=False)
+        exportacao = resultado.para_dataframe_exportacao()
+        referencia = exportacao.astype(object).where(exportacao.notna(), None).to_dict('records')
+        
+        # Mesmo caminho de uma requisição HTTP: linhas da planilha como JSON
+        df = CarregadorDados.carregar_excel_com_deteccao_cabecalho(arquivo_alunos)
+        registros = json.loads(df.to_json(orient='records', force_ascii=False))
+        
+        # Curso como lista não é hashável e derruba a predição de qualquer lote
+        invalido = dict(registros[0], Curso=['inválido'])
+        requisicoes_antes_invalida = max(1, len(registros) // args.alunos_requisicao // 2)
+        
+        servico = ServicoPredicao()
+        servico.iniciar()
+        try:
+            futuros = []
+            for inicio in range(0, len(registros), args.alunos_requisicao):
+                futuros.append(servico.submeter(registros[inicio:inicio + args.alunos_requisicao],
+                                                args.modo_explicacao))
+                if len(futuros) == requisicoes_antes_invalida:
+                    futuro_invalido = servico.submeter(invalido, args.modo_explicacao)
+            predicoes = [registro for futuro in futuros for registro in futuro.result()]
+            erro_invalido = futuro_invalido.exception()
+            estado = servico.obter_estado()
+        finally:
+            servico.parar()
+        
+        print(f"📊 {estado['requests']} requisições em {estado['batches']} micro-lotes "
+              f"(maior: {estado['largest_batch']} alunos)")
+        
+        if erro_invalido is None:
+            print("❌ Requisição inválida não falhou")
+            return 1
+        print(f"✅ Requisição inválida falhou isolada: {type(erro_invalido).__name__}")
+        
+        if len(predicoes) != len(referencia):
+            print(f"❌ Serviço devolveu {len(predicoes)} predições para {len(referencia)} alunos")
+            return 1
+        
+        divergentes = [indice for indice, (esperado, obtido) in enumerate(zip(referencia, predicoes))
+                       if esperado != obtido]
+        if divergentes:
+            print(f"❌ {len(divergentes)} alunos com predição divergente do serviço")
+            for indice in divergentes[:5]:
+                colunas = [coluna for coluna in referencia[indice]
+                           if referencia[indice][coluna] != predicoes[indice].get(coluna)]
+                print(f"   Linha {indice}: {', '.join(colunas)}")
+            return 1
+        
+        print(f"✅ Serviço equivalente a predizer_alunos ({len(referencia)} alunos)")
+        return 0
+    
+    except Exception as e:
+        registrador.error(f"Erro na verificação de paridade: {e}", exc_info=True)
+        print(f"❌ Erro na verificação de paridade: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+﻿#!/usr/bin/env python3
+"""
+Serviço residente de predição de evasão estudantil.
+
+Mantém modelo, explicador SHAP e grade curricular carregados e atende
+predições sob demanda por HTTP em localhost ou em um socket Unix.
+Requisições concorrentes são agrupadas em micro-lotes.
+
+Uso:
+    python servico_predicao.py                          # http://127.0.0.1:8765
+    python servico_predicao.py --porta 9000
+    python servico_predicao.py --socket /tmp/evasao.sock
+    
+Exemplo:
+    curl -X POST http://127.0.0.1:8765/predizer -d '{"Nome": "Aluno", "Pend. Financ.": 0, ...}'
+    curl http://127.0.0.1:8765/saude
+    curl http://127.0.0.1:8765/metricas                 # Formato do Prometheus
+"""
+
+import sys
+import argparse
+from dataclasses import replace
+
+from codigo_fonte.utilitarios import obter_registrador
+from codigo_fonte.configuracao import configuracoes
+from codigo_fonte.nucleo import ServicoPredicao, criar_servidor
+
+def configurar_argumentos() -> argparse.ArgumentParser:
+    """
+    Configura os argumentos da linha de comando.
+    
+    Returns:
+        Parser configurado
+    """
+    padrao = configuracoes.servico
+    parser = argparse.ArgumentParser(description='Serviço residente de predição de evasão estudantil')
+    
+    parser.add_argument('--host', default=padrao.host,
+                        help=f'Endereço de escuta (padrão: {padrao.host})')
+    parser.add_argument('--porta', type=int, default=padrao.porta,
+                        help=f'Porta HTTP (padrão: {padrao.porta})')
+    parser.add_argument('--socket', dest='caminho_socket', default=padrao.caminho_socket,
+                        help='Socket Unix usado no lugar de host/porta')
+    parser.add_argument('--tamanho-lote', type=int, default=padrao.tamanho_maximo_lote,
+                        help=f'Máximo de alunos por micro-lote (padrão: {padrao.tamanho_maximo_lote})')
+    parser.add_argument('--espera-lote-ms', type=float, default=padrao.espera_maxima_lote_ms,
+                        help=f'Janela de agrupamento em ms (padrão: {padrao.espera_maxima_lote_ms})')
+    parser.add_argument('--tamanho-fila', type=int, default=padrao.tamanho_fila,
+                        help=f'Requisições pendentes antes de responder 503 (padrão: {padrao.tamanho_fila})')
+    
+    return parser
+
+def principal() -> int:
+    """
+    Inicia o serviço e atende requisições até ser interrompido.
+    
+    Returns:
+        Código de saída (0 = sucesso, 1 = erro)
+    """
+    registrador = obter_registrador(__name__)
+    args = configurar_argumentos().parse_args()
+    
+    configuracao = replace(
+        configuracoes.servico,
+        host=args.host,
+        porta=args.porta,
+        caminho_socket=args.caminho_socket,
+        tamanho_maximo_lote=args.tamanho_lote,
+        espera_maxima_lote_ms=args.espera_lote_ms,
+        tamanho_fila=args.tamanho_fila
+    )
+    
+    servico = ServicoPredicao(configuracao)
+    try:
+        print("Carregando modelo e grade curricular...")
+        servico.iniciar()
+        servidor = criar_servidor(servico)
+    except Exception as e:
+        registrador.error(f"Erro ao iniciar o serviço: {e}", exc_info=True)
+        print(f"Erro ao iniciar o serviço: {e}")
+        return 1
+    
+    endereco = configuracao.caminho_socket or f"http://{configuracao.host}:{configuracao.porta}"
+    print(f"Serviço de predição pronto em {endereco} (Ctrl+C para encerrar)")
+    
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando serviço...")
+    finally:
+        servidor.server_close()
+        servico.parar()
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(principal())